@@ -0,0 +1,354 @@
+"""DocxElementParser性能基准测试
+
+以extracted_docx/中的文档为模板，按段落、表格和图片数量的1倍、10倍、100倍生成合成文档，
+分别计时打开、文本提取、建立元素索引、提取全部段落样式、批量设置格式、批量插入和保存，
+结果写入JSON文件，并可以与之前的结果比较找出性能回退。
+
+用法：
+    python benchmark.py --scales 1 10 100 --output results.json
+    python benchmark.py --compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import copy
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+from docx_namespace import DocxElementParser
+
+
+# 默认的模板文档目录(解压后的docx)
+DEFAULT_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extracted_docx')
+
+# 按执行顺序排列的测试项，后面的测试项会修改文档
+OPERATIONS = ['open', 'extract_text', 'index', 'paragraph_styles', 'bulk_setters', 'insert', 'build_table', 'save']
+
+
+def pack_directory(source_dir, output_path):
+    """将解压后的docx目录打包为docx文件([Content_Types].xml放在最前面)"""
+    paths = []
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            full_path = os.path.join(root, name)
+            paths.append(os.path.relpath(full_path, source_dir).replace(os.sep, '/'))
+    paths.sort(key=lambda path: (path != '[Content_Types].xml', path))
+    with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as zip_out:
+        for path in paths:
+            zip_out.write(os.path.join(source_dir, path), path)
+
+
+def build_synthetic_docx(template_path, scale, output_path):
+    """将模板文档正文重复scale次，生成合成文档
+
+    每份副本中的图片指向新的媒体文件名和关系ID(内容与原图相同)，
+    段落ID和绘图对象ID重新分配，保证生成的文档结构有效。
+
+    Args:
+        template_path: 模板docx文件路径
+        scale: 倍数(正整数)
+        output_path: 输出文件路径
+
+    Returns:
+        dict: 生成文档的统计，包含'scale'、'paragraphs'、'tables'、'images'和'bytes'
+    """
+    document = DocxElementParser(template_path)
+    w_ns = f"{{{document.NAMESPACES['w']}}}"
+    embed_attr = f"{{{document.NAMESPACES['r']}}}embed"
+    blip_tag = f"{{{document.NAMESPACES['a']}}}blip"
+
+    body = document.root.find(f"{w_ns}body")
+    template = [child for child in body if child.tag != f"{w_ns}sectPr"]
+    rel_targets = {rel.get('Id'): rel.get('Target') for rel in document.parts['relationships'].getroot()}
+
+    new_elements = []
+    for copy_index in range(1, scale):
+        copies = [copy.deepcopy(element) for element in template]
+        blips = [blip for element in copies for blip in element.iter(blip_tag) if blip.get(embed_attr)]
+        old_ids = list(dict.fromkeys(blip.get(embed_attr) for blip in blips))
+        new_names = []
+        for rel_id in old_ids:
+            media_name = document._media_name_from_target(rel_targets.get(rel_id, ''))
+            base, ext = os.path.splitext(media_name)
+            new_name = f"{base}_copy{copy_index}{ext}"
+            document.parts['media'][new_name] = document.parts['media'][media_name]
+            new_names.append(new_name)
+        id_map = dict(zip(old_ids, document._add_image_relationships(new_names)))
+        for blip in blips:
+            blip.set(embed_attr, id_map[blip.get(embed_attr)])
+        new_elements.extend(copies)
+
+    # 按副本顺序插入到sectPr之前
+    insert_at = len(body) - 1 if len(body) and body[-1].tag == f"{w_ns}sectPr" else len(body)
+    body[insert_at:insert_at] = new_elements
+
+    # 重新分配副本中的段落ID和绘图对象ID
+    para_id_attr = f"{{{document.NAMESPACES['w14']}}}paraId"
+    new_paragraphs = [p for element in new_elements for p in element.iter(f"{w_ns}p") if p.get(para_id_attr)]
+    for paragraph, para_id in zip(new_paragraphs, document._allocate_para_ids(len(new_paragraphs))):
+        paragraph.set(para_id_attr, para_id)
+    doc_prs = [doc_pr for element in new_elements for doc_pr in element.iter(f"{{{document.NAMESPACES['wp']}}}docPr")]
+    for doc_pr, drawing_id in zip(doc_prs, document._allocate_drawing_ids(len(doc_prs))):
+        doc_pr.set('id', drawing_id)
+
+    document.get_structured_body_elements()
+    document.save(output_path, fast=True)
+    return {
+        'scale': scale,
+        'paragraphs': len(document.paragraphs),
+        'tables': len(document.tables),
+        'images': sum(1 for _ in document.root.iter(blip_tag)),
+        'bytes': os.path.getsize(output_path)
+    }
+
+
+def _time_call(func, repeat):
+    """运行func repeat次，返回每次耗时(秒)的列表"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_operations(path, repeat=3, insert_count=100, table_shape=(10000, 10)):
+    """对一个文档依次计时各测试项
+
+    Args:
+        path: 文档路径
+        repeat: 每个测试项的重复次数
+        insert_count: insert测试项每次插入的段落数
+        table_shape: build_table测试项生成的表格(行数, 列数)
+
+    Returns:
+        dict: {测试项: {'min', 'median', 'runs'}}，时间单位为秒
+    """
+    timings = {}
+    timings['open'] = _time_call(lambda: DocxElementParser(path), repeat)
+    document = DocxElementParser(path)
+
+    timings['extract_text'] = _time_call(document.get_all_text, repeat)
+    timings['index'] = _time_call(document.get_structured_body_elements, repeat)
+
+    def paragraph_styles():
+        for paragraph in document.paragraphs:
+            document.extract_paragraph_style(paragraph['element'])
+
+    timings['paragraph_styles'] = _time_call(paragraph_styles, repeat)
+
+    def bulk_setters():
+        for para_index in range(len(document.paragraphs)):
+            document.set_paragraph_alignment(para_index, 'both')
+            document.update_runs_style(para_index, bold=True, size='24', color='333333')
+
+    def insert():
+        document.insert_paragraphs(len(document.elements) // 2,
+                                   [f"基准测试段落 {i}" for i in range(insert_count)])
+
+    table_rows, table_cols = table_shape
+    table_data = [[f"{row}.{col}" for col in range(table_cols)] for row in range(table_rows)]
+
+    timings['bulk_setters'] = _time_call(bulk_setters, repeat)
+    timings['insert'] = _time_call(insert, repeat)
+    timings['build_table'] = _time_call(lambda: document.build_table_element(table_data), repeat)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'benchmark_output.docx')
+        timings['save'] = _time_call(lambda: document.save(output_path), repeat)
+
+    return {name: {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+            for name, runs in timings.items()}
+
+
+# 在新进程中测量导入耗时和读取路径(导入、打开、提取文本)的总耗时
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import docx_namespace
+imported = time.perf_counter()
+docx_namespace.DocxElementParser(sys.argv[1]).get_all_text()
+print(json.dumps([imported - start, time.perf_counter() - start]))
+"""
+
+
+def measure_startup(path, repeat=5):
+    """在新的Python进程中测量启动耗时
+
+    Args:
+        path: 用于读取路径测试的文档
+        repeat: 启动进程的次数
+
+    Returns:
+        dict: {'import': 导入docx_namespace的耗时, 'import_open_text': 导入、打开文档并提取全部文本的耗时}，
+              格式与run_operations的结果相同
+    """
+    timings = {'import': [], 'import_open_text': []}
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, path], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        import_seconds, total_seconds = json.loads(output.strip().splitlines()[-1])
+        timings['import'].append(import_seconds)
+        timings['import_open_text'].append(total_seconds)
+    return {name: {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+            for name, runs in timings.items()}
+
+
+def _git_revision():
+    """当前代码的git提交号，无法获取时返回None"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales=(1, 10, 100), repeat=3, source_dir=DEFAULT_SOURCE_DIR, work_dir=None):
+    """生成各倍数的合成文档并运行全部测试项
+
+    Args:
+        scales: 倍数列表
+        repeat: 每个测试项的重复次数
+        source_dir: 模板文档(解压后的docx)目录
+        work_dir: 存放合成文档的目录，None表示使用临时目录并在结束后删除
+
+    Returns:
+        dict: 包含'metadata'和'results'({'1x': {'document': 文档统计, 'operations': 计时结果}})，
+              启动耗时(见measure_startup)记录在results['startup']中
+    """
+    report = {
+        'metadata': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': repeat
+        },
+        'results': {}
+    }
+
+    with contextlib.ExitStack() as stack:
+        if work_dir is None:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(work_dir, exist_ok=True)
+        template_path = os.path.join(work_dir, 'template.docx')
+        pack_directory(source_dir, template_path)
+
+        print("测量启动耗时...", file=sys.stderr)
+        report['results']['startup'] = {
+            'document': {'scale': 1, 'bytes': os.path.getsize(template_path)},
+            'operations': measure_startup(template_path, max(repeat, 5))
+        }
+
+        for scale in scales:
+            path = os.path.join(work_dir, f"synthetic_{scale}x.docx")
+            print(f"生成{scale}倍合成文档...", file=sys.stderr)
+            document_info = build_synthetic_docx(template_path, scale, path)
+            print(f"运行{scale}倍测试({document_info['paragraphs']}个段落, {document_info['tables']}个表格, "
+                  f"{document_info['images']}张图片)...", file=sys.stderr)
+            report['results'][f"{scale}x"] = {
+                'document': document_info,
+                'operations': run_operations(path, repeat)
+            }
+    return report
+
+
+def print_report(report):
+    """以表格形式打印测试结果(各测试项的中位数耗时，单位毫秒)"""
+    startup = report['results'].get('startup')
+    if startup:
+        for name, timing in startup['operations'].items():
+            print(f"启动 {name}: {timing['median'] * 1000:.1f}")
+    scales = [scale for scale in report['results'] if scale != 'startup']
+    print(f"{'测试项':<18}" + ''.join(f"{scale:>14}" for scale in scales))
+    for name in OPERATIONS:
+        row = f"{name:<20}"
+        for scale in scales:
+            result = report['results'][scale]['operations'].get(name)
+            row += f"{result['median'] * 1000:>14.1f}" if result else f"{'-':>14}"
+        print(row)
+
+
+def compare_reports(baseline, current, threshold=0.1):
+    """比较两次测试结果的中位数耗时
+
+    Args:
+        baseline: 基准结果(run_benchmarks的返回值)
+        current: 当前结果
+        threshold: 耗时增加超过该比例视为性能回退
+
+    Returns:
+        list: 每个(倍数, 测试项)的比较结果，每项包含'scale'、'operation'、'baseline'、'current'、
+              'ratio'(当前/基准)和'regression'
+    """
+    rows = []
+    for scale, result in current['results'].items():
+        base_result = baseline['results'].get(scale)
+        if base_result is None:
+            continue
+        for name, timing in result['operations'].items():
+            base_timing = base_result['operations'].get(name)
+            if base_timing is None or base_timing['median'] <= 0:
+                continue
+            ratio = timing['median'] / base_timing['median']
+            rows.append({
+                'scale': scale,
+                'operation': name,
+                'baseline': base_timing['median'],
+                'current': timing['median'],
+                'ratio': ratio,
+                'regression': ratio > 1 + threshold
+            })
+    return rows
+
+
+def print_comparison(rows):
+    """打印比较结果，性能回退的测试项标记为'回退'，明显变快的标记为'提升'"""
+    print(f"{'倍数':<6}{'测试项':<18}{'基准(ms)':>12}{'当前(ms)':>12}{'比值':>8}")
+    for row in rows:
+        mark = '回退' if row['regression'] else ('提升' if row['ratio'] < 0.9 else '')
+        print(f"{row['scale']:<8}{row['operation']:<20}{row['baseline'] * 1000:>12.1f}"
+              f"{row['current'] * 1000:>12.1f}{row['ratio']:>9.2f}  {mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DocxElementParser性能基准测试')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='合成文档相对模板的倍数，默认为1 10 100')
+    parser.add_argument('--repeat', type=int, default=3, help='每个测试项的重复次数')
+    parser.add_argument('--source', default=DEFAULT_SOURCE_DIR, help='模板文档(解压后的docx)目录')
+    parser.add_argument('--work-dir', help='保留合成文档的目录，默认使用临时目录')
+    parser.add_argument('--output', help='将结果写入JSON文件')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='比较两个JSON结果文件，不运行测试')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='比较时耗时增加超过该比例视为回退，默认为0.1')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as f:
+                reports.append(json.load(f))
+        rows = compare_reports(reports[0], reports[1], args.threshold)
+        print_comparison(rows)
+        # 有性能回退时返回非零退出码，便于在CI中使用
+        return 1 if any(row['regression'] for row in rows) else 0
+
+    report = run_benchmarks(args.scales, args.repeat, args.source, args.work_dir)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
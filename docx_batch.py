@@ -0,0 +1,348 @@
+"""批量处理docx文件的命令行工具
+
+对目录或通配符匹配到的每个.docx文件执行一种操作，在多个工作进程中并行处理，
+每个文件有单独的超时时间，处理结果逐行写入JSON Lines日志。
+
+操作：
+    text: 将全部段落文本写入<输出目录>/<文件名>.txt
+    tables: 将全部表格导出到<输出目录>/<文件名>/(格式由--table-format指定)
+    images: 将全部图片及manifest.json提取到<输出目录>/<文件名>/
+    styles: 统计段落样式、对齐方式、字符样式和重复的直接格式，写入<输出目录>/<文件名>.styles.json
+    normalize: 合并属性相同的相邻文本运行(并移除rsid和proofErr)，保存到<输出目录>/<文件名>.docx，
+               指定--in-place时原子地保存回源文件
+
+用法：
+    python docx_batch.py text ./docs -o ./out
+    python docx_batch.py tables "corpus/**/*.docx" -o ./out --table-format csv --workers 8 --timeout 60
+    python docx_batch.py normalize ./docs --in-place --log normalize.jsonl
+"""
+import argparse
+import collections
+import glob
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+
+from docx_namespace import DocxElementParser
+
+
+OPERATIONS = ['text', 'tables', 'images', 'styles', 'normalize']
+
+
+def _operation_text(document, output_base, options):
+    output_path = output_base + '.txt'
+    text = '\n'.join(document.get_all_paragraphs_text())
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return {'output': output_path, 'paragraphs': len(document.paragraphs), 'characters': len(text)}
+
+
+def _operation_tables(document, output_base, options):
+    count = document.export_all_tables(output_base, format=options['table_format'])
+    return {'output': output_base, 'tables': len(document.tables), 'exported': count}
+
+
+def _operation_images(document, output_base, options):
+    count, _ = document.extract_images(output_base, max_workers=1)
+    return {'output': output_base, 'images': count}
+
+
+def _operation_styles(document, output_base, options):
+    w_ns = f"{{{document.NAMESPACES['w']}}}"
+    paragraph_styles = collections.Counter()
+    alignments = collections.Counter()
+    for paragraph in document.paragraphs:
+        style = document.extract_paragraph_style(paragraph['element'])
+        paragraph_styles[style['style_id'] or '(默认)'] += 1
+        alignments[style['alignment'] or '(默认)'] += 1
+    character_styles = collections.Counter(
+        r_style.get(f"{w_ns}val") for r_style in document.root.iter(f"{w_ns}rStyle"))
+    repeated = [{
+        'type': candidate['type'],
+        'base_style': candidate['base_style'],
+        'count': candidate['count'],
+        'properties': candidate['properties'],
+        'bytes': candidate['bytes']
+    } for candidate in document.analyze_repeated_formatting(min_count=options['min_repeat'])]
+
+    report = {
+        'paragraphs': len(document.paragraphs),
+        'paragraph_styles': dict(paragraph_styles.most_common()),
+        'alignments': dict(alignments.most_common()),
+        'character_styles': dict(character_styles.most_common()),
+        'repeated_formatting': repeated
+    }
+    output_path = output_base + '.styles.json'
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return {'output': output_path, 'paragraph_styles': len(paragraph_styles),
+            'repeated_formatting': len(repeated)}
+
+
+def _operation_normalize(document, output_base, options):
+    report = document.normalize_runs(strip_rsid=True, strip_proof_err=True)
+    if options['in_place']:
+        document.save_in_place()
+        output_path = document.path
+    else:
+        output_path = output_base + '.docx'
+        document.save(output_path)
+    report['output'] = output_path
+    return report
+
+
+OPERATION_FUNCTIONS = {
+    'text': _operation_text,
+    'tables': _operation_tables,
+    'images': _operation_images,
+    'styles': _operation_styles,
+    'normalize': _operation_normalize
+}
+
+
+def run_operation(operation, path, output_base, options):
+    """打开一个文档并执行操作(在工作进程中调用)
+
+    文档以严格模式打开，任何失败都以异常的形式报告。
+
+    Returns:
+        dict: 操作结果
+    """
+    document = DocxElementParser(path, strict=True)
+    return OPERATION_FUNCTIONS[operation](document, output_base, options)
+
+
+def _worker_main(conn):
+    """工作进程主循环：从管道接收任务，执行后发回结果，收到None时退出"""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        task_id, operation, path, output_base, options = task
+        start = time.perf_counter()
+        try:
+            result = run_operation(operation, path, output_base, options)
+            message = (task_id, 'ok', result, None, time.perf_counter() - start)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            detail = traceback.format_exc(limit=-3)
+            message = (task_id, 'error', None, {'message': error, 'traceback': detail},
+                       time.perf_counter() - start)
+        conn.send(message)
+
+
+class _Worker:
+    """一个工作进程及与它通信的管道"""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task = None
+        self.deadline = None
+
+    def submit(self, task, timeout):
+        self.task = task
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.conn.send(task)
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        self.process.join(5)
+        self.conn.close()
+
+
+def _remove_in_place_temp_files(task):
+    """删除被终止的工作进程在原地保存时留下的临时文件
+
+    save_in_place在源文件所在目录创建.<文件名>.XXXX.tmp，进程在替换源文件前被终止时它不会被删除。
+    """
+    _, _, path, _, options = task
+    if not options.get('in_place'):
+        return
+    directory, name = os.path.split(path)
+    for temp_path in glob.glob(os.path.join(glob.escape(directory), glob.escape(f".{name}.") + '*.tmp')):
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+
+
+def find_documents(inputs, recursive=False):
+    """展开输入的文件、目录和通配符为.docx文件列表(去重并保持顺序，跳过Word的~$临时文件)
+
+    Args:
+        inputs: 文件路径、目录或通配符模式的列表
+        recursive: 目录是否递归查找
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*.docx') if recursive else os.path.join(item, '*.docx')
+            matches = sorted(glob.glob(pattern, recursive=recursive))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        paths.extend(path for path in matches
+                     if path.lower().endswith('.docx') and not os.path.basename(path).startswith('~$'))
+    return list(dict.fromkeys(os.path.abspath(path) for path in paths))
+
+
+def _output_bases(paths, output_dir):
+    """为每个输入文件分配输出路径前缀，文件名重复时依次添加序号"""
+    used = collections.Counter()
+    bases = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        used[stem] += 1
+        name = stem if used[stem] == 1 else f"{stem}_{used[stem]}"
+        bases.append(os.path.join(output_dir, name))
+    return bases
+
+
+def run_batch(operation, paths, output_dir, options=None, workers=None, timeout=None, log_path=None,
+              progress=True):
+    """在工作进程池中对每个文档执行操作
+
+    每个工作进程依次处理多个文件；某个文件超时时终止处理它的进程并启动新的进程，
+    其他文件不受影响。工作进程异常退出时该文件记为失败。
+
+    Args:
+        operation: 操作名称，见OPERATIONS
+        paths: 文档路径列表
+        output_dir: 输出目录
+        options: 操作选项字典
+        workers: 工作进程数，None表示CPU核数
+        timeout: 每个文件的超时时间(秒)，None表示不限制；原地保存的文件超时被终止时，
+                 源文件保持不变，留下的临时文件会被删除
+        log_path: JSON Lines结果日志路径，None表示不写日志
+        progress: 是否向标准错误输出进度
+
+    Returns:
+        list: 每个文件的结果记录(与日志中的每一行相同)，按完成顺序排列
+    """
+    options = options or {}
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+    pending = collections.deque(
+        (task_id, operation, path, output_base, options)
+        for task_id, (path, output_base) in enumerate(zip(paths, _output_bases(paths, output_dir))))
+    total = len(pending)
+    records = []
+    context = multiprocessing.get_context()
+    pool = [_Worker(context) for _ in range(workers)] if paths else []
+    log_file = open(log_path, 'a', encoding='utf-8') if log_path else None
+    batch_start = time.perf_counter()
+
+    def finish(task, status, result=None, error=None, seconds=None):
+        record = {
+            'path': task[2],
+            'operation': operation,
+            'status': status,
+            'seconds': round(seconds, 4) if seconds is not None else None,
+            'result': result,
+            'error': error
+        }
+        records.append(record)
+        if log_file is not None:
+            log_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            log_file.flush()
+        if progress:
+            detail = f" {error['message']}" if error else ''
+            print(f"[{len(records)}/{total}] {status:<7} {task[2]} ({record['seconds']}s){detail}",
+                  file=sys.stderr)
+
+    try:
+        while pending or any(worker.task is not None for worker in pool):
+            for worker in pool:
+                if worker.task is None and pending:
+                    worker.submit(pending.popleft(), timeout)
+
+            busy = [worker for worker in pool if worker.task is not None]
+            deadlines = [worker.deadline for worker in busy if worker.deadline is not None]
+            wait_time = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            ready = multiprocessing.connection.wait([worker.conn for worker in busy], wait_time)
+
+            for index, worker in enumerate(pool):
+                if worker.task is None:
+                    continue
+                if worker.conn in ready:
+                    try:
+                        _, status, result, error, seconds = worker.conn.recv()
+                    except EOFError:
+                        # 工作进程异常退出(如内存不足被系统终止)
+                        worker.stop(kill=True)
+                        _remove_in_place_temp_files(worker.task)
+                        finish(worker.task, 'error', error={
+                            'message': f"工作进程异常退出，退出码{worker.process.exitcode}"})
+                        pool[index] = _Worker(context)
+                        continue
+                    task, worker.task, worker.deadline = worker.task, None, None
+                    finish(task, status, result, error, seconds)
+                elif worker.deadline is not None and time.monotonic() >= worker.deadline:
+                    worker.stop(kill=True)
+                    _remove_in_place_temp_files(worker.task)
+                    finish(worker.task, 'timeout', error={'message': f"超过{timeout}秒未完成"},
+                           seconds=timeout)
+                    pool[index] = _Worker(context)
+    finally:
+        for worker in pool:
+            worker.stop(kill=worker.task is not None)
+            if worker.task is not None:
+                _remove_in_place_temp_files(worker.task)
+        if log_file is not None:
+            log_file.close()
+
+    if progress:
+        failed = sum(1 for record in records if record['status'] != 'ok')
+        print(f"完成{total}个文件，失败{failed}个，耗时{time.perf_counter() - batch_start:.1f}秒",
+              file=sys.stderr)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量处理docx文件')
+    parser.add_argument('operation', choices=OPERATIONS, help='要执行的操作')
+    parser.add_argument('inputs', nargs='+', help='.docx文件、目录或通配符(如"corpus/**/*.docx")')
+    parser.add_argument('-o', '--output-dir', default='batch_output', help='输出目录，默认为batch_output')
+    parser.add_argument('-r', '--recursive', action='store_true', help='递归查找目录中的文件')
+    parser.add_argument('-w', '--workers', type=int, help='工作进程数，默认为CPU核数')
+    parser.add_argument('-t', '--timeout', type=float, help='每个文件的超时时间(秒)，默认不限制')
+    parser.add_argument('--log', help='JSON Lines结果日志路径，默认为<输出目录>/results.jsonl')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不输出进度')
+    parser.add_argument('--table-format', default='csv', choices=['xlsx', 'csv', 'tsv', 'parquet', 'arrow'],
+                        help='tables操作的导出格式，默认为csv')
+    parser.add_argument('--min-repeat', type=int, default=20,
+                        help='styles操作中重复的直接格式至少出现的次数，默认为20')
+    parser.add_argument('--in-place', action='store_true', help='normalize操作直接保存回源文件')
+    args = parser.parse_args(argv)
+
+    paths = find_documents(args.inputs, args.recursive)
+    if not paths:
+        print("没有找到.docx文件", file=sys.stderr)
+        return 1
+
+    options = {'table_format': args.table_format, 'min_repeat': args.min_repeat, 'in_place': args.in_place}
+    log_path = args.log or os.path.join(args.output_dir, 'results.jsonl')
+    records = run_batch(args.operation, paths, args.output_dir, options, workers=args.workers,
+                        timeout=args.timeout, log_path=log_path, progress=not args.quiet)
+    return 0 if all(record['status'] == 'ok' for record in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,18 +2,114 @@ import xml.etree.ElementTree as ET
 from io import BytesIO
 import re
 import os
-import shutil
-from docx_parser import DocxFile
-import traceback
-import xml.dom.minidom as minidom
-import xml.etree.ElementTree as ET
-import pandas as pd
-import time
-import os
-import uuid
-import base64
+import posixpath
 import time
-from PIL import Image
+import functools
+import gc
+import itertools
+import copy
+import hashlib
+import csv
+import json
+import queue
+import sys
+import threading
+import concurrent.futures
+# pandas、Pillow和asyncio导入较慢，只在用到它们的函数中按需导入
+from docx_parser import DocxFile, PerformanceStats, DocxError, DocxIndexError, configure_logging, logger
+
+
+def _optimize_image_task(task):
+    """在工作进程中优化单张图片(模块级函数，便于进程池序列化)
+
+    Args:
+        task: (文件名, 二进制内容, (目标宽像素, 目标高像素), JPEG质量, 是否允许转换为JPEG)
+
+    Returns:
+        dict: 处理结果，'data'为新内容(未变小时为None)，'extension'为新内容的扩展名
+    """
+    name, data, target_size, jpeg_quality, convert_to_jpeg = task
+    start_time = time.perf_counter()
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    result = {
+        'name': name,
+        'new_name': name,
+        'action': 'unchanged',
+        'size_before': None,
+        'size_after': None,
+        'bytes_before': len(data),
+        'bytes_after': len(data),
+        'seconds': 0.0,
+        'extension': extension,
+        'data': None
+    }
+
+    try:
+        from PIL import Image
+        img = Image.open(BytesIO(data))
+        if getattr(img, 'n_frames', 1) > 1:
+            # 多帧图片不处理
+            result['seconds'] = time.perf_counter() - start_time
+            return result
+        img.load()
+        result['size_before'] = result['size_after'] = img.size
+        actions = []
+
+        # 原样保留EXIF(含方向标记)和ICC颜色配置，像素不旋转
+        keep_info = {key: img.info[key] for key in ('exif', 'icc_profile') if img.info.get(key)}
+
+        # 缩小到显示所需的像素尺寸(保持宽高比，两个方向都不小于所需尺寸)
+        target_width, target_height = target_size
+        if img.getexif().get(0x0112) in (5, 6, 7, 8):
+            # EXIF方向为旋转90度时，存储的宽高与显示的宽高相反
+            target_width, target_height = target_height, target_width
+        scale = max(target_width / img.width, target_height / img.height)
+        if scale < 1:
+            new_size = (max(int(img.width * scale + 0.5), 1), max(int(img.height * scale + 0.5), 1))
+            if img.mode == 'P':
+                img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+            img = img.resize(new_size, Image.LANCZOS)
+            result['size_after'] = new_size
+            actions.append('resized')
+
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        candidates = []
+        if extension in ('jpg', 'jpeg'):
+            # JPEG重新编码是有损的，只在缩小后才重新编码
+            if actions:
+                rgb = img.convert('RGB') if img.mode not in ('RGB', 'L', 'CMYK') else img
+                buffer = BytesIO()
+                rgb.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True, **keep_info)
+                candidates.append((buffer.getvalue(), extension, 'recompressed'))
+        else:
+            buffer = BytesIO()
+            img.save(buffer, format='PNG', optimize=True, **keep_info)
+            candidates.append((buffer.getvalue(), 'png', 'recompressed' if extension == 'png' else 'converted'))
+            if convert_to_jpeg and not has_alpha:
+                buffer = BytesIO()
+                img.convert('RGB').save(buffer, format='JPEG', quality=jpeg_quality, optimize=True, **keep_info)
+                candidates.append((buffer.getvalue(), 'jpeg', 'converted'))
+
+        if not candidates:
+            result['seconds'] = time.perf_counter() - start_time
+            return result
+
+        new_data, new_extension, action = min(candidates, key=lambda candidate: len(candidate[0]))
+        if len(new_data) < len(data):
+            actions.append(action)
+            result['data'] = new_data
+            result['extension'] = new_extension
+            result['bytes_after'] = len(new_data)
+            result['action'] = '+'.join(actions)
+        else:
+            result['size_after'] = result['size_before']
+    except Exception as e:
+        result['action'] = f"error: {e}"
+
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+
 class DocxElementParser(DocxFile):
     """用于解析Word文档XML的类，提供对文档结构和内容的访问，继承自DocxFile"""
     
@@ -38,17 +134,21 @@ class DocxElementParser(DocxFile):
         'wpi': 'http://schemas.microsoft.com/office/word/2010/wordprocessingInk',
         'wne': 'http://schemas.microsoft.com/office/word/2006/wordml',
         'wps': 'http://schemas.microsoft.com/office/word/2010/wordprocessingShape',
-        'wpsCustomData': 'http://www.wps.cn/officeDocument/2013/wpsCustomData'
+        'wpsCustomData': 'http://www.wps.cn/officeDocument/2013/wpsCustomData',
+        'xml': 'http://www.w3.org/XML/1998/namespace'
     }
     
-    def __init__(self, path):
+    def __init__(self, path, dedupe_media=False, stats=None, strict=False):
         """初始化解析器
         
         Args:
             path: Word文档的文件路径
+            dedupe_media: 是否在加载时按内容哈希合并重复的媒体文件
+            stats: 性能统计，True或PerformanceStats对象表示启用(见DocxFile)
+            strict: 严格模式，操作失败时抛出DocxError/DocxIndexError而不是返回失败值
         """
         # 调用父类构造函数
-        super().__init__(path)
+        super().__init__(path, stats=stats, strict=strict)
         
         # 获取文档的XML树
         self.tree = self.parts["document"]
@@ -60,6 +160,12 @@ class DocxElementParser(DocxFile):
         self.tables = []
         self.sections = []
 
+        # 表格视图缓存(键为表格元素)
+        self._table_views = {}
+
+        # 媒体文件摘要缓存 {文件名: (内容, SHA-256摘要)}
+        self._media_digests = {}
+
         # 注册所有命名空间用于XPath查询
         for prefix, uri in self.NAMESPACES.items():
             ET.register_namespace(prefix, uri)
@@ -67,6 +173,9 @@ class DocxElementParser(DocxFile):
         # 解析文档结构
         self.get_structured_body_elements()
 
+        if dedupe_media:
+            self.deduplicate_media()
+
     def get_element(self):
         """通过ID获取特定元素
     
@@ -127,13 +236,12 @@ class DocxElementParser(DocxFile):
 
     def get_paragraph_text(self, paragraph):
         """提取段落中的所有文本内容"""
-        text_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}t")
-        return ''.join(elem.text or '' for elem in text_elements)
+        # iter()在C层遍历子树，比findall(".//w:t")的路径解析快得多
+        return ''.join(elem.text or '' for elem in paragraph.iter(f"{{{self.NAMESPACES['w']}}}t"))
 
     def get_all_text(self):
         """提取文档中的所有文本内容"""
-        text_elements = self.root.findall(f".//{{{self.NAMESPACES['w']}}}t")
-        return ''.join(elem.text or '' for elem in text_elements)
+        return ''.join(elem.text or '' for elem in self.root.iter(f"{{{self.NAMESPACES['w']}}}t"))
 
     def get_element_attributes(self, element):
         """获取元素的所有属性"""
@@ -153,6 +261,13 @@ class DocxElementParser(DocxFile):
             - preview: 内容预览
             - element: 原始XML元素对象
         """
+        with self._phase('index'):
+            self._index_body_elements()
+        if self.stats is not None:
+            self.stats.add('elements_indexed', len(self.elements))
+
+    def _index_body_elements(self):
+        """遍历body的直接子元素，重建元素列表"""
         body = self.root.find(f".//{{{self.NAMESPACES['w']}}}body")
 
         # 清空元素列表，避免重复调用时出现问题
@@ -196,6 +311,12 @@ class DocxElementParser(DocxFile):
             # 所有元素都添加到主元素列表
             self.elements.append(elem_info)
 
+        # 丢弃已从文档中删除或被替换的表格的视图
+        if self._table_views:
+            live_tables = {info['element'] for info in self.tables}
+            for table_element in [key for key in self._table_views if key not in live_tables]:
+                del self._table_views[table_element]
+
 
 
     def get_element_text(self, num):
@@ -228,65 +349,46 @@ class DocxElementParser(DocxFile):
         Returns:
             str: 格式化的表格内容
         """
-        result = []
-        # 找到所有表格行
-        rows = table_element.findall(f".//{{{self.NAMESPACES['w']}}}tr")
-        
-        for row in rows:
-            row_text = []
-            # 找到行中的所有单元格
-            cells = row.findall(f".//{{{self.NAMESPACES['w']}}}tc")
-            
-            for cell in cells:
-                # 找到单元格中的所有段落
-                paragraphs = cell.findall(f".//{{{self.NAMESPACES['w']}}}p")
-                cell_text = []
-                
-                for p in paragraphs:
-                    p_text = self.get_paragraph_text(p)
-                    if p_text.strip():
-                        cell_text.append(p_text)
-                
-                row_text.append("".join(cell_text))
-            
-            result.append(" | ".join(row_text))
-        
-        return "\n".join(result)
+        # 按网格解析，嵌套表格的内容不会混入外层单元格，合并单元格保持列对齐
+        grid = self._resolve_table_grid(table_element, separator='')
+        return "\n".join(" | ".join(row) for row in grid['values'])
 
-    def print_full_xml(self):
-        """打印整个XML文档的内容"""
+    def print_full_xml(self, start=None, end=None, max_chars=10000):
+        """格式化打印文档XML，可以只打印正文中的一段元素
+
+        格式化是惰性的，只处理实际打印的部分，因此查看大文档深处的段落也很快。
+
+        Args:
+            start: 起始元素索引(self.elements中的索引)，为None时打印整个文档
+            end: 结束元素索引(不含)，只指定end时打印前end个元素
+            max_chars: 最多打印的字符数，None表示不限制
+        """
         if self.tree is None:
-            print("没有可用的XML文档")
+            self._report_error("没有可用的XML文档")
             return
-            
 
-        
-        try:
-            # 将整个ElementTree转换为字符串
-            rough_string = ET.tostring(self.root, 'utf-8')
-            
-            # 使用minidom解析并格式化
-            reparsed = minidom.parseString(rough_string)
-            pretty_str = reparsed.toprettyxml(indent="  ")
-            
+        if start is None and end is None:
             print("=== XML文档的完整内容 ===")
-            print(pretty_str[:10000])
+            self.print_xml(self.root, max_chars=max_chars)
             print("=== XML文档结束 ===")
-            
-        except Exception as e:
-            print(f"打印XML时发生错误: {e}")
-            
-            # 尝试备用方法
-            print("尝试直接打印XML元素:")
-            print(ET.tostring(self.root, encoding='unicode'))
+            return
+
+        selected = self.elements[start or 0:end]
+        if not selected:
+            self._report_error(f"元素范围[{start}, {end})中没有元素(共{len(self.elements)}个元素)")
+            return
+        print(f"=== 元素{selected[0]['index']}到{selected[-1]['index']}的XML ===")
+        self.print_xml([info['element'] for info in selected], max_chars=max_chars)
+        print("=== XML文档结束 ===")
 
     def export_table_to_file(self, table_idx, file_path, format='xlsx'):
-        """将指定索引的表格导出为xlsx或csv文件
+        """将指定索引的表格导出为xlsx、csv、tsv、parquet或arrow文件
         
         Args:
             table_idx: self.tables中的表格索引
             file_path: 要保存的文件路径
-            format: 文件格式，'xlsx'或'csv'
+            format: 文件格式，'xlsx'、'csv'、'tsv'、'parquet'或'arrow'(Arrow IPC)，
+                    parquet/arrow会推断列类型并在元数据中记录来源文档、表格索引和表头检测结果
             
         Returns:
             bool: 是否成功导出
@@ -295,67 +397,180 @@ class DocxElementParser(DocxFile):
         
         # 检查索引是否有效
         if table_idx < 0 or table_idx >= len(self.tables):
-            print(f"错误：表格索引{table_idx}超出范围(0-{len(self.tables)-1})")
+            self._report_error(f"表格索引{table_idx}超出范围(0-{len(self.tables)-1})", DocxIndexError)
             return False
             
         # 获取表格元素
         table_element = self.tables[table_idx]['element']
         
-        # 提取表格数据为二维列表
-        table_data = []
-        rows = table_element.findall(f".//{{{self.NAMESPACES['w']}}}tr")
-        
-        for row in rows:
-            row_data = []
-            cells = row.findall(f".//{{{self.NAMESPACES['w']}}}tc")
-            
-            for cell in cells:
-                cell_text = ''
-                paragraphs = cell.findall(f".//{{{self.NAMESPACES['w']}}}p")
-                
-                for p in paragraphs:
-                    p_text = self.get_paragraph_text(p)
-                    if cell_text and p_text:
-                        cell_text += '\n' + p_text
-                    else:
-                        cell_text += p_text
-                        
-                row_data.append(cell_text)
-                
-            table_data.append(row_data)
-            
-        # 创建pandas DataFrame
-        df = pd.DataFrame(table_data)
-        
-        # 如果第一行看起来像表头，可以使用它作为列名
-        if len(table_data) > 1:
-            df.columns = df.iloc[0]
-            df = df[1:]
+        # 提取表格数据为二维列表(矩形网格，合并单元格覆盖的位置为空)
+        table_data = self._resolve_table_grid(table_element)['values']
             
         # 根据格式导出文件
         try:
             if format.lower() == 'xlsx':
+                df = self._table_data_to_dataframe(table_data)
                 df.to_excel(file_path, index=False)
-                print(f"表格已成功导出为Excel文件：{file_path}")
-            elif format.lower() == 'csv':
-                df.to_csv(file_path, index=False)
-                print(f"表格已成功导出为CSV文件：{file_path}")
+                logger.info("表格已成功导出为Excel文件：%s", file_path)
+            elif format.lower() in self.DELIMITED_FORMATS:
+                # csv/tsv直接逐行写出，不经过pandas
+                self._write_delimited_rows(file_path, table_data, self.DELIMITED_FORMATS[format.lower()])
+                logger.info("表格已成功导出为%s文件：%s", format.upper(), file_path)
+            elif format.lower() in self.COLUMNAR_FORMATS:
+                self._write_columnar_table(file_path, table_data, table_idx, format.lower())
+                logger.info("表格已成功导出为%s文件：%s", format.upper(), file_path)
             else:
-                print(f"不支持的文件格式：{format}，请使用'xlsx'或'csv'")
+                self._report_error(f"不支持的文件格式：{format}，请使用'xlsx'、'csv'、'tsv'、'parquet'或'arrow'")
                 return False
                 
             return True
             
         except Exception as e:
-            print(f"导出表格时发生错误：{e}")
+            self._report_error(f"导出表格时发生错误：{e}", exc=e)
+            return False
+
+    # 逐行写出的文本表格格式及其分隔符
+    DELIMITED_FORMATS = {'csv': ',', 'tsv': '\t'}
+
+    # 列式存储格式
+    COLUMNAR_FORMATS = ['parquet', 'arrow']
+
+    def _detect_table_header(self, table_data):
+        """判断表格第一行是否为表头
+
+        第一行的所有单元格都非空、互不相同且都不是数字，并且表格多于一行时视为表头。
+        """
+        if len(table_data) < 2 or not table_data[0]:
             return False
+        first_row = [value.strip() for value in table_data[0]]
+        if not all(first_row) or len(set(first_row)) != len(first_row):
+            return False
+        for value in first_row:
+            try:
+                float(value.replace(',', ''))
+                return False
+            except ValueError:
+                pass
+        return True
+
+    # 看起来像日期的文本：数字年月日(2024-01-05、1/5/2024、2024年1月5日)或带数字的英文月份(Jan 5, 2024)
+    _DATE_LIKE_PATTERN = (r'\d{1,4}\s*[-/.年]\s*\d{1,2}'
+                          r'|[A-Za-z]{3,}\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{2,4}'
+                          r'|\d{1,2}\s+[A-Za-z]{3,}\.?,?\s+\d{2,4}')
+
+    def _infer_column_types(self, df):
+        """按列向量化推断类型：整数、浮点数、日期时间，否则保持字符串
+
+        只有列中所有非空值都能转换时才改变该列的类型，空字符串视为缺失值。
+        以下情况保持字符串：含有前导零的值(如编号"007")、超出int64范围或无法用浮点数精确表示的整数，
+        以及不像日期的文本(如月份名称、"today"等单词也能被解析为日期)。
+        """
+        import pandas as pd
+
+        for column in df.columns:
+            series = df[column].astype('string').str.strip()
+            series = series.mask(series == '')
+            present = series.notna()
+            if not present.any():
+                continue
+
+            # 前导零有意义(编号、邮编等)，不转换为数字
+            has_leading_zero = series[present].str.match(r'[+-]?0\d').any()
+            numbers = pd.to_numeric(series.str.replace(',', '', regex=False), errors='coerce')
+            if not has_leading_zero and numbers[present].notna().all():
+                if (numbers[present] % 1 == 0).all():
+                    # 整数解析结果可以精确表示到int64上限，经过浮点数的只能精确到2**53
+                    limit = 2 ** 63 - 1 if numbers.dtype.kind in 'iu' else 2 ** 53
+                    if numbers[present].abs().max() > limit:
+                        df[column] = series
+                        continue
+                    try:
+                        df[column] = numbers.astype('Int64')
+                    except (OverflowError, TypeError, ValueError):
+                        df[column] = series
+                else:
+                    df[column] = numbers.astype('float64')
+                continue
+
+            if series[present].str.contains(self._DATE_LIKE_PATTERN, regex=True).all():
+                try:
+                    dates = pd.to_datetime(series, errors='coerce', format='mixed')
+                except (TypeError, ValueError):
+                    dates = None
+                if dates is not None and dates[present].notna().all():
+                    df[column] = dates
+                    continue
+
+            df[column] = series
+        return df
+
+    def _write_columnar_table(self, file_path, table_data, table_idx, format):
+        """将表格数据推断类型后写为Parquet或Arrow IPC文件，并在schema元数据中记录来源信息"""
+        import pandas as pd
+        import pyarrow as pa
+
+        header_detected = self._detect_table_header(table_data)
+        if header_detected:
+            columns, rows = table_data[0], table_data[1:]
+        else:
+            columns, rows = [], table_data
+
+        # 列名必须非空且唯一
+        col_count = len(table_data[0]) if table_data else 0
+        names = []
+        for i in range(col_count):
+            name = columns[i].strip() if i < len(columns) and columns[i].strip() else f"column_{i + 1}"
+            base, suffix = name, 2
+            while name in names:
+                name = f"{base}_{suffix}"
+                suffix += 1
+            names.append(name)
+
+        df = self._infer_column_types(pd.DataFrame(rows, columns=names))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({
+            b'source_document': os.path.abspath(self.path).encode('utf-8'),
+            b'table_index': str(table_idx).encode('utf-8'),
+            b'header_detected': str(header_detected).lower().encode('utf-8')
+        })
+        table = table.replace_schema_metadata(metadata)
+
+        if format == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, file_path)
+        else:
+            with pa.OSFile(file_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+    def _table_data_to_dataframe(self, table_data):
+        """将二维列表转换为DataFrame，多于一行时将第一行作为列名"""
+        import pandas as pd
+
+        df = pd.DataFrame(table_data)
+        
+        # 如果第一行看起来像表头，可以使用它作为列名
+        if len(table_data) > 1:
+            df.columns = df.iloc[0]
+            df = df[1:]
+        return df
+
+    def _write_delimited_rows(self, file_path, rows, delimiter):
+        """使用csv模块将行逐行写入文件"""
+        with open(file_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            for row in rows:
+                writer.writerow(row)
             
-    def export_all_tables(self, dir_path, format='xlsx'):
-        """将文档中的所有表格导出为xlsx或csv文件
+    def export_all_tables(self, dir_path, format='xlsx', single_workbook=False, workbook_name='tables.xlsx'):
+        """将文档中的所有表格导出为xlsx、csv、tsv、parquet或arrow文件
         
         Args:
             dir_path: 要保存表格的目录路径
-            format: 文件格式，'xlsx'或'csv'
+            format: 文件格式，'xlsx'、'csv'、'tsv'、'parquet'或'arrow'
+            single_workbook: 为True且格式为xlsx时，所有表格写入同一个工作簿(每个表格一个工作表)
+            workbook_name: single_workbook模式下工作簿的文件名
             
         Returns:
             int: 成功导出的表格数量
@@ -365,6 +580,9 @@ class DocxElementParser(DocxFile):
         # 确保目录存在
         if not os.path.exists(dir_path):
             os.makedirs(dir_path)
+
+        if single_workbook and format.lower() == 'xlsx':
+            return self.export_tables_to_workbook(os.path.join(dir_path, workbook_name))
             
         count = 0
         for i in range(len(self.tables)):
@@ -374,8 +592,121 @@ class DocxElementParser(DocxFile):
             if self.export_table_to_file(i, file_path, format):
                 count += 1
                 
-        print(f"已成功导出{count}个表格到{dir_path}目录")
+        logger.info("已成功导出%d个表格到%s目录", count, dir_path)
+        return count
+
+    def export_tables_to_workbook(self, file_path, table_indices=None, sheet_name_format='table_{index}'):
+        """通过同一个Excel写入器将多个表格写入一个xlsx工作簿，每个表格一个工作表
+
+        表格解析在后台线程中进行，与工作表的写入同时执行。
+
+        Args:
+            file_path: xlsx文件路径
+            table_indices: 要导出的表格索引列表，为None时导出全部表格；超出范围的索引会报告错误，
+                           非严格模式下跳过这些索引继续导出
+            sheet_name_format: 工作表名称格式，{index}为从1开始的表格序号；
+                               名称截断到31个字符，重复时依次添加序号
+
+        Returns:
+            int: 成功写入的表格数量
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            self._report_error("需要安装pandas库：pip install pandas openpyxl")
+            return 0
+
+        if table_indices is None:
+            table_indices = range(len(self.tables))
+        table_indices = list(table_indices)
+        invalid = [i for i in table_indices if not 0 <= i < len(self.tables)]
+        if invalid:
+            # 非严格模式下报告后继续导出其余表格
+            self._report_error(f"表格索引{invalid}超出范围(0-{len(self.tables)-1})", DocxIndexError)
+            table_indices = [i for i in table_indices if 0 <= i < len(self.tables)]
+
+        # 后台线程解析表格，队列有界以限制内存占用
+        grids = queue.Queue(maxsize=8)
+        # 写入结束(包括出错)后通知后台线程停止，避免它阻塞在已满的队列上
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    grids.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for table_idx in table_indices:
+                    if stop.is_set():
+                        return
+                    grid = self._resolve_table_grid(self.tables[table_idx]['element'])
+                    if not put((table_idx, grid['values'])):
+                        return
+            except Exception as e:
+                # 解析失败时把异常交给写入线程报告
+                put(e)
+            finally:
+                put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        count = 0
+        used_names = set()
+        error = None
+        try:
+            with pd.ExcelWriter(file_path) as writer:
+                while True:
+                    item = grids.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    table_idx, table_data = item
+                    sheet_name = self._unique_sheet_name(sheet_name_format.format(index=table_idx + 1), used_names)
+                    df = self._table_data_to_dataframe(table_data)
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
+                    count += 1
+        except Exception as e:
+            error = e
+        finally:
+            # 先让后台线程结束再报告错误(严格模式下报告错误会抛出异常)
+            stop.set()
+            producer.join()
+
+        if error is not None:
+            self._report_error(f"导出表格时发生错误：{error}", exc=error)
+            return count
+
+        logger.info("已成功导出%d个表格到%s", count, file_path)
         return count
+
+    def _unique_sheet_name(self, name, used_names):
+        """生成合法且不重复的Excel工作表名称
+
+        替换Excel不允许的字符，截断到31个字符；与已用名称重复(不区分大小写)时添加"_2"、"_3"等后缀。
+
+        Args:
+            name: 期望的名称
+            used_names: 已使用名称的小写集合，新名称会加入其中
+
+        Returns:
+            str: 工作表名称
+        """
+        # Excel工作表名称最长31个字符，不能包含[]:*?/\
+        name = re.sub(r'[\[\]:*?/\\]', '_', name).strip("'")[:31] or 'Sheet'
+        candidate, counter = name, 2
+        while candidate.lower() in used_names:
+            suffix = f"_{counter}"
+            candidate = name[:31 - len(suffix)] + suffix
+            counter += 1
+        used_names.add(candidate.lower())
+        return candidate
         
     def extract_images_simple(self, output_dir):
         """从文档中提取所有图片到指定目录（简化版）
@@ -398,7 +729,7 @@ class DocxElementParser(DocxFile):
         media_files = self.parts['media']
         
         if not media_files:
-            print("文档中没有找到媒体文件")
+            logger.info("文档中没有找到媒体文件")
             return 0, []
             
         # 遍历所有媒体文件并保存
@@ -419,11 +750,11 @@ class DocxElementParser(DocxFile):
                 
                 extracted_images.append(output_file)
                 count += 1
-                print(f"提取图片: {output_file}")
+                logger.debug("提取图片: %s", output_file)
             except Exception as e:
-                print(f"提取图片时出错: {e}")
+                logger.warning("提取图片时出错: %s", e, exc_info=e)
         
-        print(f"成功提取{count}张图片到{output_dir}目录")
+        logger.info("成功提取%d张图片到%s目录", count, output_dir)
         return count, extracted_images
     
     def count_images_simple(self):
@@ -433,7 +764,7 @@ class DocxElementParser(DocxFile):
             int: 文档中图片的数量
         """
         media_count = len(self.parts['media'])
-        print(f"文档中包含{media_count}个媒体文件")
+        logger.info("文档中包含%d个媒体文件", media_count)
         return media_count
 
     def extract_paragraph_style(self, paragraph_element):
@@ -1055,7 +1386,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if index < 0 or index >= len(self.elements):
-            print(f"错误：元素索引{index}超出范围(0-{len(self.elements)-1})")
+            self._report_error(f"元素索引{index}超出范围(0-{len(self.elements)-1})", DocxIndexError)
             return ""
             
         # 获取指定索引的元素
@@ -1086,7 +1417,7 @@ class DocxElementParser(DocxFile):
             """
             # 检查索引是否有效
             if index < 0 or index >= len(self.elements):
-                print(f"错误：元素索引{index}超出范围(0-{len(self.elements) - 1})")
+                self._report_error(f"元素索引{index}超出范围(0-{len(self.elements) - 1})", DocxIndexError)
                 return ""
 
             # 获取指定索引的元素
@@ -1115,7 +1446,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if index < 0 or index >= len(self.elements):
-            print(f"错误：元素索引{index}超出范围(0-{len(self.elements)-1})")
+            self._report_error(f"元素索引{index}超出范围(0-{len(self.elements)-1})", DocxIndexError)
             return []
             
         # 获取指定索引的元素
@@ -1178,7 +1509,7 @@ class DocxElementParser(DocxFile):
         # 获取文档关系数据
         relationships = self.parts['relationships']
         if relationships is None:
-            print("无法获取文档关系")
+            logger.warning("无法获取文档关系")
             return None, None
             
         # 在关系中查找指定ID
@@ -1191,7 +1522,7 @@ class DocxElementParser(DocxFile):
                 break
                 
         if not target_path:
-            print(f"未找到关系ID为 {relation_id} 的图片")
+            logger.warning("未找到关系ID为 %s 的图片", relation_id)
             return None, None
             
         # 处理路径格式
@@ -1208,7 +1539,7 @@ class DocxElementParser(DocxFile):
             if media_name == image_name:
                 return media_name, media_data
                 
-        print(f"未找到路径为 {target_path} 的图片")
+        logger.warning("未找到路径为 %s 的图片", target_path)
         return None, None
     
     def save_image_by_relation_id(self, relation_id, output_path):
@@ -1234,10 +1565,10 @@ class DocxElementParser(DocxFile):
                 with open(output_path, 'wb') as f:
                     f.write(image_data)
                     
-                print(f"已成功保存图片 {image_name} 到 {output_path}")
+                logger.info("已成功保存图片 %s 到 %s", image_name, output_path)
                 return True
             except Exception as e:
-                print(f"保存图片时出错: {e}")
+                self._report_error(f"保存图片时出错: {e}", exc=e)
         
         return False
     def element_to_dict(self,element_index,element_type="elements"):
@@ -1250,7 +1581,7 @@ class DocxElementParser(DocxFile):
             # 获取指定索引的元素
             element = self.elements[element_index]['element']
         else:
-            print(f"错误：元素类型{element_type}无效")
+            self._report_error(f"元素类型{element_type}无效")
             return {}
         return element
     def get_run_style(self, element_index, run_index,element_type="elements"):
@@ -1265,7 +1596,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查元素索引是否有效
         if element_index < 0 or element_index >= len(self.elements):
-            print(f"错误：元素索引{element_index}超出范围(0-{len(self.elements) - 1})")
+            self._report_error(f"元素索引{element_index}超出范围(0-{len(self.elements) - 1})", DocxIndexError)
             return {}
         element= self.element_to_dict(element_index, element_type)
         # 查找所有w:r元素
@@ -1273,7 +1604,7 @@ class DocxElementParser(DocxFile):
         
         # 检查Run索引是否有效
         if run_index < 0 or run_index >= len(r_elements):
-            print(f"错误：Run索引{run_index}超出范围(0-{len(r_elements)-1})")
+            self._report_error(f"Run索引{run_index}超出范围(0-{len(r_elements)-1})", DocxIndexError)
             return {}
             
         # 获取指定的Run元素
@@ -1401,7 +1732,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查元素索引是否有效
         if element_index < 0 or element_index >= len(self.elements):
-            print(f"错误：元素索引{element_index}超出范围(0-{len(self.elements)-1})")
+            self._report_error(f"元素索引{element_index}超出范围(0-{len(self.elements)-1})", DocxIndexError)
             return {'fonts': {}, 'description': '无法获取字体信息'}
 
         # 获取指定索引的元素
@@ -1412,7 +1743,7 @@ class DocxElementParser(DocxFile):
         
         # 检查Run索引是否有效
         if run_index < 0 or run_index >= len(r_elements):
-            print(f"错误：Run索引{run_index}超出范围(0-{len(r_elements)-1})")
+            self._report_error(f"Run索引{run_index}超出范围(0-{len(r_elements)-1})", DocxIndexError)
             return {'fonts': {}, 'description': '无法获取字体信息'}
             
         # 获取指定的Run元素
@@ -1458,7 +1789,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查元素索引是否有效
         if element_index < 0 or element_index >= len(self.elements):
-            print(f"错误：元素索引{element_index}超出范围(0-{len(self.elements)-1})")
+            self._report_error(f"元素索引{element_index}超出范围(0-{len(self.elements)-1})", DocxIndexError)
             return {'size': None, 'size_pt': None, 'description': '无法获取字号信息'}
             
         # 获取指定索引的元素
@@ -1469,7 +1800,7 @@ class DocxElementParser(DocxFile):
         
         # 检查Run索引是否有效
         if run_index < 0 or run_index >= len(r_elements):
-            print(f"错误：Run索引{run_index}超出范围(0-{len(r_elements)-1})")
+            self._report_error(f"Run索引{run_index}超出范围(0-{len(r_elements)-1})", DocxIndexError)
             return {'size': None, 'size_pt': None, 'description': '无法获取字号信息'}
             
         # 获取指定的Run元素
@@ -1507,7 +1838,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查元素索引是否有效
         if element_index < 0 or element_index >= len(self.elements):
-            print(f"错误：元素索引{element_index}超出范围(0-{len(self.elements)-1})")
+            self._report_error(f"元素索引{element_index}超出范围(0-{len(self.elements)-1})", DocxIndexError)
             return {'formatting': {}, 'description': []}
             
         # 获取指定索引的元素
@@ -1518,7 +1849,7 @@ class DocxElementParser(DocxFile):
         
         # 检查Run索引是否有效
         if run_index < 0 or run_index >= len(r_elements):
-            print(f"错误：Run索引{run_index}超出范围(0-{len(r_elements)-1})")
+            self._report_error(f"Run索引{run_index}超出范围(0-{len(r_elements)-1})", DocxIndexError)
             return {'formatting': {}, 'description': []}
             
         # 获取指定的Run元素
@@ -1623,7 +1954,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查元素索引是否有效
         if element_index < 0 or element_index >= len(self.elements):
-            print(f"错误：元素索引{element_index}超出范围(0-{len(self.elements)-1})")
+            self._report_error(f"元素索引{element_index}超出范围(0-{len(self.elements)-1})", DocxIndexError)
             return {'color': None, 'highlight': None, 'description': '无法获取颜色信息'}
             
         # 获取指定索引的元素
@@ -1634,7 +1965,7 @@ class DocxElementParser(DocxFile):
         
         # 检查Run索引是否有效
         if run_index < 0 or run_index >= len(r_elements):
-            print(f"错误：Run索引{run_index}超出范围(0-{len(r_elements)-1})")
+            self._report_error(f"Run索引{run_index}超出范围(0-{len(r_elements)-1})", DocxIndexError)
             return {'color': None, 'highlight': None, 'description': '无法获取颜色信息'}
             
         # 获取指定的Run元素
@@ -1808,7 +2139,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if table_index < 0 or table_index >= len(self.tables):
-            print(f"错误：表格索引{table_index}超出范围(0-{len(self.tables)-1})")
+            self._report_error(f"表格索引{table_index}超出范围(0-{len(self.tables)-1})", DocxIndexError)
             return {}
             
         # 获取表格元素
@@ -2095,29 +2426,37 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
             # 获取段落元素
             paragraph = self.paragraphs[para_index]['element']
             
-            # 获取或创建pPr元素
+            # 获取或创建pPr元素，设置样式ID
             pPr = self._get_or_create_pPr(paragraph)
-            
-            # 查找样式元素
-            pStyle = pPr.find(f".//{{{self.NAMESPACES['w']}}}pStyle")
-            if pStyle is None:
-                # 如果不存在，则创建
-                pStyle = ET.Element(f"{{{self.NAMESPACES['w']}}}pStyle")
-                pPr.append(pStyle)
-                
-            # 设置样式ID
-            pStyle.set(f"{{{self.NAMESPACES['w']}}}val", style_id)
+            self._set_pPr_style_id(pPr, style_id)
             return True
         except Exception as e:
-            print(f"设置段落样式ID时出错: {e}")
+            self._report_error(f"设置段落样式ID时出错: {e}", exc=e)
             return False
+
+    def _set_pPr_style_id(self, pPr, style_id):
+        """设置段落属性中的样式引用，w:pStyle不存在时作为第一个子元素插入(CT_PPr的规范顺序)
+
+        Args:
+            pPr: 段落属性元素
+            style_id: 样式ID
+
+        Returns:
+            Element: w:pStyle元素
+        """
+        pStyle = pPr.find(f"{{{self.NAMESPACES['w']}}}pStyle")
+        if pStyle is None:
+            pStyle = ET.Element(f"{{{self.NAMESPACES['w']}}}pStyle")
+            pPr.insert(0, pStyle)
+        pStyle.set(f"{{{self.NAMESPACES['w']}}}val", style_id)
+        return pStyle
             
     def set_paragraph_alignment(self, para_index, alignment):
         """设置段落对齐方式
@@ -2131,7 +2470,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2152,7 +2491,7 @@ class DocxElementParser(DocxFile):
             jc.set(f"{{{self.NAMESPACES['w']}}}val", alignment)
             return True
         except Exception as e:
-            print(f"设置段落对齐方式时出错: {e}")
+            self._report_error(f"设置段落对齐方式时出错: {e}", exc=e)
             return False
             
     def set_paragraph_indentation(self, para_index, **indentation):
@@ -2171,7 +2510,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2196,7 +2535,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落缩进时出错: {e}")
+            self._report_error(f"设置段落缩进时出错: {e}", exc=e)
             return False
             
     def set_paragraph_spacing(self, para_index, **spacing):
@@ -2215,7 +2554,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2240,7 +2579,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落间距时出错: {e}")
+            self._report_error(f"设置段落间距时出错: {e}", exc=e)
             return False
             
     def set_paragraph_borders(self, para_index, **borders):
@@ -2259,7 +2598,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2296,7 +2635,7 @@ class DocxElementParser(DocxFile):
                             
             return True
         except Exception as e:
-            print(f"设置段落边框时出错: {e}")
+            self._report_error(f"设置段落边框时出错: {e}", exc=e)
             return False
             
     def set_paragraph_shading(self, para_index, val=None, color=None, fill=None):
@@ -2313,7 +2652,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2342,7 +2681,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置段落背景填充时出错: {e}")
+            self._report_error(f"设置段落背景填充时出错: {e}", exc=e)
             return False
             
     def set_paragraph_numbering(self, para_index, num_id=None, level=None):
@@ -2358,7 +2697,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2393,7 +2732,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置段落编号时出错: {e}")
+            self._report_error(f"设置段落编号时出错: {e}", exc=e)
             return False
             
     def set_paragraph_font(self, para_index, **font_properties):
@@ -2417,7 +2756,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2499,7 +2838,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置段落字体属性时出错: {e}")
+            self._report_error(f"设置段落字体属性时出错: {e}", exc=e)
             return False
             
     def remove_paragraph_property(self, para_index, property_name):
@@ -2514,7 +2853,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2534,7 +2873,7 @@ class DocxElementParser(DocxFile):
             else:
                 return False  # 未找到要移除的属性
         except Exception as e:
-            print(f"移除段落属性时出错: {e}")
+            self._report_error(f"移除段落属性时出错: {e}", exc=e)
             return False
     
     def update_paragraph_style(self, para_index, **style_properties):
@@ -2557,7 +2896,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         success = True
@@ -2621,37 +2960,37 @@ class DocxElementParser(DocxFile):
         确保所有对XML树的修改都同步到self.parts["document"]中
         """
         try:
-            # 将修改后的XML树转换为字符串
-            xml_string = ET.tostring(self.root, encoding='utf-8')
-            
-            # 创建新的ElementTree对象
-            updated_tree = ET.ElementTree(ET.fromstring(xml_string))
-            
-            # 更新parts中的document
-            self.parts["document"] = updated_tree
-            print(1111111)
+            # 直接用当前根元素创建ElementTree，避免整篇文档序列化再解析的额外拷贝
+            self.parts["document"] = ET.ElementTree(self.root)
             
             return True
         except Exception as e:
-            print(f"更新文档XML时出错: {e}")
+            self._report_error(f"更新文档XML时出错: {e}", exc=e)
             return False
 
-    def save(self, output_path):
+    def save(self, output_path, collect_garbage=False, **save_options):
         """重写父类的save方法，确保在保存前更新文档XML
         
         Args:
             output_path: 输出文档的路径
+            collect_garbage: 是否在保存前删除无引用的媒体、嵌入对象和关系(见collect_orphan_parts)
+            **save_options: 传给DocxFile.save的选项(compression_level、store_media、fast、
+                            max_workers、parallel_threshold、deterministic)
             
         Returns:
             bool: 是否成功保存
         """
+        if collect_garbage:
+            with self._phase('collect_garbage'):
+                self.collect_orphan_parts()
+
         # 先确保XML树被更新到parts中
         if not self.update_document_xml():
-            print("更新文档XML失败，无法保存")
+            self._report_error("更新文档XML失败，无法保存")
             return False
             
         # 调用父类的save方法
-        return super().save(output_path)
+        return super().save(output_path, **save_options)
 
     def set_paragraph_runs_font(self, para_index, **font_properties):
         """修改段落中所有文本运行的字体属性
@@ -2665,7 +3004,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2675,7 +3014,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
             
             # 修改每个文本运行的字体属性
@@ -2727,7 +3066,7 @@ class DocxElementParser(DocxFile):
             
             return True
         except Exception as e:
-            print(f"修改段落文本运行字体时出错: {e}")
+            self._report_error(f"修改段落文本运行字体时出错: {e}", exc=e)
             return False
             
     def set_runs_bold(self, para_index, bold=True):
@@ -2742,7 +3081,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2752,7 +3091,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的加粗属性
@@ -2777,7 +3116,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行加粗格式时出错: {e}")
+            self._report_error(f"设置段落文本运行加粗格式时出错: {e}", exc=e)
             return False
             
     def set_runs_italic(self, para_index, italic=True):
@@ -2792,7 +3131,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2802,7 +3141,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的斜体属性
@@ -2827,7 +3166,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行斜体格式时出错: {e}")
+            self._report_error(f"设置段落文本运行斜体格式时出错: {e}", exc=e)
             return False
             
     def set_runs_underline(self, para_index, underline_type='single'):
@@ -2843,7 +3182,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2853,7 +3192,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的下划线属性
@@ -2879,7 +3218,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行下划线格式时出错: {e}")
+            self._report_error(f"设置段落文本运行下划线格式时出错: {e}", exc=e)
             return False
             
     def set_runs_color(self, para_index, color):
@@ -2894,7 +3233,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2904,7 +3243,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的颜色
@@ -2930,7 +3269,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行颜色时出错: {e}")
+            self._report_error(f"设置段落文本运行颜色时出错: {e}", exc=e)
             return False
             
     def set_runs_size(self, para_index, size):
@@ -2945,7 +3284,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -2955,7 +3294,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的字号
@@ -2981,7 +3320,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行字号时出错: {e}")
+            self._report_error(f"设置段落文本运行字号时出错: {e}", exc=e)
             return False
             
     def set_runs_highlight(self, para_index, highlight_color):
@@ -2996,7 +3335,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -3006,7 +3345,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的高亮颜色
@@ -3032,7 +3371,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行高亮颜色时出错: {e}")
+            self._report_error(f"设置段落文本运行高亮颜色时出错: {e}", exc=e)
             return False
             
     def set_runs_strike(self, para_index, strike=True):
@@ -3047,7 +3386,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -3057,7 +3396,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的删除线属性
@@ -3082,7 +3421,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行删除线格式时出错: {e}")
+            self._report_error(f"设置段落文本运行删除线格式时出错: {e}", exc=e)
             return False
             
     def set_runs_caps(self, para_index, caps=True):
@@ -3097,7 +3436,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -3107,7 +3446,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的大写属性
@@ -3132,7 +3471,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行大写格式时出错: {e}")
+            self._report_error(f"设置段落文本运行大写格式时出错: {e}", exc=e)
             return False
             
     def set_runs_vertical_alignment(self, para_index, alignment):
@@ -3147,7 +3486,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -3157,7 +3496,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 修改每个文本运行的垂直对齐方式
@@ -3183,7 +3522,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"设置段落文本运行垂直对齐方式时出错: {e}")
+            self._report_error(f"设置段落文本运行垂直对齐方式时出错: {e}", exc=e)
             return False
             
     def update_runs_style(self, para_index, **style_properties):
@@ -3208,7 +3547,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return False
             
         try:
@@ -3218,7 +3557,7 @@ class DocxElementParser(DocxFile):
             # 查找所有w:r元素
             r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
             if not r_elements:
-                print(f"段落{para_index}中没有找到文本运行")
+                logger.debug("段落%s中没有找到文本运行", para_index)
                 return False
                 
             # 对每个文本运行应用样式属性
@@ -3344,7 +3683,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"更新段落文本运行样式时出错: {e}")
+            self._report_error(f"更新段落文本运行样式时出错: {e}", exc=e)
             return False
 
     # 以下是修改单个文本运行的样式函数
@@ -3361,7 +3700,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查段落索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return None
             
         # 获取段落元素
@@ -3370,12 +3709,12 @@ class DocxElementParser(DocxFile):
         # 查找所有w:r元素
         r_elements = paragraph.findall(f".//{{{self.NAMESPACES['w']}}}r")
         if not r_elements:
-            print(f"段落{para_index}中没有找到文本运行")
+            logger.debug("段落%s中没有找到文本运行", para_index)
             return None
             
         # 检查文本运行索引是否有效
         if run_index < 0 or run_index >= len(r_elements):
-            print(f"错误：文本运行索引{run_index}超出范围(0-{len(r_elements)-1})")
+            self._report_error(f"文本运行索引{run_index}超出范围(0-{len(r_elements)-1})", DocxIndexError)
             return None
             
         # 返回特定的文本运行元素
@@ -3409,7 +3748,7 @@ class DocxElementParser(DocxFile):
         """
         # 检查段落索引是否有效
         if para_index < 0 or para_index >= len(self.paragraphs):
-            print(f"错误：段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})")
+            self._report_error(f"段落索引{para_index}超出范围(0-{len(self.paragraphs)-1})", DocxIndexError)
             return -1
             
         # 获取段落元素
@@ -3490,7 +3829,7 @@ class DocxElementParser(DocxFile):
                         
             return True
         except Exception as e:
-            print(f"设置文本运行字体时出错: {e}")
+            self._report_error(f"设置文本运行字体时出错: {e}", exc=e)
             return False
             
     def set_run_size(self, para_index, run_index, size):
@@ -3528,7 +3867,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行字号时出错: {e}")
+            self._report_error(f"设置文本运行字号时出错: {e}", exc=e)
             return False
             
     def set_run_bold(self, para_index, run_index, bold=True):
@@ -3565,7 +3904,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行加粗格式时出错: {e}")
+            self._report_error(f"设置文本运行加粗格式时出错: {e}", exc=e)
             return False
             
     def set_run_italic(self, para_index, run_index, italic=True):
@@ -3602,7 +3941,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行斜体格式时出错: {e}")
+            self._report_error(f"设置文本运行斜体格式时出错: {e}", exc=e)
             return False
             
     def set_run_underline(self, para_index, run_index, underline_type='single'):
@@ -3641,7 +3980,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行下划线格式时出错: {e}")
+            self._report_error(f"设置文本运行下划线格式时出错: {e}", exc=e)
             return False
             
     def set_run_color(self, para_index, run_index, color):
@@ -3679,7 +4018,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行颜色时出错: {e}")
+            self._report_error(f"设置文本运行颜色时出错: {e}", exc=e)
             return False
             
     def set_run_highlight(self, para_index, run_index, highlight_color):
@@ -3717,7 +4056,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行高亮颜色时出错: {e}")
+            self._report_error(f"设置文本运行高亮颜色时出错: {e}", exc=e)
             return False
             
     def set_run_strike(self, para_index, run_index, strike=True):
@@ -3754,7 +4093,7 @@ class DocxElementParser(DocxFile):
                 
             return True
         except Exception as e:
-            print(f"设置文本运行删除线格式时出错: {e}")
+            self._report_error(f"设置文本运行删除线格式时出错: {e}", exc=e)
             return False
             
     def update_run_style(self, para_index, run_index, **style_properties):
@@ -3877,7 +4216,7 @@ class DocxElementParser(DocxFile):
                     
             return True
         except Exception as e:
-            print(f"更新文本运行样式时出错: {e}")
+            self._report_error(f"更新文本运行样式时出错: {e}", exc=e)
             return False
             
     def insert_paragraph(self, element_index=-1, position='after', text='', **style_properties):
@@ -3907,125 +4246,26 @@ class DocxElementParser(DocxFile):
             
         # 检查索引是否有效
         if element_index < 0 or element_index >= elements_count:
-            print(f"错误：元素索引{element_index}超出范围(0-{elements_count-1})")
+            self._report_error(f"元素索引{element_index}超出范围(0-{elements_count-1})", DocxIndexError)
             return -1
             
         try:
             # 获取目标元素
             target_element = self.elements[element_index]['element']
             
-            # 创建新段落元素
-            new_para = ET.Element(f"{{{self.NAMESPACES['w']}}}p")
-            
             # 创建段落ID (w14:paraId)
-            try:
-                # 检查目标元素是否有段落ID
-                para_id_attr = f"{{{self.NAMESPACES['w14']}}}paraId"
-                if para_id_attr in target_element.attrib:
-                    # 生成新的段落ID (使用时间戳)
-
-                    para_id = hex(int(time.time() * 1000))[2:].upper()
-                    new_para.set(para_id_attr, para_id)
-            except:
-                # 如果无法设置段落ID，继续执行
-                pass
-            
-            # 创建段落属性元素(如果有样式属性)
-            if any(key in style_properties for key in ['style_id', 'alignment', 'indentation', 'spacing']):
-                pPr = ET.SubElement(new_para, f"{{{self.NAMESPACES['w']}}}pPr")
-                
-                # 设置样式ID
-                if 'style_id' in style_properties:
-                    pStyle = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}pStyle")
-                    pStyle.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['style_id'])
-                    
-                # 设置对齐方式
-                if 'alignment' in style_properties:
-                    jc = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}jc")
-                    jc.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['alignment'])
-                    
-                # 设置缩进
-                if 'indentation' in style_properties and isinstance(style_properties['indentation'], dict):
-                    ind = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}ind")
-                    for ind_type, value in style_properties['indentation'].items():
-                        ind.set(f"{{{self.NAMESPACES['w']}}}{ind_type}", str(value))
-                        
-                # 设置间距
-                if 'spacing' in style_properties and isinstance(style_properties['spacing'], dict):
-                    spacing = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}spacing")
-                    for spacing_type, value in style_properties['spacing'].items():
-                        spacing.set(f"{{{self.NAMESPACES['w']}}}{spacing_type}", str(value))
-                        
-                # 设置段落级别的字体属性
-                if any(key in style_properties for key in ['font', 'size', 'bold', 'color']):
-                    rPr = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}rPr")
-                    
-                    # 字体
-                    if 'font' in style_properties and isinstance(style_properties['font'], dict):
-                        font = style_properties['font']
-                        if any(font_type in font for font_type in ['ascii', 'hAnsi', 'eastAsia', 'cs']):
-                            rFonts = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}rFonts")
-                            for font_type, font_name in font.items():
-                                rFonts.set(f"{{{self.NAMESPACES['w']}}}{font_type}", font_name)
-                                
-                    # 字号
-                    if 'size' in style_properties:
-                        sz = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}sz")
-                        sz.set(f"{{{self.NAMESPACES['w']}}}val", str(style_properties['size']))
-                        
-                    # 加粗
-                    if 'bold' in style_properties and style_properties['bold']:
-                        b = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}b")
-                        b.set(f"{{{self.NAMESPACES['w']}}}val", "true")
-                        
-                    # 颜色
-                    if 'color' in style_properties:
-                        color = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}color")
-                        color.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['color'])
-            
-            # 创建文本运行元素
-            if text:
-                r = ET.SubElement(new_para, f"{{{self.NAMESPACES['w']}}}r")
-                
-                # 如果有运行级样式属性
-                if any(key in style_properties for key in ['font', 'size', 'bold', 'color']):
-                    rPr = ET.SubElement(r, f"{{{self.NAMESPACES['w']}}}rPr")
-                    
-                    # 字体
-                    if 'font' in style_properties and isinstance(style_properties['font'], dict):
-                        font = style_properties['font']
-                        if any(font_type in font for font_type in ['ascii', 'hAnsi', 'eastAsia', 'cs']):
-                            rFonts = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}rFonts")
-                            for font_type, font_name in font.items():
-                                rFonts.set(f"{{{self.NAMESPACES['w']}}}{font_type}", font_name)
-                                
-                    # 字号
-                    if 'size' in style_properties:
-                        sz = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}sz")
-                        sz.set(f"{{{self.NAMESPACES['w']}}}val", str(style_properties['size']))
-                        
-                    # 加粗
-                    if 'bold' in style_properties and style_properties['bold']:
-                        b = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}b")
-                        b.set(f"{{{self.NAMESPACES['w']}}}val", "true")
-                        
-                    # 颜色
-                    if 'color' in style_properties:
-                        color = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}color")
-                        color.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['color'])
-                
-                # 添加文本
-                t = ET.SubElement(r, f"{{{self.NAMESPACES['w']}}}t")
-                # 如果文本包含空格或特殊字符，设置xml:space="preserve"
-                if text.startswith(' ') or text.endswith(' ') or '  ' in text:
-                    t.set(f"{{{self.NAMESPACES['xml']}}}space", "preserve")
-                t.text = text
-            
+            para_id = None
+            if f"{{{self.NAMESPACES['w14']}}}paraId" in target_element.attrib:
+                para_id = self._allocate_para_ids(1)[0]
+
+            # 创建新段落元素
+            new_para = self._build_paragraph_element(text, para_id=para_id, **style_properties)
+
             # 直接在文档树中插入新段落
             # 获取文档体(body)
             body = self.root.find(f".//{{{self.NAMESPACES['w']}}}body")
             if body is None:
-                print("错误：无法找到文档体(body)元素")
+                self._report_error("无法找到文档体(body)元素")
                 return -1
                 
             # 查找目标元素在body中的位置
@@ -4045,7 +4285,7 @@ class DocxElementParser(DocxFile):
                     target_index = target_info['index']
                     
             if target_index == -1:
-                print("错误：无法在文档树中定位目标元素")
+                self._report_error("无法在文档树中定位目标元素")
                 return -1
                 
             # 根据position参数插入段落
@@ -4059,107 +4299,337 @@ class DocxElementParser(DocxFile):
             
             # 查找插入的段落在self.paragraphs中的索引
             for i, para in enumerate(self.paragraphs):
-                # 由于ElementTree不保证对象相等比较有效，使用XML字符串比较
-                if self._elements_equal(para['element'], new_para):
+                if para['element'] is new_para:
                     return i
                     
             # 如果找不到插入的段落，说明something happened
-            print("警告：段落已插入，但无法在self.paragraphs中找到")
+            logger.warning("段落已插入，但无法在self.paragraphs中找到")
             return -1
             
         except Exception as e:
 
-            print(f"插入段落时出错: {e}")
-            traceback.print_exc()
+            self._report_error(f"插入段落时出错: {e}", exc=e)
             return -1
             
-    def _elements_equal(self, elem1, elem2):
-        """比较两个XML元素是否相等（内容相同）
-        
+    def insert_paragraphs(self, element_index, items, position='after'):
+        """在文档中批量插入多个段落(或其他块级元素)
+
+        与多次调用insert_paragraph相比，所有新元素一次性插入body，
+        段落ID批量分配保证不重复，元素索引也只重建一次。
+
         Args:
-            elem1: 第一个XML元素
-            elem2: 第二个XML元素
-            
+            element_index: self.elements中的锚点元素索引，支持负索引
+            items: 要插入的内容序列，每一项可以是：
+                str: 段落文本
+                dict: 包含'text'键和insert_paragraph支持的样式属性键
+                Element: 预先构建好的XML元素(如w:p、w:tbl)，原样插入
+            position: 插入位置，'before'表示在锚点元素前插入，'after'表示在锚点元素后插入
+
         Returns:
-            bool: 如果元素相等返回True，否则返回False
+            list: 新元素在self.elements中的索引列表，失败则返回空列表
         """
+        # 处理负索引
+        elements_count = len(self.elements)
+        if element_index < 0:
+            element_index = elements_count + element_index
+
+        # 检查索引是否有效
+        if element_index < 0 or element_index >= elements_count:
+            self._report_error(f"元素索引{element_index}超出范围(0-{elements_count-1})", DocxIndexError)
+            return []
+
+        items = list(items)
+        if not items:
+            return []
+
         try:
-            # 比较标签
-            if elem1.tag != elem2.tag:
-                return False
-                
-            # 比较属性
-            if elem1.attrib != elem2.attrib:
-                return False
-                
-            # 比较文本内容
-            if (elem1.text or "").strip() != (elem2.text or "").strip():
-                return False
-                
-            # 比较尾部文本
-            if (elem1.tail or "").strip() != (elem2.tail or "").strip():
-                return False
-                
-            # 比较子元素数量
-            if len(elem1) != len(elem2):
-                return False
-                
-            # 递归比较子元素
-            for child1, child2 in zip(elem1, elem2):
-                if not self._elements_equal(child1, child2):
-                    return False
-                    
-            return True
-        except:
-            return False
+            body = self.root.find(f".//{{{self.NAMESPACES['w']}}}body")
+            if body is None:
+                self._report_error("无法找到文档体(body)元素")
+                return []
+
+            # 优先使用索引信息定位锚点元素，失败时再遍历body查找
+            target_element = self.elements[element_index]['element']
+            target_index = self.elements[element_index]['index']
+            if target_index >= len(body) or body[target_index] is not target_element:
+                target_index = -1
+                for i, child in enumerate(body):
+                    if child is target_element:
+                        target_index = i
+                        break
+            if target_index == -1:
+                self._report_error("无法在文档树中定位目标元素")
+                return []
+
+            # 统计需要分配ID的段落数量，文档使用paraId时才分配
+            para_tag = f"{{{self.NAMESPACES['w']}}}p"
+            para_id_attr = f"{{{self.NAMESPACES['w14']}}}paraId"
+            uses_para_id = para_id_attr in target_element.attrib or any(
+                para_id_attr in p['element'].attrib for p in self.paragraphs
+            )
+            para_ids = []
+            if uses_para_id:
+                needed = sum(
+                    1 for item in items
+                    if not isinstance(item, ET.Element)
+                    or (item.tag == para_tag and para_id_attr not in item.attrib)
+                )
+                para_ids = self._allocate_para_ids(needed)
+            para_ids = iter(para_ids)
+
+            with self._phase('insert', count=len(items)):
+                # 构建所有新元素
+                new_elements = []
+                for item in items:
+                    if isinstance(item, ET.Element):
+                        if uses_para_id and item.tag == para_tag and para_id_attr not in item.attrib:
+                            item.set(para_id_attr, next(para_ids))
+                        new_elements.append(item)
+                    elif isinstance(item, dict):
+                        style_properties = dict(item)
+                        text = style_properties.pop('text', '')
+                        new_elements.append(self._build_paragraph_element(
+                            text, para_id=next(para_ids, None), **style_properties))
+                    else:
+                        new_elements.append(self._build_paragraph_element(
+                            str(item), para_id=next(para_ids, None)))
+
+                # 一次性插入body
+                insert_at = target_index if position.lower() == 'before' else target_index + 1
+                body[insert_at:insert_at] = new_elements
+
+            # 重新解析文档结构，只更新一次
+            self.get_structured_body_elements()
+
+            # self.elements与body子元素一一对应，新元素的索引是连续的
+            return list(range(insert_at, insert_at + len(new_elements)))
+
+        except Exception as e:
+            self._report_error(f"批量插入段落时出错: {e}", exc=e)
+            return []
+
+    def _build_paragraph_element(self, text='', para_id=None, **style_properties):
+        """根据文本和样式属性创建新的段落元素(不插入文档)
 
-    def insert_image(self, para_index, run_index=-1, position='after', image_path='', 
-                     width=None, height=None, description=None):
-        """在文档中指定位置插入图片
-        
         Args:
-            para_index: self.elements或self.paragraphs中的段落索引
-            run_index: 段落中文本运行的索引，-1表示段落末尾
-            position: 插入位置，'before'表示在运行前插入，'after'表示在运行后插入
-            image_path: 图片文件的路径
-            width: 图片宽度(厘米)，不指定则使用原始大小
-            height: 图片高度(厘米)，不指定则使用原始大小
-            description: 图片描述
-            
+            text: 段落文本
+            para_id: 段落ID(w14:paraId)，为None时不设置
+            **style_properties: 段落样式属性，与insert_paragraph相同
+
         Returns:
-            str: 新创建的图片关系ID，失败则返回None
+            Element: 新创建的w:p元素
+        """
+        new_para = ET.Element(f"{{{self.NAMESPACES['w']}}}p")
+        if para_id:
+            new_para.set(f"{{{self.NAMESPACES['w14']}}}paraId", para_id)
+
+        # 创建段落属性元素(如果有样式属性)
+        if any(key in style_properties for key in ['style_id', 'alignment', 'indentation', 'spacing']):
+            pPr = ET.SubElement(new_para, f"{{{self.NAMESPACES['w']}}}pPr")
+            
+            # 设置样式ID
+            if 'style_id' in style_properties:
+                pStyle = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}pStyle")
+                pStyle.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['style_id'])
+                
+            # 设置对齐方式
+            if 'alignment' in style_properties:
+                jc = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}jc")
+                jc.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['alignment'])
+                
+            # 设置缩进
+            if 'indentation' in style_properties and isinstance(style_properties['indentation'], dict):
+                ind = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}ind")
+                for ind_type, value in style_properties['indentation'].items():
+                    ind.set(f"{{{self.NAMESPACES['w']}}}{ind_type}", str(value))
+                    
+            # 设置间距
+            if 'spacing' in style_properties and isinstance(style_properties['spacing'], dict):
+                spacing = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}spacing")
+                for spacing_type, value in style_properties['spacing'].items():
+                    spacing.set(f"{{{self.NAMESPACES['w']}}}{spacing_type}", str(value))
+                    
+            # 设置段落级别的字体属性
+            if any(key in style_properties for key in ['font', 'size', 'bold', 'color']):
+                rPr = ET.SubElement(pPr, f"{{{self.NAMESPACES['w']}}}rPr")
+                
+                # 字体
+                if 'font' in style_properties and isinstance(style_properties['font'], dict):
+                    font = style_properties['font']
+                    if any(font_type in font for font_type in ['ascii', 'hAnsi', 'eastAsia', 'cs']):
+                        rFonts = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}rFonts")
+                        for font_type, font_name in font.items():
+                            rFonts.set(f"{{{self.NAMESPACES['w']}}}{font_type}", font_name)
+                            
+                # 字号
+                if 'size' in style_properties:
+                    sz = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}sz")
+                    sz.set(f"{{{self.NAMESPACES['w']}}}val", str(style_properties['size']))
+                    
+                # 加粗
+                if 'bold' in style_properties and style_properties['bold']:
+                    b = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}b")
+                    b.set(f"{{{self.NAMESPACES['w']}}}val", "true")
+                    
+                # 颜色
+                if 'color' in style_properties:
+                    color = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}color")
+                    color.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['color'])
+        
+        # 创建文本运行元素
+        if text:
+            r = ET.SubElement(new_para, f"{{{self.NAMESPACES['w']}}}r")
+            
+            # 如果有运行级样式属性
+            if any(key in style_properties for key in ['font', 'size', 'bold', 'color']):
+                rPr = ET.SubElement(r, f"{{{self.NAMESPACES['w']}}}rPr")
+                
+                # 字体
+                if 'font' in style_properties and isinstance(style_properties['font'], dict):
+                    font = style_properties['font']
+                    if any(font_type in font for font_type in ['ascii', 'hAnsi', 'eastAsia', 'cs']):
+                        rFonts = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}rFonts")
+                        for font_type, font_name in font.items():
+                            rFonts.set(f"{{{self.NAMESPACES['w']}}}{font_type}", font_name)
+                            
+                # 字号
+                if 'size' in style_properties:
+                    sz = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}sz")
+                    sz.set(f"{{{self.NAMESPACES['w']}}}val", str(style_properties['size']))
+                    
+                # 加粗
+                if 'bold' in style_properties and style_properties['bold']:
+                    b = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}b")
+                    b.set(f"{{{self.NAMESPACES['w']}}}val", "true")
+                    
+                # 颜色
+                if 'color' in style_properties:
+                    color = ET.SubElement(rPr, f"{{{self.NAMESPACES['w']}}}color")
+                    color.set(f"{{{self.NAMESPACES['w']}}}val", style_properties['color'])
+            
+            # 添加文本
+            t = ET.SubElement(r, f"{{{self.NAMESPACES['w']}}}t")
+            # 如果文本包含空格或特殊字符，设置xml:space="preserve"
+            if text.startswith(' ') or text.endswith(' ') or '  ' in text:
+                t.set(f"{{{self.NAMESPACES['xml']}}}space", "preserve")
+            t.text = text
+
+        return new_para
+
+    def _allocate_para_ids(self, count):
+        """批量分配文档中不重复的段落ID(w14:paraId)
+
+        paraId在整个文档包内唯一，已用ID从正文、页眉、页脚、脚注、尾注和批注中收集
+        (包括表格行w:tr上的paraId)。
+
+        Args:
+            count: 需要分配的ID数量
+
+        Returns:
+            list: 8位十六进制的段落ID字符串列表
+        """
+        para_id_attr = f"{{{self.NAMESPACES['w14']}}}paraId"
+        roots = [root for _, root in self._iter_story_parts()]
+        comments = self.parts['other'].get('word/comments.xml')
+        if isinstance(comments, ET.ElementTree):
+            roots.append(comments.getroot())
+
+        used_ids = set()
+        for root in roots:
+            for element in root.iter():
+                value = element.get(para_id_attr)
+                if value:
+                    try:
+                        used_ids.add(int(value, 16))
+                    except ValueError:
+                        pass
+
+        # paraId必须小于0x80000000，从现有最大ID之后开始顺序分配
+        para_ids = []
+        candidate = max(used_ids) + 1 if used_ids else 1
+        while len(para_ids) < count:
+            if candidate >= 0x80000000:
+                candidate = 1
+            if candidate not in used_ids:
+                used_ids.add(candidate)
+                para_ids.append(f"{candidate:08X}")
+            candidate += 1
+        return para_ids
+
+    def _elements_equal(self, elem1, elem2):
+        """比较两个XML元素是否相等（内容相同）
+        
+        Args:
+            elem1: 第一个XML元素
+            elem2: 第二个XML元素
+            
+        Returns:
+            bool: 如果元素相等返回True，否则返回False
         """
+        try:
+            # 比较标签
+            if elem1.tag != elem2.tag:
+                return False
+                
+            # 比较属性
+            if elem1.attrib != elem2.attrib:
+                return False
+                
+            # 比较文本内容
+            if (elem1.text or "").strip() != (elem2.text or "").strip():
+                return False
+                
+            # 比较尾部文本
+            if (elem1.tail or "").strip() != (elem2.tail or "").strip():
+                return False
+                
+            # 比较子元素数量
+            if len(elem1) != len(elem2):
+                return False
+                
+            # 递归比较子元素
+            for child1, child2 in zip(elem1, elem2):
+                if not self._elements_equal(child1, child2):
+                    return False
+                    
+            return True
+        except:
+            return False
 
+    def insert_image(self, para_index, run_index=-1, position='after', image_path='', 
+                     width=None, height=None, description=None):
+        """在文档中指定位置插入图片
         
+        Args:
+            para_index: self.elements或self.paragraphs中的段落索引
+            run_index: 段落中文本运行的索引，-1表示段落末尾
+            position: 插入位置，'before'表示在运行前插入，'after'表示在运行后插入
+            image_path: 图片文件的路径
+            width: 图片宽度(厘米)，不指定则使用原始大小
+            height: 图片高度(厘米)，不指定则使用原始大小
+            description: 图片描述
+            
+        Returns:
+            str: 新创建的图片关系ID，失败则返回None
+        """
+        # 先检查关系文件，避免添加媒体文件后才发现无法建立关系
+        if self.parts.get('relationships') is None:
+            self._report_error("找不到document.xml.rels文件")
+            return None
+
         # 检查图片文件是否存在
         if not os.path.exists(image_path):
-            print(f"错误：图片文件 {image_path} 不存在")
+            self._report_error(f"图片文件 {image_path} 不存在")
             return None
             
-        # 获取图片信息
+        # 读取图片文件，只读取一次，尺寸从文件头解析
         try:
-            img = Image.open(image_path)
-            img_format = img.format.lower()
-            img_width, img_height = img.size
-            
-            # 如果没有指定宽高，使用原始尺寸（转换为EMU单位，1厘米=360000 EMU）
-            if width is None:
-                # 默认分辨率为96 DPI，即96像素/英寸
-                # 1英寸 = 2.54厘米，所以1厘米 = 96/2.54 像素
-                # 因此，像素到厘米的转换：厘米 = 像素 * 2.54 / 96
-                width_cm = img_width * 2.54 / 96
-                width_emu = int(width_cm * 360000)
-            else:
-                width_emu = int(width * 360000)
-                
-            if height is None:
-                height_cm = img_height * 2.54 / 96
-                height_emu = int(height_cm * 360000)
-            else:
-                height_emu = int(height * 360000)
-                
+            with open(image_path, 'rb') as img_file:
+                img_data = img_file.read()
+            img_width, img_height = self._read_image_size(img_data)
+            width_emu, height_emu = self._image_extent_emu(img_width, img_height, width, height)
         except Exception as e:
-            print(f"获取图片信息时出错: {e}")
+            self._report_error(f"获取图片信息时出错: {e}", exc=e)
             return None
             
         # 处理索引为paragraphs索引还是elements索引
@@ -4178,13 +4648,13 @@ class DocxElementParser(DocxFile):
                     if para_index >= 0 and para_index < elements_count and self.elements[para_index]['type'] == 'paragraph':
                         paragraph = self.elements[para_index]['element']
                     else:
-                        print(f"错误：索引{para_index}不是有效的段落索引")
+                        self._report_error(f"索引{para_index}不是有效的段落索引", DocxIndexError)
                         return None
                 else:
-                    print(f"错误：索引{para_index}不是有效的段落索引")
+                    self._report_error(f"索引{para_index}不是有效的段落索引", DocxIndexError)
                     return None
         except Exception as e:
-            print(f"获取段落元素时出错: {e}")
+            self._report_error(f"获取段落元素时出错: {e}", exc=e)
             return None
             
         # 获取段落中的文本运行
@@ -4208,123 +4678,27 @@ class DocxElementParser(DocxFile):
             # 获取目标文本运行
             target_run = r_elements[run_index]
         except Exception as e:
-            print(f"获取文本运行时出错: {e}")
+            self._report_error(f"获取文本运行时出错: {e}", exc=e)
             return None
             
-        # 读取图片文件
+        # 添加图片
+        if 'media' not in self.parts:
+            self.parts['media'] = {}
+        # 记录修改前的媒体文件和关系，插入失败时撤销
+        media_before = set(self.parts['media'])
+        rels_count = len(self.parts['relationships'].getroot())
         try:
-            with open(image_path, 'rb') as img_file:
-                img_data = img_file.read()
-                
-            # 生成图片ID和文件名
-            img_id = str(uuid.uuid4())
-            img_name = os.path.basename(image_path)
-            img_ext = os.path.splitext(img_name)[1].lower()
-            
-            # 生成关系ID
-            rel_id = f"rId{int(time.time()*1000)}"
-            
-            # 创建图片关系
-            # 检查是否已经存在media文件夹
-            if 'media' not in self.parts:
-                self.parts['media'] = {}
-                
-            # 将图片添加到media文件夹
-            self.parts['media'][img_name] = img_data
-            print(self.parts['other'].keys())
-            # 添加关系到document.xml.rels
-            if 'relationships' not in self.parts:
-                print("错误：找不到document.xml.rels文件")
-                return None
-                
-            # 获取关系文件
-            rels_tree = self.parts['relationships']
-            rels_root = rels_tree.getroot()
-            
-            # 创建新的关系元素
-            new_rel = ET.Element("Relationship")
-            new_rel.set("Id", rel_id)
-            new_rel.set("Type", "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image")
-            new_rel.set("Target", f"media/{img_name}")
-            
-            # 添加到关系文件
-            rels_root.append(new_rel)
+            # 将图片添加到media文件夹，内容相同的图片复用已有文件，文件名冲突时自动改名
+            img_name = self._add_media_part(img_data, os.path.basename(image_path))
 
-            # 更新关系文件
-            self.parts['relationships']= rels_tree
+            # 已有指向同一图片的关系时直接复用
+            rel_id = self._find_media_relationship(img_name)
+            if rel_id is None:
+                rel_id = self._add_image_relationships([img_name])[0]
             
             # 创建图片XML结构
-            new_run = ET.Element(f"{{{self.NAMESPACES['w']}}}r")
-            drawing = ET.SubElement(new_run, f"{{{self.NAMESPACES['w']}}}drawing")
-            inline = ET.SubElement(drawing, f"{{{self.NAMESPACES['wp']}}}inline")
-            
-            # 设置图片大小
-            extent = ET.SubElement(inline, f"{{{self.NAMESPACES['wp']}}}extent")
-            extent.set("cx", str(width_emu))
-            extent.set("cy", str(height_emu))
-            
-            # 设置效果范围
-            effect_extent = ET.SubElement(inline, f"{{{self.NAMESPACES['wp']}}}effectExtent")
-            effect_extent.set("l", "0")
-            effect_extent.set("t", "0")
-            effect_extent.set("r", "0")
-            effect_extent.set("b", "0")
-            
-            # 设置DOC PROPS
-            doc_pr = ET.SubElement(inline, f"{{{self.NAMESPACES['wp']}}}docPr")
-            doc_pr.set("id", img_id)
-            doc_pr.set("name", img_name)
-            if description:
-                doc_pr.set("descr", description)
-                
-            # 添加图片数据
-            graphic = ET.SubElement(inline, f"{{{self.NAMESPACES['a']}}}graphic")
-            graphic_data = ET.SubElement(graphic, f"{{{self.NAMESPACES['a']}}}graphicData")
-            graphic_data.set("uri", "http://schemas.openxmlformats.org/drawingml/2006/picture")
-            
-            pic = ET.SubElement(graphic_data, f"{{{self.NAMESPACES['pic']}}}pic")
-            
-            # 图片非视觉属性
-            nvpic_pr = ET.SubElement(pic, f"{{{self.NAMESPACES['pic']}}}nvPicPr")
-            
-            # 图片非视觉绘图属性
-            cnvpr = ET.SubElement(nvpic_pr, f"{{{self.NAMESPACES['pic']}}}cNvPr")
-            cnvpr.set("id", "0")
-            cnvpr.set("name", img_name)
-            if description:
-                cnvpr.set("descr", description)
-                
-            # 图片非视觉图片属性
-            cnvpic_pr = ET.SubElement(nvpic_pr, f"{{{self.NAMESPACES['pic']}}}cNvPicPr")
-            
-            # 图片填充
-            blip_fill = ET.SubElement(pic, f"{{{self.NAMESPACES['pic']}}}blipFill")
-            blip = ET.SubElement(blip_fill, f"{{{self.NAMESPACES['a']}}}blip")
-            blip.set(f"{{{self.NAMESPACES['r']}}}embed", rel_id)
-            
-            # 源矩形
-            src_rect = ET.SubElement(blip_fill, f"{{{self.NAMESPACES['a']}}}srcRect")
-            
-            # 拉伸
-            stretch = ET.SubElement(blip_fill, f"{{{self.NAMESPACES['a']}}}stretch")
-            fill_rect = ET.SubElement(stretch, f"{{{self.NAMESPACES['a']}}}fillRect")
-            
-            # 图片形状属性
-            sppr = ET.SubElement(pic, f"{{{self.NAMESPACES['pic']}}}spPr")
-            
-            # 预设几何形状
-            xfrm = ET.SubElement(sppr, f"{{{self.NAMESPACES['a']}}}xfrm")
-            off = ET.SubElement(xfrm, f"{{{self.NAMESPACES['a']}}}off")
-            off.set("x", "0")
-            off.set("y", "0")
-            ext = ET.SubElement(xfrm, f"{{{self.NAMESPACES['a']}}}ext")
-            ext.set("cx", str(width_emu))
-            ext.set("cy", str(height_emu))
-            
-            # 预设几何形状
-            prst_geom = ET.SubElement(sppr, f"{{{self.NAMESPACES['a']}}}prstGeom")
-            prst_geom.set("prst", "rect")
-            av_lst = ET.SubElement(prst_geom, f"{{{self.NAMESPACES['a']}}}avLst")
+            new_run = self._build_image_run(rel_id, img_name, width_emu, height_emu,
+                                            self._allocate_drawing_ids(1)[0], description)
             
             # 根据position参数插入图片
             if position.lower() == 'before':
@@ -4336,9 +4710,8 @@ class DocxElementParser(DocxFile):
             return rel_id
             
         except Exception as e:
-
-            print(f"插入图片时出错: {e}")
-            traceback.print_exc()
+            self._discard_new_images(media_before, rels_count)
+            self._report_error(f"插入图片时出错: {e}", exc=e)
             return None
 
     def insert_run(self, para_index, run_index=-1, position='after', text='', **style_properties):
@@ -4380,13 +4753,13 @@ class DocxElementParser(DocxFile):
                     if para_index >= 0 and para_index < elements_count and self.elements[para_index]['type'] == 'paragraph':
                         paragraph = self.elements[para_index]['element']
                     else:
-                        print(f"错误：索引{para_index}不是有效的段落索引")
+                        self._report_error(f"索引{para_index}不是有效的段落索引", DocxIndexError)
                         return False
                 else:
-                    print(f"错误：索引{para_index}不是有效的段落索引")
+                    self._report_error(f"索引{para_index}不是有效的段落索引", DocxIndexError)
                     return False
         except Exception as e:
-            print(f"获取段落元素时出错: {e}")
+            self._report_error(f"获取段落元素时出错: {e}", exc=e)
             return False
             
         # 获取段落中的文本运行
@@ -4492,11 +4865,2477 @@ class DocxElementParser(DocxFile):
             return True
             
         except Exception as e:
-            import traceback
-            print(f"插入文本运行时出错: {e}")
-            traceback.print_exc()
+            self._report_error(f"插入文本运行时出错: {e}", exc=e)
             return False
 
+    # 以下是文本运行规范化函数
+
+    # rPr子元素的规范顺序(即OOXML架构中CT_RPr定义的顺序)
+    RPR_CHILD_ORDER = [
+        'rStyle', 'rFonts', 'b', 'bCs', 'i', 'iCs', 'caps', 'smallCaps', 'strike', 'dstrike',
+        'outline', 'shadow', 'emboss', 'imprint', 'noProof', 'snapToGrid', 'vanish', 'webHidden',
+        'color', 'spacing', 'w', 'kern', 'position', 'sz', 'szCs', 'highlight', 'u', 'effect',
+        'bdr', 'shd', 'fitText', 'vertAlign', 'rtl', 'cs', 'em', 'lang', 'eastAsianLayout',
+        'specVanish', 'oMath', 'rPrChange'
+    ]
+
+    def _canonicalize_rPr(self, rPr):
+        """将rPr的子元素按规范顺序重新排列
+
+        Args:
+            rPr: 文本运行属性元素
+
+        Returns:
+            tuple: 可用于比较的规范化键，属性相同的rPr返回相同的键
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        order = {f"{w_ns}{tag}": i for i, tag in enumerate(self.RPR_CHILD_ORDER)}
+        children = list(rPr)
+        children.sort(key=lambda child: order.get(child.tag, len(order)))
+        rPr[:] = children
+        return self._element_key(rPr)
+
+    def _element_key(self, element):
+        """生成元素(含属性和子元素)的可哈希键"""
+        return (
+            element.tag,
+            tuple(sorted(element.attrib.items())),
+            (element.text or '').strip(),
+            tuple(self._element_key(child) for child in element)
+        )
+
+    def _run_merge_key(self, r_element):
+        """计算文本运行的合并键
+
+        规范化运行中的rPr(空rPr会被移除)，只有仅包含rPr和w:t的文本运行才能被合并。
+
+        Args:
+            r_element: 文本运行元素
+
+        Returns:
+            tuple或None: 合并键，不可合并时返回None
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        rPr = None
+        mergeable = True
+        for child in r_element:
+            if child.tag == f"{w_ns}rPr":
+                rPr = child
+            elif child.tag != f"{w_ns}t":
+                mergeable = False
+
+        rPr_key = None
+        if rPr is not None:
+            if len(rPr) == 0 and not rPr.attrib:
+                # 空的rPr与没有rPr等价
+                r_element.remove(rPr)
+            else:
+                rPr_key = self._canonicalize_rPr(rPr)
+
+        if not mergeable or r_element.find(f"{w_ns}t") is None:
+            return None
+        return tuple(sorted(r_element.attrib.items())), rPr_key
+
+    def _set_run_text(self, r_element, text):
+        """将文本运行的所有w:t合并为一个并设置文本"""
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        t_elements = r_element.findall(f"{w_ns}t")
+        for t in t_elements[1:]:
+            r_element.remove(t)
+        t = t_elements[0]
+        t.text = text
+        # 如果文本包含首尾空格或连续空格，设置xml:space="preserve"
+        if text.startswith(' ') or text.endswith(' ') or '  ' in text:
+            t.set(f"{{{self.NAMESPACES['xml']}}}space", "preserve")
+
+    def normalize_runs(self, strip_rsid=False, strip_proof_err=False, include_headers_footers=True):
+        """规范化文档中的文本运行，合并相邻且属性相同的文本运行
+
+        经过WPS/Word反复编辑的文档中，一个段落常被拆分成大量属性完全相同的文本运行，
+        合并后所有基于文本运行的方法以及get_paragraph_text都会更快。
+
+        Args:
+            strip_rsid: 是否移除所有w:rsid*修订标识属性(它们会阻止相邻文本运行合并)
+            strip_proof_err: 是否移除w:proofErr拼写检查标记
+            include_headers_footers: 是否同时处理页眉和页脚
+
+        Returns:
+            dict: 规范化报告，包含以下键：
+                'runs_before': 规范化前的文本运行数量
+                'runs_after': 规范化后的文本运行数量
+                'merged_runs': 被合并掉的文本运行数量
+                'rsid_removed': 移除的rsid属性数量
+                'proof_err_removed': 移除的proofErr元素数量
+                'xml_size_before': 规范化前的XML大小(字节)
+                'xml_size_after': 规范化后的XML大小(字节)
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        r_tag = f"{w_ns}r"
+        proof_err_tag = f"{w_ns}proofErr"
+        rsid_prefix = f"{w_ns}rsid"
+
+        # 收集需要处理的XML根元素
+        roots = [self.root]
+        if include_headers_footers:
+            for part_name in ['headers', 'footers']:
+                for part_tree in self.parts[part_name].values():
+                    if part_tree is not None:
+                        roots.append(part_tree.getroot())
+
+        report = {
+            'runs_before': 0,
+            'runs_after': 0,
+            'merged_runs': 0,
+            'rsid_removed': 0,
+            'proof_err_removed': 0,
+            'xml_size_before': 0,
+            'xml_size_after': 0
+        }
+
+        for root in roots:
+            report['xml_size_before'] += len(ET.tostring(root, encoding='utf-8'))
+
+            # 先收集所有元素，避免在遍历树的同时修改树
+            all_elements = list(root.iter())
+            for element in all_elements:
+                if element.tag == r_tag:
+                    report['runs_before'] += 1
+
+                # 移除rsid属性
+                if strip_rsid:
+                    for attr_name in [key for key in element.attrib if key.startswith(rsid_prefix)]:
+                        del element.attrib[attr_name]
+                        report['rsid_removed'] += 1
+
+            for parent in all_elements:
+                if not any(child.tag == r_tag or child.tag == proof_err_tag for child in parent):
+                    continue
+
+                kept_children = []
+                changed = False
+                last_run = None
+                last_key = None
+                last_texts = []
+
+                for child in parent:
+                    if strip_proof_err and child.tag == proof_err_tag:
+                        report['proof_err_removed'] += 1
+                        changed = True
+                        continue
+
+                    key = self._run_merge_key(child) if child.tag == r_tag else None
+                    if key is not None and key == last_key:
+                        # 与前一个文本运行属性相同，合并文本
+                        last_texts.extend(t.text or '' for t in child.findall(f"{w_ns}t"))
+                        report['merged_runs'] += 1
+                        changed = True
+                        continue
+
+                    if last_run is not None and len(last_texts) > 1:
+                        self._set_run_text(last_run, ''.join(last_texts))
+
+                    kept_children.append(child)
+                    if key is not None:
+                        last_run = child
+                        last_key = key
+                        last_texts = [t.text or '' for t in child.findall(f"{w_ns}t")]
+                    else:
+                        last_run = None
+                        last_key = None
+                        last_texts = []
+
+                if last_run is not None and len(last_texts) > 1:
+                    self._set_run_text(last_run, ''.join(last_texts))
+
+                if changed:
+                    parent[:] = kept_children
+
+            report['xml_size_after'] += len(ET.tostring(root, encoding='utf-8'))
+
+        report['runs_after'] = report['runs_before'] - report['merged_runs']
+        return report
+
+    # 以下是创建表格的函数
+
+    def _get_text_width(self):
+        """根据最后一个节的页面设置计算正文宽度(单位：twip)，无法计算时返回A4默认值"""
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        sect_pr = None
+        for sect_pr in self.root.iter(f"{w_ns}sectPr"):
+            pass
+        if sect_pr is not None:
+            pg_sz = sect_pr.find(f"{w_ns}pgSz")
+            pg_mar = sect_pr.find(f"{w_ns}pgMar")
+            try:
+                return (int(pg_sz.get(f"{w_ns}w"))
+                        - int(pg_mar.get(f"{w_ns}left", 0))
+                        - int(pg_mar.get(f"{w_ns}right", 0)))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return 8306
+
+    def _normalize_table_data(self, data):
+        """将DataFrame、NumPy数组或行列表统一转换为(表头, 行列表)
+
+        Returns:
+            tuple: (表头列表或None, 二维列表)
+        """
+        if hasattr(data, 'columns') and hasattr(data, 'to_numpy'):
+            # pandas DataFrame
+            columns = [str(col) for col in data.columns]
+            return columns, data.to_numpy(dtype=object).tolist()
+        if hasattr(data, 'tolist') and hasattr(data, 'ndim'):
+            # NumPy数组
+            rows = data.tolist()
+            if data.ndim == 1:
+                rows = [[value] for value in rows]
+            return None, rows
+        return None, [list(row) for row in data]
+
+    def _append_table_rows(self, tbl, rows, col_widths, bold=False, header=False):
+        """将多行数据作为表格行追加到tbl，每个单元格包含一个段落和一个文本运行
+
+        属性字典只预先计算一次，每个元素直接用SubElement创建(比逐行深拷贝行模板快得多)，
+        创建期间暂停循环垃圾回收。
+        None、NaN、NaT和pd.NA显示为空单元格，数据不足col_widths列的行用空单元格补齐。
+
+        Args:
+            tbl: w:tbl元素
+            rows: 行数据的可迭代对象，每行为值序列
+            col_widths: 每列宽度列表(twip)
+            bold: 单元格文字是否加粗
+            header: 是否标记为重复表头行
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        tr_tag, tc_tag, p_tag, r_tag, t_tag = (f"{w_ns}{tag}" for tag in ['tr', 'tc', 'p', 'r', 't'])
+        tr_pr_tag, tc_pr_tag, tc_w_tag = f"{w_ns}trPr", f"{w_ns}tcPr", f"{w_ns}tcW"
+        t_attrib = {f"{{{self.NAMESPACES['xml']}}}space": "preserve"}
+        width_attribs = [{f"{w_ns}w": str(width), f"{w_ns}type": "dxa"} for width in col_widths]
+        bold_attrib = {f"{w_ns}val": "true"}
+        sub_element = ET.SubElement
+
+        # 创建大量元素时暂停循环垃圾回收：新元素之间没有循环引用，而已加载文档的大量对象
+        # 会让期间触发的完全回收占用大部分时间
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for values in rows:
+                tr = sub_element(tbl, tr_tag)
+                if header:
+                    sub_element(sub_element(tr, tr_pr_tag), f"{w_ns}tblHeader")
+                for width_attrib, value in itertools.zip_longest(width_attribs, values):
+                    if width_attrib is None:
+                        break
+                    tc = sub_element(tr, tc_tag)
+                    sub_element(sub_element(tc, tc_pr_tag), tc_w_tag, width_attrib)
+                    r = sub_element(sub_element(tc, p_tag), r_tag)
+                    if bold:
+                        sub_element(sub_element(r, f"{w_ns}rPr"), f"{w_ns}b", bold_attrib)
+                    t = sub_element(r, t_tag, t_attrib)
+                    # None、NaN、NaT和pd.NA显示为空(pd.NA参与比较的结果不能转换为bool)
+                    if value is None:
+                        continue
+                    try:
+                        if value != value:
+                            continue
+                    except (TypeError, ValueError):
+                        continue
+                    t.text = str(value)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    def build_table_element(self, data, style=None, header=True, col_widths=None, borders=True):
+        """根据二维数据构建表格元素(不插入文档)
+
+        单元格元素直接用预先计算的属性字典创建，不逐行深拷贝模板。
+
+        Args:
+            data: pandas DataFrame、NumPy二维数组或行列表
+            style: 表格样式ID(w:tblStyle)，为None时不设置
+            header: 是否将DataFrame的列名作为表头行(加粗并在分页时重复)，
+                    对于数组和行列表则将第一行作为表头
+            col_widths: 每列宽度列表(twip)，为None时按正文宽度平均分配
+            borders: 未指定样式时是否添加单线边框
+
+        Returns:
+            Element: w:tbl元素，数据为空时返回None
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        columns, rows = self._normalize_table_data(data)
+        if header and columns is None and rows:
+            columns, rows = [str(value) for value in rows[0]], rows[1:]
+        elif not header:
+            columns = None
+
+        col_count = max([len(columns) if columns else 0] + [len(row) for row in rows])
+        if col_count == 0:
+            return None
+
+        if col_widths is None:
+            col_widths = [self._get_text_width() // col_count] * col_count
+
+        tbl = ET.Element(f"{w_ns}tbl")
+
+        # 表格属性
+        tbl_pr = ET.SubElement(tbl, f"{w_ns}tblPr")
+        if style:
+            ET.SubElement(tbl_pr, f"{w_ns}tblStyle").set(f"{w_ns}val", style)
+        tbl_w = ET.SubElement(tbl_pr, f"{w_ns}tblW")
+        tbl_w.set(f"{w_ns}w", str(sum(col_widths)))
+        tbl_w.set(f"{w_ns}type", "dxa")
+        if borders and not style:
+            tbl_borders = ET.SubElement(tbl_pr, f"{w_ns}tblBorders")
+            for border_type in ['top', 'left', 'bottom', 'right', 'insideH', 'insideV']:
+                border = ET.SubElement(tbl_borders, f"{w_ns}{border_type}")
+                border.set(f"{w_ns}val", "single")
+                border.set(f"{w_ns}sz", "4")
+                border.set(f"{w_ns}space", "0")
+                border.set(f"{w_ns}color", "auto")
+        ET.SubElement(tbl_pr, f"{w_ns}tblLook").set(f"{w_ns}val", "04A0")
+
+        # 表格网格
+        tbl_grid = ET.SubElement(tbl, f"{w_ns}tblGrid")
+        for width in col_widths:
+            ET.SubElement(tbl_grid, f"{w_ns}gridCol").set(f"{w_ns}w", str(width))
+
+        if columns is not None:
+            self._append_table_rows(tbl, [columns], col_widths, bold=True, header=True)
+        self._append_table_rows(tbl, rows, col_widths)
+
+        return tbl
+
+    def insert_table(self, element_index, data, position='after', style=None, header=True,
+                     col_widths=None, borders=True):
+        """在文档中插入由二维数据生成的表格
+
+        Args:
+            element_index: self.elements中的锚点元素索引，支持负索引
+            data: pandas DataFrame、NumPy二维数组或行列表
+            position: 插入位置，'before'或'after'
+            style: 表格样式ID(w:tblStyle)
+            header: 是否生成表头行
+            col_widths: 每列宽度列表(twip)，为None时平均分配
+            borders: 未指定样式时是否添加单线边框
+
+        Returns:
+            int: 新表格在self.tables中的索引，失败则返回-1
+        """
+        try:
+            tbl = self.build_table_element(data, style=style, header=header,
+                                           col_widths=col_widths, borders=borders)
+        except Exception as e:
+            self._report_error(f"构建表格时出错: {e}", exc=e)
+            return -1
+        if tbl is None:
+            self._report_error("表格数据为空")
+            return -1
+
+        if not self.insert_paragraphs(element_index, [tbl], position=position):
+            return -1
+
+        for i, table in enumerate(self.tables):
+            if table['element'] is tbl:
+                return i
+        return -1
+
+    # 以下是将重复的直接格式提升为命名样式的函数
+
+    # 切换属性在字符样式中与段落样式的值进行异或，提升后效果可能改变，因此保留为直接格式
+    TOGGLE_RPR_TAGS = [
+        'b', 'bCs', 'i', 'iCs', 'caps', 'smallCaps', 'strike', 'dstrike',
+        'outline', 'shadow', 'emboss', 'imprint', 'vanish'
+    ]
+    # 不能或不应放入样式中的属性，始终保留为直接格式
+    KEEP_INLINE_RPR_TAGS = ['rStyle', 'rPrChange', 'ins', 'del', 'moveFrom', 'moveTo']
+    KEEP_INLINE_PPR_TAGS = ['pStyle', 'numPr', 'rPr', 'sectPr', 'pPrChange', 'cnfStyle', 'divId']
+    # 编号段落的缩进和制表位：优先级为直接格式 > 编号级别 > 段落样式，放入样式后会被编号级别的设置覆盖
+    KEEP_INLINE_NUMBERED_PPR_TAGS = ['ind', 'tabs']
+
+    def _numbered_paragraph_styles(self):
+        """找出自身或基样式(basedOn链)中带有编号(w:numPr)的段落样式ID集合"""
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        if self.parts['styles'] is None:
+            return set()
+        based_on = {}
+        numbered = set()
+        for style in self.parts['styles'].getroot().findall(f"{w_ns}style"):
+            if style.get(f"{w_ns}type") != 'paragraph':
+                continue
+            style_id = style.get(f"{w_ns}styleId")
+            p_pr = style.find(f"{w_ns}pPr")
+            if p_pr is not None and p_pr.find(f"{w_ns}numPr") is not None:
+                numbered.add(style_id)
+            parent = style.find(f"{w_ns}basedOn")
+            if parent is not None:
+                based_on[style_id] = parent.get(f"{w_ns}val")
+
+        result = set()
+        for style_id in based_on.keys() | numbered:
+            seen = set()
+            current = style_id
+            while current is not None and current not in seen:
+                if current in numbered:
+                    result.add(style_id)
+                    break
+                seen.add(current)
+                current = based_on.get(current)
+        return result
+
+    def _paragraph_keep_tags(self, pPr, numbered_styles):
+        """段落格式块中需要保留为直接格式的标签名列表，编号段落额外保留缩进和制表位"""
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        p_style = pPr.find(f"{w_ns}pStyle")
+        if pPr.find(f"{w_ns}numPr") is not None or (
+                p_style is not None and p_style.get(f"{w_ns}val") in numbered_styles):
+            return self.KEEP_INLINE_PPR_TAGS + self.KEEP_INLINE_NUMBERED_PPR_TAGS
+        return self.KEEP_INLINE_PPR_TAGS
+
+    def _split_formatting_block(self, props, style_tag, keep_tags):
+        """将rPr/pPr的子元素拆分为可提升部分和需保留部分
+
+        Args:
+            props: rPr或pPr元素
+            style_tag: 样式引用标签名('rStyle'或'pStyle')
+            keep_tags: 需要保留为直接格式的标签名列表
+
+        Returns:
+            tuple: (原样式ID或None, 可提升的子元素列表)
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        keep = {f"{w_ns}{tag}" for tag in keep_tags}
+        base_style = None
+        promotable = []
+        for child in props:
+            if child.tag == f"{w_ns}{style_tag}":
+                base_style = child.get(f"{w_ns}val")
+            elif child.tag not in keep:
+                promotable.append(child)
+        return base_style, promotable
+
+    def _serialized_size(self, element):
+        """估算元素在文档中序列化后的字节数(不计单独序列化时附加的命名空间声明)"""
+        xml_bytes = ET.tostring(element, encoding='utf-8')
+        first_tag_end = xml_bytes.find(b'>')
+        declarations = re.findall(rb' xmlns:[\w.-]+="[^"]*"', xml_bytes[:first_tag_end])
+        return len(xml_bytes) - sum(len(declaration) for declaration in declarations)
+
+    def analyze_repeated_formatting(self, min_count=20, min_properties=3):
+        """统计文档中重复出现的直接格式块(rPr/pPr)
+
+        格式块按内容哈希(与子元素顺序无关)，基于同一原样式的相同格式块视为同一组。
+
+        Args:
+            min_count: 至少出现多少次才作为候选
+            min_properties: 可提升的属性至少有多少个才作为候选
+
+        Returns:
+            list: 候选列表(按出现次数降序)，每项包含：
+                'type': 'paragraph'或'character'
+                'base_style': 原样式ID或None
+                'count': 出现次数
+                'properties': 可提升的属性数量
+                'bytes': 单个格式块序列化后的大小
+                'elements': 使用该格式块的rPr/pPr元素列表
+                'sample': 可提升的子元素列表(取自第一个出现的格式块)
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        keep_rpr = self.KEEP_INLINE_RPR_TAGS + self.TOGGLE_RPR_TAGS
+        numbered_styles = self._numbered_paragraph_styles()
+        groups = {}
+
+        for block_type, owner_tag, props_tag, style_tag in [
+            ('paragraph', 'p', 'pPr', 'pStyle'),
+            ('character', 'r', 'rPr', 'rStyle')
+        ]:
+            for owner in self.root.iter(f"{w_ns}{owner_tag}"):
+                props = owner.find(f"{w_ns}{props_tag}")
+                if props is None:
+                    continue
+                keep_tags = self._paragraph_keep_tags(props, numbered_styles) \
+                    if block_type == 'paragraph' else keep_rpr
+                base_style, promotable = self._split_formatting_block(props, style_tag, keep_tags)
+                if len(promotable) < min_properties:
+                    continue
+                key = (block_type, base_style,
+                       tuple(sorted(self._element_key(child) for child in promotable)))
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = {
+                        'type': block_type,
+                        'base_style': base_style,
+                        'count': 0,
+                        'properties': len(promotable),
+                        'bytes': sum(self._serialized_size(child) for child in promotable),
+                        'elements': [],
+                        'sample': promotable
+                    }
+                group['count'] += 1
+                group['elements'].append(props)
+
+        candidates = [group for group in groups.values() if group['count'] >= min_count]
+        candidates.sort(key=lambda group: group['count'] * group['bytes'], reverse=True)
+        return candidates
+
+    def promote_repeated_formatting(self, min_count=20, min_properties=3, style_prefix='Promoted',
+                                    dry_run=False):
+        """将频繁重复的直接格式提升为styles.xml中的命名样式
+
+        为每组重复的格式块创建一个段落样式或字符样式(基于原有的pStyle/rStyle)，
+        并将文档中的内联格式替换为w:pStyle/w:rStyle引用。
+        加粗、斜体等切换属性和修订标记保留为直接格式；编号段落的缩进和制表位也保留为直接格式，
+        否则会被编号级别中的设置覆盖。
+
+        Args:
+            min_count: 格式块至少出现多少次才提升
+            min_properties: 格式块至少包含多少个可提升的属性
+            style_prefix: 新样式ID的前缀
+            dry_run: 为True时只统计不修改文档
+
+        Returns:
+            dict: 提升报告，包含以下键：
+                'paragraph_styles': 新增的段落样式数量
+                'character_styles': 新增的字符样式数量
+                'rewritten_blocks': 被替换的格式块数量
+                'bytes_before': 处理前document.xml和styles.xml的总大小
+                'bytes_after': 处理后的总大小(dry_run时为估算值)
+                'bytes_saved': 节省的字节数
+                'styles': 每个新样式的信息列表(style_id, type, base_style, count)
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        report = {
+            'paragraph_styles': 0,
+            'character_styles': 0,
+            'rewritten_blocks': 0,
+            'bytes_before': 0,
+            'bytes_after': 0,
+            'bytes_saved': 0,
+            'styles': []
+        }
+
+        if self.parts['styles'] is None:
+            self._report_error("文档中没有styles.xml")
+            return report
+        styles_root = self.parts['styles'].getroot()
+
+        def measure():
+            return (len(ET.tostring(self.root, encoding='utf-8'))
+                    + len(ET.tostring(styles_root, encoding='utf-8')))
+
+        report['bytes_before'] = measure()
+
+        # 收集已有样式ID，找出默认段落样式
+        existing_ids = set()
+        default_para_style = None
+        for style in styles_root.findall(f"{w_ns}style"):
+            existing_ids.add(style.get(f"{w_ns}styleId"))
+            if style.get(f"{w_ns}type") == 'paragraph' and style.get(f"{w_ns}default") in ('1', 'true'):
+                default_para_style = style.get(f"{w_ns}styleId")
+
+        counters = {'paragraph': 0, 'character': 0}
+        estimated_saving = 0
+        numbered_styles = self._numbered_paragraph_styles()
+        for candidate in self.analyze_repeated_formatting(min_count, min_properties):
+            block_type = candidate['type']
+            style_tag = 'pStyle' if block_type == 'paragraph' else 'rStyle'
+            props_tag = 'pPr' if block_type == 'paragraph' else 'rPr'
+            suffix = 'Para' if block_type == 'paragraph' else 'Char'
+
+            # 生成不重复的样式ID
+            style_id = None
+            while style_id is None or style_id in existing_ids:
+                counters[block_type] += 1
+                style_id = f"{style_prefix}{suffix}{counters[block_type]}"
+            existing_ids.add(style_id)
+
+            base_style = candidate['base_style']
+            if block_type == 'paragraph' and base_style is None:
+                base_style = default_para_style
+
+            report['styles'].append({
+                'style_id': style_id,
+                'type': block_type,
+                'base_style': base_style,
+                'count': candidate['count']
+            })
+            report[f"{block_type}_styles"] += 1
+            report['rewritten_blocks'] += candidate['count']
+            ref_bytes = len(f'<w:{style_tag} w:val="{style_id}" />')
+            estimated_saving += candidate['count'] * (candidate['bytes'] - ref_bytes)
+
+            if dry_run:
+                continue
+
+            # 在styles.xml中添加新样式
+            style = ET.SubElement(styles_root, f"{w_ns}style")
+            style.set(f"{w_ns}type", block_type)
+            style.set(f"{w_ns}customStyle", "1")
+            style.set(f"{w_ns}styleId", style_id)
+            ET.SubElement(style, f"{w_ns}name").set(f"{w_ns}val", f"{style_prefix} {suffix} {counters[block_type]}")
+            if base_style:
+                ET.SubElement(style, f"{w_ns}basedOn").set(f"{w_ns}val", base_style)
+            style_props = ET.SubElement(style, f"{w_ns}{props_tag}")
+            for child in candidate['sample']:
+                style_props.append(copy.deepcopy(child))
+            if block_type == 'character':
+                self._canonicalize_rPr(style_props)
+
+            # 将内联格式替换为样式引用
+            keep_rpr = {f"{w_ns}{tag}" for tag in self.KEEP_INLINE_RPR_TAGS + self.TOGGLE_RPR_TAGS
+                        if tag != style_tag}
+            for props in candidate['elements']:
+                if block_type == 'paragraph':
+                    keep = {f"{w_ns}{tag}" for tag in self._paragraph_keep_tags(props, numbered_styles)
+                            if tag != style_tag}
+                    props[:] = [child for child in props if child.tag in keep]
+                    self._set_pPr_style_id(props, style_id)
+                else:
+                    style_ref = ET.Element(f"{w_ns}{style_tag}")
+                    style_ref.set(f"{w_ns}val", style_id)
+                    props[:] = [style_ref] + [child for child in props if child.tag in keep_rpr]
+
+        if dry_run:
+            report['bytes_after'] = report['bytes_before'] - max(estimated_saving, 0)
+        else:
+            report['bytes_after'] = measure()
+        report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+        return report
+
+    # 以下是按网格解析表格(支持合并单元格)的函数
+
+    def _iter_block_children(self, parent, local_name):
+        """遍历parent中指定标签的直接子元素，穿透w:sdt和w:customXml包装，不进入嵌套表格
+
+        Args:
+            parent: 父元素(如w:tbl、w:tr、w:tc)
+            local_name: 不带命名空间的标签名，如'tr'、'tc'、'p'
+
+        Yields:
+            Element: 匹配的子元素
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        target_tag = f"{w_ns}{local_name}"
+        sdt_tag = f"{w_ns}sdt"
+        custom_xml_tag = f"{w_ns}customXml"
+        for child in parent:
+            tag = child.tag
+            if tag == target_tag:
+                yield child
+            elif tag == sdt_tag:
+                content = child.find(f"{w_ns}sdtContent")
+                if content is not None:
+                    yield from self._iter_block_children(content, local_name)
+            elif tag == custom_xml_tag:
+                yield from self._iter_block_children(child, local_name)
+
+    def _get_int_property(self, props, local_name, default):
+        """读取属性元素中子元素的w:val整数值"""
+        if props is None:
+            return default
+        element = props.find(f"{{{self.NAMESPACES['w']}}}{local_name}")
+        if element is None:
+            return default
+        try:
+            return int(element.get(f"{{{self.NAMESPACES['w']}}}val", default))
+        except ValueError:
+            return default
+
+    def _build_table_cell_grid(self, table_element):
+        """一次遍历将表格的单元格元素映射到矩形网格，处理gridBefore/gridAfter、gridSpan和vMerge
+
+        只读取本表格的行和单元格，不进入嵌套表格，也不提取文本。
+
+        Args:
+            table_element: 表格XML元素
+
+        Returns:
+            tuple: (cells, regions, nested)
+                cells: 二维列表，cells[行][列]为覆盖该位置的w:tc元素(合并区域中均为左上角单元格)，
+                       gridBefore/gridAfter等空位为None
+                regions: 每个起始单元格的区域列表，每项为{'row', 'col', 'rowspan', 'colspan', 'element'}
+                nested: 单元格中嵌套的表格元素列表(按文档顺序)
+        """
+        w_ns = f"{{{self.NAMESPACES['w']}}}"
+        tr_pr_tag = f"{w_ns}trPr"
+        tc_pr_tag = f"{w_ns}tcPr"
+        grid_span_tag = f"{w_ns}gridSpan"
+        v_merge_tag = f"{w_ns}vMerge"
+        val_attr = f"{w_ns}val"
+        cells = []
+        regions = []
+        nested = []
+        # 每一列当前正在进行的垂直合并区域
+        open_vmerge = {}
+
+        for row_index, tr in enumerate(self._iter_block_children(table_element, 'tr')):
+            tr_pr = tr.find(tr_pr_tag)
+            row = [None] * self._get_int_property(tr_pr, 'gridBefore', 0)
+            for col in range(len(row)):
+                open_vmerge.pop(col, None)
+
+            for tc in self._iter_block_children(tr, 'tc'):
+                col = len(row)
+                tc_pr = tc.find(tc_pr_tag)
+                span = 1
+                v_merge_val = None
+                if tc_pr is not None:
+                    if tc_pr.find(grid_span_tag) is not None:
+                        span = max(self._get_int_property(tc_pr, 'gridSpan', 1), 1)
+                    v_merge = tc_pr.find(v_merge_tag)
+                    if v_merge is not None:
+                        v_merge_val = v_merge.get(val_attr, 'continue')
+
+                nested.extend(self._iter_block_children(tc, 'tbl'))
+
+                if v_merge_val == 'continue' and col in open_vmerge:
+                    # 垂直合并的延续单元格
+                    region = open_vmerge[col]
+                    region['rowspan'] = row_index - region['row'] + 1
+                    row.extend([region['element']] * span)
+                    continue
+
+                region = {'row': row_index, 'col': col, 'rowspan': 1, 'colspan': span, 'element': tc}
+                regions.append(region)
+                row.extend([tc] * span)
+                if open_vmerge:
+                    for offset in range(span):
+                        open_vmerge.pop(col + offset, None)
+                if v_merge_val is not None:
+                    open_vmerge[col] = region
+
+            cells.append(row)
+
+        # 补齐为矩形网格(gridAfter或缺失的单元格)
+        col_count = max((len(row) for row in cells), default=0)
+        for row in cells:
+            row.extend([None] * (col_count - len(row)))
+
+        return cells, regions, nested
+
+    def _get_cell_text(self, tc, separator='\n'):
+        """提取单元格中(不含嵌套表格)所有非空段落的文本"""
+        texts = [self.get_paragraph_text(p) for p in self._iter_block_children(tc, 'p')]
+        return separator.join(text for text in texts if text)
+
+    def _resolve_table_grid(self, table_element, separator='\n', fill_merged=False):
+        """一次遍历将表格解析为矩形文本网格及合并单元格信息
+
+        嵌套表格的内容不计入单元格文本，而是单独记录。
+
+        Args:
+            table_element: 表格XML元素
+            separator: 单元格中多个段落文本之间的分隔符
+            fill_merged: 为True时被合并覆盖的单元格填入合并区域左上角单元格的文本，否则为空字符串
+
+        Returns:
+            dict: 包含以下键：
+                'rows': 行数
+                'cols': 列数
+                'values': 二维文本列表(rows × cols)
+                'merges': 合并区域列表，每项为{'row', 'col', 'rowspan', 'colspan'}
+                'covered': 被合并覆盖的单元格字典 {(行, 列): (起始行, 起始列)}
+                'nested': 单元格中嵌套的表格元素列表(按文档顺序)
+        """
+        cells, regions, nested = self._build_table_cell_grid(table_element)
+        values = [[''] * len(row) for row in cells]
+
+        merges = []
+        covered = {}
+        for region in regions:
+            row, col = region['row'], region['col']
+            text = self._get_cell_text(region['element'], separator)
+            values[row][col] = text
+            if region['rowspan'] == 1 and region['colspan'] == 1:
+                continue
+
+            merges.append({key: region[key] for key in ['row', 'col', 'rowspan', 'colspan']})
+            # 标记合并区域内被覆盖的单元格
+            for r in range(row, row + region['rowspan']):
+                for c in range(col, col + region['colspan']):
+                    if (r, c) != (row, col):
+                        covered[(r, c)] = (row, col)
+                        if fill_merged:
+                            values[r][c] = text
+
+        return {
+            'rows': len(values),
+            'cols': len(values[0]) if values else 0,
+            'values': values,
+            'merges': merges,
+            'covered': covered,
+            'nested': nested
+        }
+
+    def get_table_grid(self, table_idx, fill_merged=False):
+        """获取指定表格的矩形网格及合并单元格信息
+
+        Args:
+            table_idx: self.tables中的表格索引
+            fill_merged: 被合并覆盖的单元格是否填入合并区域的文本
+
+        Returns:
+            dict: 见_resolve_table_grid的返回值，索引无效时返回None
+        """
+        if table_idx < 0 or table_idx >= len(self.tables):
+            self._report_error(f"表格索引{table_idx}超出范围(0-{len(self.tables)-1})", DocxIndexError)
+            return None
+        return self._resolve_table_grid(self.tables[table_idx]['element'], fill_merged=fill_merged)
+
+    def iter_table_grids(self, include_nested=False, fill_merged=False):
+        """依次解析文档中的所有表格
+
+        Args:
+            include_nested: 是否同时解析单元格中嵌套的表格
+            fill_merged: 被合并覆盖的单元格是否填入合并区域的文本
+
+        Yields:
+            tuple: (表格索引, 嵌套序号, 网格字典)，顶层表格的嵌套序号为0，
+                   嵌套表格按深度优先的文档顺序从1开始编号
+        """
+        for table_idx, table in enumerate(self.tables):
+            pending = [table['element']]
+            nested_index = 0
+            while pending:
+                grid = self._resolve_table_grid(pending.pop(0), fill_merged=fill_merged)
+                yield table_idx, nested_index, grid
+                nested_index += 1
+                if include_nested:
+                    pending = grid['nested'] + pending
+
+    def table_to_numpy(self, table_idx, fill_merged=False):
+        """将指定表格导出为NumPy对象数组(rows × cols)
+
+        Args:
+            table_idx: self.tables中的表格索引
+            fill_merged: 被合并覆盖的单元格是否填入合并区域的文本
+
+        Returns:
+            numpy.ndarray: dtype为object的二维数组，失败时返回None
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            self._report_error("需要安装numpy库：pip install numpy")
+            return None
+
+        grid = self.get_table_grid(table_idx, fill_merged=fill_merged)
+        if grid is None:
+            return None
+        array = np.empty((grid['rows'], grid['cols']), dtype=object)
+        if grid['rows'] and grid['cols']:
+            array[:, :] = grid['values']
+        return array
+
+    def tables_to_arrow(self, include_nested=False, fill_merged=False):
+        """将文档中所有表格导出为一个长格式的pyarrow Table
+
+        每个网格单元格一行，列包括：
+            table_index: self.tables中的表格索引
+            nested_index: 嵌套序号(0为顶层表格)
+            row, col: 单元格在网格中的位置
+            text: 单元格文本
+            rowspan, colspan: 合并区域大小(被覆盖的单元格为0)
+            covered: 是否为被合并覆盖的单元格
+
+        Args:
+            include_nested: 是否包含嵌套表格
+            fill_merged: 被合并覆盖的单元格是否填入合并区域的文本
+
+        Returns:
+            pyarrow.Table: 失败时返回None
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            self._report_error("需要安装pyarrow库：pip install pyarrow")
+            return None
+
+        columns = {name: [] for name in
+                   ['table_index', 'nested_index', 'row', 'col', 'text', 'rowspan', 'colspan', 'covered']}
+        for table_idx, nested_index, grid in self.iter_table_grids(include_nested, fill_merged):
+            spans = {(m['row'], m['col']): (m['rowspan'], m['colspan']) for m in grid['merges']}
+            covered = grid['covered']
+            cell_count = grid['rows'] * grid['cols']
+            columns['table_index'].extend([table_idx] * cell_count)
+            columns['nested_index'].extend([nested_index] * cell_count)
+            for r, row in enumerate(grid['values']):
+                columns['row'].extend([r] * len(row))
+                columns['col'].extend(range(len(row)))
+                columns['text'].extend(row)
+                for c in range(len(row)):
+                    is_covered = (r, c) in covered
+                    rowspan, colspan = (0, 0) if is_covered else spans.get((r, c), (1, 1))
+                    columns['rowspan'].append(rowspan)
+                    columns['colspan'].append(colspan)
+                    columns['covered'].append(is_covered)
+
+        schema = pa.schema([
+            ('table_index', pa.int32()), ('nested_index', pa.int32()),
+            ('row', pa.int32()), ('col', pa.int32()), ('text', pa.string()),
+            ('rowspan', pa.int32()), ('colspan', pa.int32()), ('covered', pa.bool_())
+        ])
+        return pa.table(columns, schema=schema)
+
+    def get_table_view(self, table_idx):
+        """获取表格的随机访问视图，同一表格的视图会被缓存复用
+
+        Args:
+            table_idx: self.tables中的表格索引，支持负索引
+
+        Returns:
+            DocxTableView: 表格视图，索引无效时返回None
+        """
+        if table_idx < -len(self.tables) or table_idx >= len(self.tables):
+            self._report_error(f"表格索引{table_idx}超出范围(0-{len(self.tables)-1})", DocxIndexError)
+            return None
+
+        table_element = self.tables[table_idx]['element']
+        view = self._table_views.get(table_element)
+        if view is None:
+            view = self._table_views[table_element] = DocxTableView(self, table_element)
+        return view
+
+    # 以下是按内容哈希对媒体文件去重的函数
+
+    def _media_digest(self, name):
+        """计算媒体文件内容的SHA-256摘要，内容对象未变化时直接使用缓存"""
+        content = self.parts['media'][name]
+        cached = self._media_digests.get(name)
+        if cached is not None and cached[0] is content:
+            return cached[1]
+        digest = hashlib.sha256(content).hexdigest()
+        self._media_digests[name] = (content, digest)
+        return digest
+
+    def _media_digest_index(self):
+        """建立摘要到媒体文件名的映射，相同内容只保留最先出现的文件名"""
+        index = {}
+        for name in self.parts['media']:
+            if not name:
+                # 压缩包中的目录项
+                continue
+            index.setdefault(self._media_digest(name), name)
+        # 清理已删除文件的缓存
+        for name in list(self._media_digests):
+            if name not in self.parts['media']:
+                del self._media_digests[name]
+        return index
+
+    def _media_name_from_target(self, target, source_path='word/document.xml'):
+        """将关系的Target转换为word/media中的媒体文件名
+
+        Target相对于关系所属部件的目录解析，例如document.xml的'media/image1.png'、
+        word/glossary/document.xml的'../media/image1.png'，以及绝对路径'/word/media/image1.png'。
+
+        Args:
+            target: 关系的Target
+            source_path: 关系所属部件在压缩包中的路径
+
+        Returns:
+            str: 媒体文件名，Target不指向word/media时返回None
+        """
+        if target is None:
+            return None
+        target_path = self._resolve_part_target(source_path, target)
+        if not target_path.startswith('word/media/'):
+            return None
+        return target_path[len('word/media/'):]
+
+    def _iter_relationship_parts(self):
+        """遍历包中所有部件的关系文件(document.xml.rels、页眉页脚的.rels以及word/glossary等子目录中的.rels)
+
+        以二进制形式保存的关系文件会被解析并替换为ElementTree，保存时按XML写出。
+        包级关系文件_rels/.rels不包含在内。
+
+        Yields:
+            tuple: (关系所属部件的路径, 关系文件根元素)，Target应相对于所属部件的目录解析
+        """
+        if self.parts['relationships'] is not None:
+            yield 'word/document.xml', self.parts['relationships'].getroot()
+        for name, content in list(self.parts['other'].items()):
+            rels_dir, rels_file = posixpath.split(name)
+            if (not rels_file.endswith('.rels') or posixpath.basename(rels_dir) != '_rels'
+                    or name == '_rels/.rels'):
+                continue
+            if not isinstance(content, ET.ElementTree):
+                content = self._parse_xml(content)
+                if content is None:
+                    continue
+                self.parts['other'][name] = content
+            yield posixpath.join(posixpath.dirname(rels_dir), rels_file[:-len('.rels')]), content.getroot()
+
+    def _find_media_relationship(self, media_name):
+        """在document.xml.rels中查找指向指定媒体文件的关系ID，不存在时返回None"""
+        if self.parts['relationships'] is None:
+            return None
+        for rel in self.parts['relationships'].getroot():
+            if rel.get('TargetMode') == 'External':
+                continue
+            if self._media_name_from_target(rel.get('Target')) == media_name:
+                return rel.get('Id')
+        return None
+
+    def _add_media_part(self, data, name):
+        """将媒体内容加入self.parts['media']，内容相同时复用已有文件
+
+        Args:
+            data: 媒体文件二进制内容
+            name: 期望的文件名
+
+        Returns:
+            str: 实际使用的媒体文件名，内容已存在时返回已有文件名，
+                 文件名已被其他内容占用时自动添加序号
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self._media_digest_index().get(digest)
+        if existing is not None:
+            return existing
+
+        media = self.parts['media']
+        base, ext = os.path.splitext(name)
+        counter = 1
+        while name in media:
+            name = f"{base}_{counter}{ext}"
+            counter += 1
+        media[name] = data
+        self._media_digests[name] = (data, digest)
+        return name
+
+    def deduplicate_media(self, dry_run=False):
+        """按内容哈希合并重复的媒体文件
+
+        内容相同的媒体文件只保留一份(保留最先出现的文件名)，所有关系文件中
+        指向重复文件的Target改为指向保留的文件，并删除[Content_Types].xml中
+        被删除文件的Override项。
+
+        Args:
+            dry_run: 为True时只统计不修改文档
+
+        Returns:
+            dict: 去重报告，包含以下键：
+                'media_before': 去重前的媒体文件数量
+                'media_after': 去重后的媒体文件数量
+                'duplicates_removed': 删除的重复文件数量
+                'relationships_remapped': 修改了Target的关系数量
+                'bytes_before': 去重前媒体文件总大小
+                'bytes_after': 去重后媒体文件总大小
+                'bytes_saved': 节省的字节数
+                'groups': 每组重复文件的信息列表，每项为{'kept': 保留的文件名, 'removed': 删除的文件名列表}
+        """
+        media = self.parts['media']
+        names = [name for name in media if name]
+        report = {
+            'media_before': len(names),
+            'media_after': len(names),
+            'duplicates_removed': 0,
+            'relationships_remapped': 0,
+            'bytes_before': sum(len(media[name]) for name in names),
+            'bytes_after': 0,
+            'bytes_saved': 0,
+            'groups': []
+        }
+
+        # 按摘要分组
+        index = self._media_digest_index()
+        replacements = {}
+        groups = {}
+        for name in names:
+            kept = index[self._media_digest(name)]
+            if kept != name:
+                replacements[name] = kept
+                groups.setdefault(kept, []).append(name)
+        report['groups'] = [{'kept': kept, 'removed': removed} for kept, removed in groups.items()]
+        report['duplicates_removed'] = len(replacements)
+        report['media_after'] = len(names) - len(replacements)
+        report['bytes_after'] = report['bytes_before'] - sum(len(media[name]) for name in replacements)
+        report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+
+        if not replacements:
+            return report
+
+        # 重写所有指向重复文件的关系
+        for source_path, rels_root in self._iter_relationship_parts():
+            for rel in rels_root:
+                if rel.get('TargetMode') == 'External':
+                    continue
+                target = rel.get('Target')
+                media_name = self._media_name_from_target(target, source_path)
+                if media_name not in replacements:
+                    continue
+                report['relationships_remapped'] += 1
+                if not dry_run:
+                    # 保持Target原有的路径写法，只替换文件名
+                    rel.set('Target', target[:len(target) - len(media_name)] + replacements[media_name])
+
+        if dry_run:
+            return report
+
+        for name in replacements:
+            del media[name]
+            self._media_digests.pop(name, None)
+
+        # 删除被移除文件的内容类型Override项
+        content_types = self.parts['other'].get('[Content_Types].xml')
+        if isinstance(content_types, ET.ElementTree):
+            removed_parts = {f"/word/media/{name}" for name in replacements}
+            ct_root = content_types.getroot()
+            for override in list(ct_root):
+                if override.tag.endswith('Override') and override.get('PartName') in removed_parts:
+                    ct_root.remove(override)
+
+        return report
+
+    # 以下是并行优化媒体图片的函数
+
+    # 可以安全重新编码的图片格式(扩展名 -> PIL格式名)
+    OPTIMIZABLE_IMAGE_FORMATS = {
+        'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'bmp': 'BMP', 'tif': 'TIFF', 'tiff': 'TIFF'
+    }
+    IMAGE_CONTENT_TYPES = {
+        'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'gif': 'image/gif',
+        'bmp': 'image/bmp', 'tif': 'image/tiff', 'tiff': 'image/tiff',
+        'emf': 'image/x-emf', 'wmf': 'image/x-wmf', 'svg': 'image/svg+xml'
+    }
+
+    def _get_part_relationships(self, part_path):
+        """获取指定部件的关系文件根元素
+
+        Args:
+            part_path: 部件在压缩包中的路径，如'word/document.xml'、'word/header1.xml'
+
+        Returns:
+            Element: 关系文件根元素，不存在时返回None
+        """
+        if part_path == 'word/document.xml':
+            rels = self.parts['relationships']
+            return rels.getroot() if rels is not None else None
+        rels_name = posixpath.join(posixpath.dirname(part_path), '_rels', f"{posixpath.basename(part_path)}.rels")
+        rels = self.parts['other'].get(rels_name)
+        if rels is None:
+            return None
+        if not isinstance(rels, ET.ElementTree):
+            rels = self._parse_xml(rels)
+            if rels is None:
+                return None
+            self.parts['other'][rels_name] = rels
+        return rels.getroot()
+
+    def _iter_story_parts(self):
+        """遍历可能包含图片的XML部件：正文、页眉、页脚、脚注和尾注
+
+        Yields:
+            tuple: (部件路径, 根元素)
+        """
+        if self.root is not None:
+            yield 'word/document.xml', self.root
+        for name, tree in self.parts['headers'].items():
+            if tree is not None:
+                yield f"word/{name}", tree.getroot()
+        for name, tree in self.parts['footers'].items():
+            if tree is not None:
+                yield f"word/{name}", tree.getroot()
+        for name in ['word/footnotes.xml', 'word/endnotes.xml']:
+            tree = self.parts['other'].get(name)
+            if isinstance(tree, ET.ElementTree):
+                yield name, tree.getroot()
+
+    def _ensure_content_type_default(self, extension, content_type):
+        """确保[Content_Types].xml中存在指定扩展名的Default项"""
+        content_types = self.parts['other'].get('[Content_Types].xml')
+        if not isinstance(content_types, ET.ElementTree):
+            return
+        ct_root = content_types.getroot()
+        ct_ns = ct_root.tag[:ct_root.tag.index('}') + 1] if ct_root.tag.startswith('{') else ''
+        for default in ct_root.findall(f"{ct_ns}Default"):
+            if (default.get('Extension') or '').lower() == extension:
+                return
+        default = ET.Element(f"{ct_ns}Default")
+        default.set('Extension', extension)
+        default.set('ContentType', content_type)
+        ct_root.insert(0, default)
+
+    def _collect_image_display_sizes(self, dpi):
+        """统计每个媒体图片在文档中显示所需的最大像素尺寸
+
+        根据wp:extent的显示大小和a:srcRect的裁剪比例计算，同一图片多处使用时取最大值。
+
+        Args:
+            dpi: 目标分辨率(像素/英寸)
+
+        Returns:
+            dict: {媒体文件名: (宽像素, 高像素)}，只包含在DrawingML图片中引用的文件
+        """
+        wp_ns = f"{{{self.NAMESPACES['wp']}}}"
+        a_ns = f"{{{self.NAMESPACES['a']}}}"
+        embed_attr = f"{{{self.NAMESPACES['r']}}}embed"
+        sizes = {}
+
+        for part_path, root in self._iter_story_parts():
+            rels_root = self._get_part_relationships(part_path)
+            if rels_root is None:
+                continue
+            targets = {rel.get('Id'): self._media_name_from_target(rel.get('Target'), part_path)
+                       for rel in rels_root if rel.get('TargetMode') != 'External'}
+
+            for container_tag in ['inline', 'anchor']:
+                for container in root.iter(f"{wp_ns}{container_tag}"):
+                    extent = container.find(f"{wp_ns}extent")
+                    if extent is None:
+                        continue
+                    try:
+                        cx = int(extent.get('cx'))
+                        cy = int(extent.get('cy'))
+                    except (TypeError, ValueError):
+                        continue
+                    for blip_fill in container.iter():
+                        if not blip_fill.tag.endswith('}blipFill'):
+                            continue
+                        blip = blip_fill.find(f"{a_ns}blip")
+                        media_name = targets.get(blip.get(embed_attr)) if blip is not None else None
+                        if not media_name:
+                            continue
+                        # 裁剪后只显示原图的一部分，需要按可见比例放大所需尺寸
+                        visible_x, visible_y = 1.0, 1.0
+                        src_rect = blip_fill.find(f"{a_ns}srcRect")
+                        if src_rect is not None:
+                            crop = {key: int(src_rect.get(key, 0)) / 100000 for key in 'ltrb'}
+                            visible_x = max(1 - crop['l'] - crop['r'], 0.01)
+                            visible_y = max(1 - crop['t'] - crop['b'], 0.01)
+                        # 1英寸 = 914400 EMU
+                        width = int(cx / 914400 * dpi / visible_x + 0.5)
+                        height = int(cy / 914400 * dpi / visible_y + 0.5)
+                        old_width, old_height = sizes.get(media_name, (0, 0))
+                        sizes[media_name] = (max(width, old_width), max(height, old_height))
+        return sizes
+
+    def optimize_images(self, dpi=220, max_workers=None, jpeg_quality=85, convert_to_jpeg=False,
+                        min_bytes=32 * 1024, dry_run=False):
+        """并行优化文档中的媒体图片：按显示大小缩小分辨率并重新压缩
+
+        只处理在DrawingML图片中引用的PNG、JPEG、BMP和TIFF图片，其他格式(EMF、WMF、GIF、SVG等)
+        保持不变。BMP和TIFF转换为PNG；指定convert_to_jpeg时，不含透明通道的PNG在JPEG更小时转换为JPEG。
+        JPEG只在需要缩小时才重新编码；EXIF(含方向标记)和ICC颜色配置原样保留。
+        只有结果比原文件小时才替换，格式变化时同步更新文件名、关系文件和[Content_Types].xml。
+
+        Args:
+            dpi: 按显示大小计算目标像素尺寸时使用的分辨率
+            max_workers: 进程池大小，None表示使用CPU核数，1表示在当前进程中串行处理
+            jpeg_quality: JPEG重新编码的质量(1-95)
+            convert_to_jpeg: 是否允许将不透明的PNG转换为JPEG(有损，适合照片，不适合截图)
+            min_bytes: 小于该大小的图片不处理
+            dry_run: 为True时只计算结果不修改文档
+
+        Returns:
+            dict: 优化报告，包含以下键：
+                'images': 每张图片的处理结果列表，每项包含name、new_name、action、
+                          size_before、size_after、bytes_before、bytes_after、seconds
+                'optimized': 被替换的图片数量
+                'bytes_before': 处理前所有被检查图片的总大小
+                'bytes_after': 处理后的总大小
+                'bytes_saved': 节省的字节数
+                'seconds': 总耗时(秒)
+        """
+        start_time = time.perf_counter()
+        report = {
+            'images': [],
+            'optimized': 0,
+            'bytes_before': 0,
+            'bytes_after': 0,
+            'bytes_saved': 0,
+            'seconds': 0.0
+        }
+
+        display_sizes = self._collect_image_display_sizes(dpi)
+        tasks = []
+        for name, data in self.parts['media'].items():
+            extension = os.path.splitext(name)[1].lower().lstrip('.')
+            if name not in display_sizes or extension not in self.OPTIMIZABLE_IMAGE_FORMATS:
+                continue
+            if len(data) < min_bytes:
+                continue
+            tasks.append((name, data, display_sizes[name], jpeg_quality, convert_to_jpeg))
+
+        if not tasks:
+            return report
+
+        try:
+            import PIL
+        except ImportError:
+            self._report_error("需要安装Pillow库：pip install Pillow")
+            return report
+
+        results = []
+        if max_workers == 1 or len(tasks) == 1:
+            results = [_optimize_image_task(task) for task in tasks]
+        else:
+            try:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(_optimize_image_task, tasks))
+            except (OSError, concurrent.futures.BrokenExecutor) as e:
+                logger.warning("无法启动进程池，改为串行处理: %s", e)
+                results = [_optimize_image_task(task) for task in tasks]
+
+        renames = {}
+        for (name, data, _, _, _), result in zip(tasks, results):
+            new_data = result.pop('data')
+            report['bytes_before'] += result['bytes_before']
+            report['bytes_after'] += result['bytes_after']
+            report['images'].append(result)
+            if new_data is None:
+                continue
+            report['optimized'] += 1
+
+            # 格式变化时生成不冲突的新文件名
+            new_name = name
+            if result['extension'] != os.path.splitext(name)[1].lower().lstrip('.'):
+                base = os.path.splitext(name)[0]
+                new_name = f"{base}.{result['extension']}"
+                counter = 1
+                while new_name in self.parts['media'] or new_name in renames.values():
+                    new_name = f"{base}_{counter}.{result['extension']}"
+                    counter += 1
+            result['new_name'] = new_name
+
+            if dry_run:
+                continue
+            if new_name != name:
+                del self.parts['media'][name]
+                renames[name] = new_name
+                self._ensure_content_type_default(result['extension'],
+                                                  self.IMAGE_CONTENT_TYPES[result['extension']])
+            self.parts['media'][new_name] = new_data
+
+        for result in report['images']:
+            del result['extension']
+
+        if renames:
+            # 重定向关系
+            for source_path, rels_root in self._iter_relationship_parts():
+                for rel in rels_root:
+                    if rel.get('TargetMode') == 'External':
+                        continue
+                    target = rel.get('Target')
+                    media_name = self._media_name_from_target(target, source_path)
+                    if media_name in renames:
+                        rel.set('Target', target[:len(target) - len(media_name)] + renames[media_name])
+            # 删除旧文件名的Override项
+            content_types = self.parts['other'].get('[Content_Types].xml')
+            if isinstance(content_types, ET.ElementTree):
+                removed_parts = {f"/word/media/{name}" for name in renames}
+                ct_root = content_types.getroot()
+                for override in list(ct_root):
+                    if override.tag.endswith('Override') and override.get('PartName') in removed_parts:
+                        ct_root.remove(override)
+
+        report['bytes_saved'] = report['bytes_before'] - report['bytes_after']
+        report['seconds'] = time.perf_counter() - start_time
+        return report
+
+    # 以下是批量插入图片的函数
+
+    def _read_image_size(self, data):
+        """从图片文件头解析像素尺寸，不解码图像数据
+
+        支持PNG、JPEG、GIF和BMP，其他格式交给PIL(同样只读取文件头)。
+
+        Args:
+            data: 图片二进制内容
+
+        Returns:
+            tuple: (宽像素, 高像素)
+        """
+        if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR':
+            return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+        if data[:6] in (b'GIF87a', b'GIF89a'):
+            return int.from_bytes(data[6:8], 'little'), int.from_bytes(data[8:10], 'little')
+        if data[:2] == b'BM' and len(data) >= 26:
+            return (int.from_bytes(data[18:22], 'little', signed=True),
+                    abs(int.from_bytes(data[22:26], 'little', signed=True)))
+        if data[:2] == b'\xff\xd8':
+            # 依次跳过JPEG段，直到遇到SOF段(C0-CF，除C4、C8、CC)
+            pos = 2
+            while pos + 9 < len(data):
+                if data[pos] != 0xFF:
+                    pos += 1
+                    continue
+                marker = data[pos + 1]
+                if marker == 0xFF:
+                    pos += 1
+                    continue
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                    pos += 2
+                    continue
+                length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    return int.from_bytes(data[pos + 7:pos + 9], 'big'), int.from_bytes(data[pos + 5:pos + 7], 'big')
+                pos += 2 + length
+        from PIL import Image
+        with Image.open(BytesIO(data)) as img:
+            return img.size
+
+    def _image_extent_emu(self, img_width, img_height, width=None, height=None):
+        """计算图片的显示大小(EMU)
+
+        Args:
+            img_width: 图片宽度(像素)
+            img_height: 图片高度(像素)
+            width: 指定宽度(厘米)，不指定则按96 DPI使用原始大小
+            height: 指定高度(厘米)，不指定则按96 DPI使用原始大小
+
+        Returns:
+            tuple: (宽EMU, 高EMU)，1厘米=360000 EMU
+        """
+        width_emu = int(width * 360000) if width is not None else int(img_width * 2.54 / 96 * 360000)
+        height_emu = int(height * 360000) if height is not None else int(img_height * 2.54 / 96 * 360000)
+        return width_emu, height_emu
+
+    def _allocate_relationship_ids(self, count, rels_root=None):
+        """批量分配关系文件中不重复的关系ID
+
+        Args:
+            count: 需要分配的ID数量
+            rels_root: 关系文件根元素，默认为document.xml.rels
+
+        Returns:
+            list: 'rIdN'形式的关系ID列表，从现有最大编号之后顺序分配
+        """
+        if rels_root is None:
+            rels_root = self.parts['relationships'].getroot()
+        used_ids = {rel.get('Id') for rel in rels_root}
+        numbers = [int(rel_id[3:]) for rel_id in used_ids
+                   if rel_id and rel_id.startswith('rId') and rel_id[3:].isdigit()]
+        candidate = max(numbers) + 1 if numbers else 1
+        rel_ids = []
+        while len(rel_ids) < count:
+            rel_id = f"rId{candidate}"
+            if rel_id not in used_ids:
+                rel_ids.append(rel_id)
+            candidate += 1
+        return rel_ids
+
+    def _add_image_relationships(self, img_names):
+        """为媒体文件批量添加document.xml.rels中的图片关系，并确保内容类型已登记
+
+        Args:
+            img_names: self.parts['media']中的文件名列表
+
+        Returns:
+            list: 与img_names一一对应的新关系ID列表
+        """
+        rels_root = self.parts['relationships'].getroot()
+        # 新关系元素沿用已有关系的标签(含命名空间)
+        rel_tag = rels_root[0].tag if len(rels_root) else "Relationship"
+        rel_ids = self._allocate_relationship_ids(len(img_names), rels_root)
+        for rel_id, img_name in zip(rel_ids, img_names):
+            new_rel = ET.SubElement(rels_root, rel_tag)
+            new_rel.set("Id", rel_id)
+            new_rel.set("Type", "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image")
+            new_rel.set("Target", f"media/{img_name}")
+            extension = os.path.splitext(img_name)[1].lower().lstrip('.')
+            if extension in self.IMAGE_CONTENT_TYPES:
+                self._ensure_content_type_default(extension, self.IMAGE_CONTENT_TYPES[extension])
+        return rel_ids
+
+    def _allocate_drawing_ids(self, count):
+        """批量分配不重复的绘图对象ID(wp:docPr的id属性)
+
+        Args:
+            count: 需要分配的ID数量
+
+        Returns:
+            list: 从现有最大ID之后顺序分配的整数ID字符串列表
+        """
+        doc_pr_tag = f"{{{self.NAMESPACES['wp']}}}docPr"
+        max_id = 0
+        for part_path, root in self._iter_story_parts():
+            for doc_pr in root.iter(doc_pr_tag):
+                value = doc_pr.get('id', '')
+                if value.isdigit():
+                    max_id = max(max_id, int(value))
+        return [str(max_id + i + 1) for i in range(count)]
+
+    def _build_image_run(self, rel_id, img_name, width_emu, height_emu, drawing_id, description=None):
+        """创建包含内嵌图片的文本运行(w:r/w:drawing/wp:inline)
+
+        Args:
+            rel_id: 图片关系ID
+            img_name: 图片文件名
+            width_emu: 显示宽度(EMU)
+            height_emu: 显示高度(EMU)
+            drawing_id: 绘图对象ID
+            description: 图片描述
+
+        Returns:
+            Element: 新创建的w:r元素
+        """
+        new_run = ET.Element(f"{{{self.NAMESPACES['w']}}}r")
+        drawing = ET.SubElement(new_run, f"{{{self.NAMESPACES['w']}}}drawing")
+        inline = ET.SubElement(drawing, f"{{{self.NAMESPACES['wp']}}}inline")
+        
+        # 设置图片大小
+        extent = ET.SubElement(inline, f"{{{self.NAMESPACES['wp']}}}extent")
+        extent.set("cx", str(width_emu))
+        extent.set("cy", str(height_emu))
+        
+        # 设置效果范围
+        effect_extent = ET.SubElement(inline, f"{{{self.NAMESPACES['wp']}}}effectExtent")
+        effect_extent.set("l", "0")
+        effect_extent.set("t", "0")
+        effect_extent.set("r", "0")
+        effect_extent.set("b", "0")
+        
+        # 设置DOC PROPS
+        doc_pr = ET.SubElement(inline, f"{{{self.NAMESPACES['wp']}}}docPr")
+        doc_pr.set("id", str(drawing_id))
+        doc_pr.set("name", img_name)
+        if description:
+            doc_pr.set("descr", description)
+            
+        # 添加图片数据
+        graphic = ET.SubElement(inline, f"{{{self.NAMESPACES['a']}}}graphic")
+        graphic_data = ET.SubElement(graphic, f"{{{self.NAMESPACES['a']}}}graphicData")
+        graphic_data.set("uri", "http://schemas.openxmlformats.org/drawingml/2006/picture")
+        
+        pic = ET.SubElement(graphic_data, f"{{{self.NAMESPACES['pic']}}}pic")
+        
+        # 图片非视觉属性
+        nvpic_pr = ET.SubElement(pic, f"{{{self.NAMESPACES['pic']}}}nvPicPr")
+        
+        # 图片非视觉绘图属性
+        cnvpr = ET.SubElement(nvpic_pr, f"{{{self.NAMESPACES['pic']}}}cNvPr")
+        cnvpr.set("id", "0")
+        cnvpr.set("name", img_name)
+        if description:
+            cnvpr.set("descr", description)
+            
+        # 图片非视觉图片属性
+        ET.SubElement(nvpic_pr, f"{{{self.NAMESPACES['pic']}}}cNvPicPr")
+        
+        # 图片填充
+        blip_fill = ET.SubElement(pic, f"{{{self.NAMESPACES['pic']}}}blipFill")
+        blip = ET.SubElement(blip_fill, f"{{{self.NAMESPACES['a']}}}blip")
+        blip.set(f"{{{self.NAMESPACES['r']}}}embed", rel_id)
+        
+        # 源矩形
+        ET.SubElement(blip_fill, f"{{{self.NAMESPACES['a']}}}srcRect")
+        
+        # 拉伸
+        stretch = ET.SubElement(blip_fill, f"{{{self.NAMESPACES['a']}}}stretch")
+        ET.SubElement(stretch, f"{{{self.NAMESPACES['a']}}}fillRect")
+        
+        # 图片形状属性
+        sppr = ET.SubElement(pic, f"{{{self.NAMESPACES['pic']}}}spPr")
+        
+        # 预设几何形状
+        xfrm = ET.SubElement(sppr, f"{{{self.NAMESPACES['a']}}}xfrm")
+        off = ET.SubElement(xfrm, f"{{{self.NAMESPACES['a']}}}off")
+        off.set("x", "0")
+        off.set("y", "0")
+        ext = ET.SubElement(xfrm, f"{{{self.NAMESPACES['a']}}}ext")
+        ext.set("cx", str(width_emu))
+        ext.set("cy", str(height_emu))
+        
+        # 预设几何形状
+        prst_geom = ET.SubElement(sppr, f"{{{self.NAMESPACES['a']}}}prstGeom")
+        prst_geom.set("prst", "rect")
+        ET.SubElement(prst_geom, f"{{{self.NAMESPACES['a']}}}avLst")
+        return new_run
+
+    def insert_images(self, element_index, images, position='after', alignment='center'):
+        """批量插入图片，每张图片单独成为一个段落
+
+        每个文件只读取一次，尺寸从文件头解析；关系ID和绘图对象ID批量分配，
+        保证不重复；所有新段落一次性插入并只重建一次元素索引。
+        任何一张图片读取失败时不修改文档。
+
+        Args:
+            element_index: self.elements中的锚点元素索引，支持负索引
+            images: 图片序列，每一项可以是：
+                str: 图片文件路径
+                dict: 包含'path'键，以及可选的'width'、'height'(厘米)和'description'键
+            position: 插入位置，'before'或'after'
+            alignment: 图片段落的对齐方式，为None时不设置
+
+        Returns:
+            list: 新段落在self.elements中的索引列表，失败则返回空列表
+        """
+        if self.parts.get('relationships') is None:
+            self._report_error("找不到document.xml.rels文件")
+            return []
+
+        # 先检查锚点和插入位置，避免添加媒体文件和关系后才发现无法插入
+        elements_count = len(self.elements)
+        if element_index < 0:
+            element_index = elements_count + element_index
+        if element_index < 0 or element_index >= elements_count:
+            self._report_error(f"元素索引{element_index}超出范围(0-{elements_count-1})", DocxIndexError)
+            return []
+        if not isinstance(position, str) or position.lower() not in ('before', 'after'):
+            self._report_error(f"无效的插入位置: {position}，应为'before'或'after'")
+            return []
+
+        # 读取所有图片，全部成功后再修改文档
+        loaded = []
+        for item in images:
+            if not isinstance(item, dict):
+                item = {'path': item}
+            image_path = item.get('path', '')
+            try:
+                with open(image_path, 'rb') as img_file:
+                    img_data = img_file.read()
+                img_width, img_height = self._read_image_size(img_data)
+            except Exception as e:
+                self._report_error(f"读取图片 {image_path} 时出错: {e}", exc=e)
+                return []
+            width_emu, height_emu = self._image_extent_emu(
+                img_width, img_height, item.get('width'), item.get('height'))
+            loaded.append((image_path, img_data, width_emu, height_emu, item.get('description')))
+
+        if not loaded:
+            return []
+
+        # 记录修改前的媒体文件和关系，插入失败时撤销
+        media_before = set(self.parts['media'])
+        rels_root = self.parts['relationships'].getroot()
+        rels_count = len(rels_root)
+        try:
+            # 添加媒体文件，内容相同的图片复用已有文件和关系
+            img_names = [self._add_media_part(img_data, os.path.basename(image_path))
+                         for image_path, img_data, _, _, _ in loaded]
+            rel_ids = {}
+            for img_name in img_names:
+                if img_name not in rel_ids:
+                    rel_ids[img_name] = self._find_media_relationship(img_name)
+            new_names = [img_name for img_name, rel_id in rel_ids.items() if rel_id is None]
+            rel_ids.update(zip(new_names, self._add_image_relationships(new_names)))
+
+            drawing_ids = self._allocate_drawing_ids(len(loaded))
+            style_properties = {'alignment': alignment} if alignment else {}
+            paragraphs = []
+            for (image_path, _, width_emu, height_emu, description), img_name, drawing_id in \
+                    zip(loaded, img_names, drawing_ids):
+                paragraph = self._build_paragraph_element('', **style_properties)
+                paragraph.append(self._build_image_run(
+                    rel_ids[img_name], img_name, width_emu, height_emu, drawing_id, description))
+                paragraphs.append(paragraph)
+        except Exception as e:
+            self._discard_new_images(media_before, rels_count)
+            self._report_error(f"批量插入图片时出错: {e}", exc=e)
+            return []
+
+        try:
+            inserted = self.insert_paragraphs(element_index, paragraphs, position=position)
+        except DocxError:
+            self._discard_new_images(media_before, rels_count)
+            raise
+        if not inserted:
+            self._discard_new_images(media_before, rels_count)
+        return inserted
+
+    def _discard_new_images(self, media_before, rels_count):
+        """撤销insert_images添加的媒体文件和关系
+
+        Args:
+            media_before: 修改前self.parts['media']中的文件名集合
+            rels_count: 修改前document.xml.rels中的关系数量(新关系追加在末尾)
+        """
+        media = self.parts['media']
+        for name in [name for name in media if name not in media_before]:
+            del media[name]
+            self._media_digests.pop(name, None)
+        rels_root = self.parts['relationships'].getroot()
+        del rels_root[rels_count:]
+
+    # 以下是按文档顺序提取图片的函数
+
+    def _collect_image_references(self, include_headers_footers=True):
+        """按文档顺序收集所有图片引用(a:blip和v:imagedata)并解析到媒体文件
+
+        Args:
+            include_headers_footers: 是否包含页眉、页脚、脚注和尾注中的图片
+
+        Returns:
+            list: 每个图片引用一项，包含part、element_index、paragraph_index、
+                  relationship_id、media_name、name、alt_text、extent_cx、extent_cy
+        """
+        wp_ns = f"{{{self.NAMESPACES['wp']}}}"
+        blip_tag = f"{{{self.NAMESPACES['a']}}}blip"
+        imagedata_tag = f"{{{self.NAMESPACES['v']}}}imagedata"
+        embed_attr = f"{{{self.NAMESPACES['r']}}}embed"
+        rid_attr = f"{{{self.NAMESPACES['r']}}}id"
+        title_attr = f"{{{self.NAMESPACES['o']}}}title"
+        container_tags = {f"{wp_ns}inline", f"{wp_ns}anchor"}
+
+        paragraph_numbers = {id(p['element']): i for i, p in enumerate(self.paragraphs)}
+        references = []
+
+        for part_path, root in self._iter_story_parts():
+            if part_path != 'word/document.xml' and not include_headers_footers:
+                continue
+            rels_root = self._get_part_relationships(part_path)
+            if rels_root is None:
+                continue
+            targets = {rel.get('Id'): rel.get('Target') for rel in rels_root
+                       if rel.get('TargetMode') != 'External'}
+
+            if part_path == 'word/document.xml':
+                blocks = [(info['index'], paragraph_numbers.get(id(info['element'])), info['element'])
+                          for info in self.elements]
+            else:
+                blocks = [(None, None, root)]
+
+            for element_index, paragraph_index, block in blocks:
+                # 记录每个图片所在的最内层绘图容器(先序遍历中内层容器后出现，会覆盖外层)
+                owners = {}
+                for container in block.iter():
+                    if container.tag in container_tags:
+                        for blip in container.iter(blip_tag):
+                            owners[id(blip)] = container
+
+                for image in block.iter():
+                    if image.tag == blip_tag:
+                        rel_id = image.get(embed_attr)
+                    elif image.tag == imagedata_tag:
+                        rel_id = image.get(rid_attr)
+                    else:
+                        continue
+                    media_name = self._media_name_from_target(targets.get(rel_id), part_path)
+                    if not media_name:
+                        continue
+
+                    reference = {
+                        'part': part_path,
+                        'element_index': element_index,
+                        'paragraph_index': paragraph_index,
+                        'relationship_id': rel_id,
+                        'media_name': media_name,
+                        'name': None,
+                        'alt_text': image.get(title_attr) if image.tag == imagedata_tag else None,
+                        'extent_cx': None,
+                        'extent_cy': None
+                    }
+                    container = owners.get(id(image))
+                    if container is not None:
+                        doc_pr = container.find(f"{wp_ns}docPr")
+                        if doc_pr is not None:
+                            reference['name'] = doc_pr.get('name')
+                            reference['alt_text'] = doc_pr.get('descr') or doc_pr.get('title')
+                        extent = container.find(f"{wp_ns}extent")
+                        if extent is not None:
+                            reference['extent_cx'] = int(extent.get('cx', 0))
+                            reference['extent_cy'] = int(extent.get('cy', 0))
+                    references.append(reference)
+        return references
+
+    def extract_images(self, output_dir, include_headers_footers=True, max_workers=8,
+                       manifest_name='manifest.json', filename_format='image_{order:03d}'):
+        """按文档中的出现顺序提取图片，并生成包含位置和描述信息的清单文件
+
+        每个图片引用都解析到对应的关系和媒体文件；同一媒体文件被多次引用时只写出一次，
+        文件按第一次出现的顺序命名。文件写入在线程池中并行进行。
+        图片内容取自当前内存中的self.parts['media']，因此包含对图片的修改。
+
+        Args:
+            output_dir: 输出目录
+            include_headers_footers: 是否包含页眉、页脚、脚注和尾注中的图片
+            max_workers: 写文件的线程数
+            manifest_name: 清单文件名(JSON)，为None时不写清单
+            filename_format: 输出文件名格式(不含扩展名)，可使用{order}占位符
+
+        Returns:
+            int: 写出的图片文件数量
+            list: 清单条目列表，每个图片引用一项，包含order、file、part、element_index、
+                  paragraph_index、relationship_id、media_name、name、alt_text、
+                  extent_cx、extent_cy、width_cm、height_cm、pixel_width、pixel_height、bytes
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        references = self._collect_image_references(include_headers_footers)
+        files = {}
+        pixel_sizes = {}
+        manifest = []
+        for reference in references:
+            media_name = reference['media_name']
+            data = self.parts['media'].get(media_name)
+            if data is None:
+                logger.warning("未找到媒体文件 %s", media_name)
+                continue
+
+            if media_name not in files:
+                order = len(files) + 1
+                extension = os.path.splitext(media_name)[1].lower()
+                files[media_name] = f"{filename_format.format(order=order)}{extension}"
+                try:
+                    pixel_sizes[media_name] = self._read_image_size(data)
+                except Exception:
+                    # EMF/WMF等无法读取尺寸的格式
+                    pixel_sizes[media_name] = (None, None)
+
+            entry = dict(reference)
+            entry['order'] = len(manifest) + 1
+            entry['file'] = files[media_name]
+            entry['width_cm'] = round(reference['extent_cx'] / 360000, 2) if reference['extent_cx'] else None
+            entry['height_cm'] = round(reference['extent_cy'] / 360000, 2) if reference['extent_cy'] else None
+            entry['pixel_width'], entry['pixel_height'] = pixel_sizes[media_name]
+            entry['bytes'] = len(data)
+            manifest.append(entry)
+
+        def write_file(item):
+            media_name, filename = item
+            with open(os.path.join(output_dir, filename), 'wb') as f:
+                f.write(self.parts['media'][media_name])
+
+        count = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(write_file, item): item for item in files.items()}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    future.result()
+                    count += 1
+                except Exception as e:
+                    logger.warning("提取图片 %s 时出错: %s", futures[future][1], e, exc_info=e)
+
+        if manifest_name:
+            with open(os.path.join(output_dir, manifest_name), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        logger.info("成功提取%d张图片到%s目录", count, output_dir)
+        return count, manifest
+
+    # 以下是清理无引用部件的函数
+
+    # 部件XML中没有引用其ID时可以安全删除的关系类型(Type的最后一段)
+    COLLECTABLE_RELATIONSHIP_TYPES = ['image', 'oleObject', 'package']
+
+    def _iter_package_part_names(self):
+        """遍历self.parts中所有部件在压缩包中的路径"""
+        for part_name, path in [('document', 'word/document.xml'), ('styles', 'word/styles.xml'),
+                                ('relationships', 'word/_rels/document.xml.rels'),
+                                ('numbering', 'word/numbering.xml')]:
+            if self.parts[part_name] is not None:
+                yield path
+        for name in self.parts['headers']:
+            yield f"word/{name}"
+        for name in self.parts['footers']:
+            yield f"word/{name}"
+        for name in self.parts['media']:
+            if name:
+                yield f"word/media/{name}"
+        for name in self.parts['embeddings']:
+            if name:
+                yield f"word/embeddings/{name}"
+        yield from self.parts['other']
+
+    def _get_part_xml_root(self, part_path):
+        """获取指定路径XML部件的根元素，不是已解析的XML部件时返回None"""
+        if part_path == 'word/document.xml':
+            return self.root
+        tree = None
+        if posixpath.dirname(part_path) == 'word':
+            name = posixpath.basename(part_path)
+            tree = (self.parts['headers'].get(name) or self.parts['footers'].get(name)
+                    or {'styles.xml': self.parts['styles'], 'numbering.xml': self.parts['numbering']}.get(name))
+        if tree is None:
+            tree = self.parts['other'].get(part_path)
+        return tree.getroot() if isinstance(tree, ET.ElementTree) else None
+
+    def _resolve_part_target(self, source_path, target):
+        """将关系的Target解析为压缩包中的绝对路径(不含开头的'/')"""
+        if target.startswith('/'):
+            return target.lstrip('/')
+        return posixpath.normpath(posixpath.join(posixpath.dirname(source_path), target))
+
+    def collect_orphan_parts(self, dry_run=False):
+        """从document.xml出发沿关系图做可达性分析，删除无引用的媒体、嵌入对象和关系
+
+        删除的内容包括：
+            - 图片、OLE对象等关系，其ID在所属部件的XML中已没有任何引用
+            - 从正文、页眉、页脚等部件的关系图都无法到达的媒体文件和嵌入对象
+            - 所属部件已不存在的.rels关系文件
+        同时删除[Content_Types].xml中被删除部件的Override项。
+
+        Args:
+            dry_run: 为True时只统计不修改文档
+
+        Returns:
+            dict: 清理报告，包含以下键：
+                'relationships_removed': 删除的关系列表，每项为{'part', 'id', 'target'}
+                'media_removed': 删除的媒体文件名列表
+                'embeddings_removed': 删除的嵌入对象文件名列表
+                'rels_parts_removed': 删除的关系文件路径列表
+                'bytes_saved': 删除部件的总大小(未压缩)
+        """
+        report = {
+            'relationships_removed': [],
+            'media_removed': [],
+            'embeddings_removed': [],
+            'rels_parts_removed': [],
+            'bytes_saved': 0
+        }
+        existing = set(self._iter_package_part_names())
+
+        # 沿关系图遍历可达部件，同时找出XML中已无引用的关系
+        reachable = set()
+        dead_relationships = []
+        pending = ['word/document.xml']
+        while pending:
+            part_path = pending.pop()
+            if part_path in reachable:
+                continue
+            reachable.add(part_path)
+            rels_root = self._get_part_relationships(part_path)
+            if rels_root is None:
+                continue
+
+            # 任何属性值与关系ID相同都视为引用，不只是r:命名空间的属性
+            # (如VML中v:imagedata的o:relid)
+            used_ids = None
+            xml_root = self._get_part_xml_root(part_path)
+            if xml_root is not None:
+                rel_ids = {rel.get('Id') for rel in rels_root}
+                used_ids = {value for element in xml_root.iter()
+                            for value in element.attrib.values() if value in rel_ids}
+
+            for rel in rels_root:
+                if rel.get('TargetMode') == 'External' or not rel.get('Target'):
+                    continue
+                rel_type = (rel.get('Type') or '').rsplit('/', 1)[-1]
+                if (used_ids is not None and rel_type in self.COLLECTABLE_RELATIONSHIP_TYPES
+                        and rel.get('Id') not in used_ids):
+                    dead_relationships.append((rels_root, rel))
+                    report['relationships_removed'].append(
+                        {'part': part_path, 'id': rel.get('Id'), 'target': rel.get('Target')})
+                    continue
+                target_path = self._resolve_part_target(part_path, rel.get('Target'))
+                if target_path in existing:
+                    pending.append(target_path)
+
+        report['media_removed'] = [name for name in self.parts['media']
+                                   if name and f"word/media/{name}" not in reachable]
+        report['embeddings_removed'] = [name for name in self.parts['embeddings']
+                                        if name and f"word/embeddings/{name}" not in reachable]
+
+        # 所属部件不存在的关系文件(_rels/.rels是包级关系，始终保留)
+        for name in self.parts['other']:
+            if not name.endswith('.rels') or name == '_rels/.rels':
+                continue
+            rels_dir, rels_file = posixpath.split(name)
+            if posixpath.basename(rels_dir) != '_rels':
+                continue
+            source_path = posixpath.join(posixpath.dirname(rels_dir), rels_file[:-len('.rels')])
+            if source_path not in existing:
+                report['rels_parts_removed'].append(name)
+
+        report['bytes_saved'] = (sum(len(self.parts['media'][name]) for name in report['media_removed'])
+                                 + sum(len(self.parts['embeddings'][name]) for name in report['embeddings_removed']))
+
+        if dry_run:
+            return report
+
+        for rels_root, rel in dead_relationships:
+            rels_root.remove(rel)
+        for name in report['media_removed']:
+            del self.parts['media'][name]
+            self._media_digests.pop(name, None)
+        for name in report['embeddings_removed']:
+            del self.parts['embeddings'][name]
+        for name in report['rels_parts_removed']:
+            del self.parts['other'][name]
+
+        removed_parts = ({f"/word/media/{name}" for name in report['media_removed']}
+                         | {f"/word/embeddings/{name}" for name in report['embeddings_removed']})
+        content_types = self.parts['other'].get('[Content_Types].xml')
+        if removed_parts and isinstance(content_types, ET.ElementTree):
+            ct_root = content_types.getroot()
+            for override in list(ct_root):
+                if override.tag.endswith('Override') and override.get('PartName') in removed_parts:
+                    ct_root.remove(override)
+
+        return report
+
+    # 以下是供asyncio事件循环使用的异步接口
+
+    @classmethod
+    async def open_async(cls, path, executor=None, **kwargs):
+        """在执行器中打开并解析文档，不阻塞事件循环
+
+        Args:
+            path: Word文档的文件路径
+            executor: concurrent.futures执行器，None表示事件循环的默认线程池
+            **kwargs: 传给构造函数的其他参数(如dedupe_media)
+
+        Returns:
+            DocxElementParser: 解析后的文档对象
+
+        取消等待时，尚未开始的解析不会执行；已经开始的解析会在后台完成，其结果被丢弃。
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(cls, path, **kwargs))
+
+    async def save_async(self, output_path, executor=None, **save_options):
+        """在执行器中保存文档，不阻塞事件循环
+
+        Args:
+            output_path: 输出文档的路径
+            executor: concurrent.futures执行器，None表示事件循环的默认线程池
+            **save_options: 传给save的其他选项
+
+        Returns:
+            bool: save的返回值
+
+        保存期间不要在其他协程中修改该文档。取消等待时，已经开始的保存会在后台完成。
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(self.save, output_path, **save_options))
+
+    async def extract_text_async(self, executor=None):
+        """在执行器中提取文档全部文本，不阻塞事件循环
+
+        Args:
+            executor: concurrent.futures执行器，None表示事件循环的默认线程池
+
+        Returns:
+            str: 文档的全部文本
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.get_all_text)
+
+    # 以下是内存占用统计的函数
+
+    def _estimate_tree_memory(self, xml_tree):
+        """估算一个已解析XML部件占用的内存
+
+        元素大小使用sys.getsizeof(包含子元素指针数组)，属性字典按属性个数估算，
+        文本和属性值按字符串对象大小计算。标签名和属性名在同一次解析中是共享的字符串，不计入。
+        不访问element.attrib，避免为没有属性的元素创建空字典。
+
+        Returns:
+            dict: {'elements', 'attributes', 'element_bytes', 'attribute_bytes', 'text_bytes', 'estimated_bytes'}
+        """
+        dict_sizes = {}
+        stats = {'elements': 0, 'attributes': 0, 'element_bytes': 0, 'attribute_bytes': 0, 'text_bytes': 0}
+        getsizeof = sys.getsizeof
+        for element in xml_tree.iter():
+            stats['elements'] += 1
+            stats['element_bytes'] += getsizeof(element)
+            items = element.items()
+            if items:
+                count = len(items)
+                if count not in dict_sizes:
+                    dict_sizes[count] = getsizeof(dict.fromkeys(range(count)))
+                stats['attributes'] += count
+                stats['attribute_bytes'] += dict_sizes[count] + sum(getsizeof(value) for _, value in items)
+            if element.text is not None:
+                stats['text_bytes'] += getsizeof(element.text)
+            if element.tail is not None:
+                stats['text_bytes'] += getsizeof(element.tail)
+        stats['estimated_bytes'] = stats['element_bytes'] + stats['attribute_bytes'] + stats['text_bytes']
+        return stats
+
+    def _estimate_index_memory(self):
+        """估算元素索引列表占用的内存(同一个信息字典被多个列表引用时只计一次)"""
+        seen = set()
+        report = {}
+        for name in ['elements', 'paragraphs', 'tables', 'sections']:
+            entries = getattr(self, name)
+            size = sys.getsizeof(entries)
+            for info in entries:
+                if id(info) in seen:
+                    continue
+                seen.add(id(info))
+                size += sys.getsizeof(info)
+                # 元素对象属于XML树，不计入；字符串值(标签、ID、预览等)计入
+                size += sum(sys.getsizeof(value) for value in info.values() if isinstance(value, str))
+            report[name] = {'entries': len(entries), 'estimated_bytes': size}
+        report['table_views'] = {
+            'entries': len(self._table_views),
+            'estimated_bytes': sys.getsizeof(self._table_views) + sum(
+                sys.getsizeof(view._cells) + sum(sys.getsizeof(row) for row in view._cells)
+                for view in self._table_views.values() if view._cells is not None)
+        }
+        report['media_digests'] = {
+            'entries': len(self._media_digests),
+            'estimated_bytes': sys.getsizeof(self._media_digests)
+                               + sum(sys.getsizeof(digest) for _, digest in self._media_digests.values())
+        }
+        return report
+
+    def memory_report(self, profile_load=False, top=10):
+        """估算文档在内存中各部分的占用，找出适合延迟加载或释放的部分
+
+        Args:
+            profile_load: 是否用tracemalloc重新加载一次文档，记录加载过程的实际内存峰值
+                          和分配最多的代码行(较慢，只用于诊断)
+            top: tracemalloc报告中保留的代码行数
+
+        Returns:
+            dict: 包含以下键：
+                'parts': 每个XML部件的统计列表(按估算大小降序)，每项包含'part'和_estimate_tree_memory的各键
+                'binary': 每个二进制条目(媒体、嵌入对象等)的列表，每项包含'part'和'bytes'
+                'indexes': 各元素索引列表的{'entries', 'estimated_bytes'}
+                'totals': 'xml_bytes'、'binary_bytes'、'index_bytes'和'estimated_bytes'合计
+                'load_profile': 仅profile_load时存在，包含'current_bytes'、'peak_bytes'和'top'
+                                (每项为{'location', 'bytes', 'count'})
+        """
+        report = {'parts': [], 'binary': [], 'indexes': {}, 'totals': {}}
+        seen = set()
+        for file_path, content in self._iter_save_entries():
+            if content is None or id(content) in seen:
+                continue
+            seen.add(id(content))
+            if isinstance(content, ET.ElementTree):
+                part = {'part': file_path}
+                part.update(self._estimate_tree_memory(content))
+                report['parts'].append(part)
+            else:
+                report['binary'].append({'part': file_path, 'bytes': sys.getsizeof(content)})
+        report['parts'].sort(key=lambda part: part['estimated_bytes'], reverse=True)
+        report['binary'].sort(key=lambda entry: entry['bytes'], reverse=True)
+        report['indexes'] = self._estimate_index_memory()
+
+        totals = report['totals']
+        totals['xml_bytes'] = sum(part['estimated_bytes'] for part in report['parts'])
+        totals['binary_bytes'] = sum(entry['bytes'] for entry in report['binary'])
+        totals['index_bytes'] = sum(index['estimated_bytes'] for index in report['indexes'].values())
+        totals['estimated_bytes'] = totals['xml_bytes'] + totals['binary_bytes'] + totals['index_bytes']
+
+        if profile_load:
+            report['load_profile'] = self._profile_load_memory(top)
+        return report
+
+    def _profile_load_memory(self, top=10):
+        """用tracemalloc记录重新加载本文档时的内存分配"""
+        import tracemalloc
+
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.take_snapshot()
+            base_current, _ = tracemalloc.get_traced_memory()
+            document = type(self)(self.path)
+            current, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            differences = snapshot.compare_to(baseline, 'lineno')
+            del document
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+
+        return {
+            'current_bytes': current - base_current,
+            'peak_bytes': peak - base_current,
+            'top': [{
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'bytes': stat.size_diff,
+                'count': stat.count_diff
+            } for stat in differences[:top]]
+        }
+
+
+class DocxTableView:
+    """表格的随机访问视图，通过DocxElementParser.get_table_view获取
+
+    单元格网格在第一次访问时才构建并缓存，之后按(行, 列)读写单元格都是O(1)，
+    合并单元格覆盖的任意位置都指向合并区域左上角的单元格。
+    如果通过其他方式增删了表格的行或单元格，需要调用invalidate()重新构建网格。
+    """
+
+    # w:tcPr子元素的规范顺序(即OOXML架构中CT_TcPr定义的顺序)
+    TCPR_CHILD_ORDER = [
+        'cnfStyle', 'tcW', 'gridSpan', 'hMerge', 'vMerge', 'tcBorders', 'shd', 'noWrap',
+        'tcMar', 'textDirection', 'tcFitText', 'vAlign', 'hideMark'
+    ]
+
+    # w:pPr子元素的规范顺序(即OOXML架构中CT_PPr定义的顺序)
+    PPR_CHILD_ORDER = [
+        'pStyle', 'keepNext', 'keepLines', 'pageBreakBefore', 'framePr', 'widowControl', 'numPr',
+        'suppressLineNumbers', 'pBdr', 'shd', 'tabs', 'suppressAutoHyphens', 'kinsoku', 'wordWrap',
+        'overflowPunct', 'topLinePunct', 'autoSpaceDE', 'autoSpaceDN', 'bidi', 'adjustRightInd',
+        'snapToGrid', 'spacing', 'ind', 'contextualSpacing', 'mirrorIndents', 'suppressOverlap', 'jc',
+        'textDirection', 'textAlignment', 'textboxTightWrap', 'outlineLvl', 'divId', 'cnfStyle',
+        'rPr', 'sectPr', 'pPrChange'
+    ]
+
+    def __init__(self, parser, table_element):
+        """初始化表格视图
+
+        Args:
+            parser: 所属的DocxElementParser对象
+            table_element: 表格XML元素
+        """
+        self.parser = parser
+        self.element = table_element
+        self._cells = None
+        self._origins = None
+
+    def _ensure_grid(self):
+        """按需构建单元格网格"""
+        if self._cells is None:
+            self._cells, regions, _ = self.parser._build_table_cell_grid(self.element)
+            self._origins = {id(region['element']): (region['row'], region['col']) for region in regions}
+        return self._cells
+
+    def invalidate(self):
+        """丢弃缓存的网格，下次访问时重新构建"""
+        self._cells = None
+        self._origins = None
+
+    @property
+    def rows(self):
+        """网格行数"""
+        return len(self._ensure_grid())
+
+    @property
+    def cols(self):
+        """网格列数"""
+        cells = self._ensure_grid()
+        return len(cells[0]) if cells else 0
+
+    def cell(self, row, col):
+        """获取指定位置的单元格元素，支持负索引
+
+        Args:
+            row: 行索引
+            col: 列索引
+
+        Returns:
+            Element或None: 覆盖该位置的w:tc元素(合并区域返回左上角单元格)，
+                           索引越界或该位置是gridBefore/gridAfter空位时返回None
+                           (只有越界才报告错误，空位是有效的位置)
+        """
+        cells = self._ensure_grid()
+        rows, cols = len(cells), self.cols
+        if not (-rows <= row < rows and -cols <= col < cols):
+            self.parser._report_error(f"单元格位置({row}, {col})超出范围({rows}行×{cols}列)", DocxIndexError)
+            return None
+        return cells[row][col]
+
+    def _editable_cell(self, row, col):
+        """获取要修改的单元格元素，位置越界或是没有单元格的空位时报告错误并返回None"""
+        cells = self._ensure_grid()
+        rows, cols = len(cells), self.cols
+        if not (-rows <= row < rows and -cols <= col < cols):
+            self.parser._report_error(f"单元格位置({row}, {col})超出范围({rows}行×{cols}列)", DocxIndexError)
+            return None
+        tc = cells[row][col]
+        if tc is None:
+            self.parser._report_error(f"单元格位置({row}, {col})是gridBefore/gridAfter空位，没有可修改的单元格")
+        return tc
+
+    def origin(self, row, col):
+        """获取指定位置所属合并区域左上角的(行, 列)，位置无效时返回None"""
+        tc = self.cell(row, col)
+        if tc is None:
+            return None
+        return self._origins.get(id(tc))
+
+    def get_text(self, row, col, separator='\n'):
+        """获取单元格文本，多个段落之间用separator连接"""
+        tc = self.cell(row, col)
+        if tc is None:
+            return None
+        return self.parser._get_cell_text(tc, separator)
+
+    def set_text(self, row, col, text):
+        """设置单元格文本，替换单元格中原有的所有段落
+
+        保留第一个段落的段落属性和第一个文本运行的运行属性，文本中的换行符转为w:br。
+        单元格中的嵌套表格会被保留。
+
+        Args:
+            row: 行索引
+            col: 列索引
+            text: 新的单元格文本
+
+        Returns:
+            bool: 是否成功设置
+        """
+        tc = self._editable_cell(row, col)
+        if tc is None:
+            return False
+
+        w_ns = f"{{{self.parser.NAMESPACES['w']}}}"
+        try:
+            paragraphs = list(self.parser._iter_block_children(tc, 'p'))
+            if paragraphs:
+                paragraph = paragraphs[0]
+            else:
+                paragraph = ET.SubElement(tc, f"{w_ns}p")
+
+            # 保留第一个文本运行的运行属性
+            first_run = paragraph.find(f".//{w_ns}r")
+            r_pr = first_run.find(f"{w_ns}rPr") if first_run is not None else None
+
+            # 清空段落内容(保留pPr)并移除其他段落
+            paragraph[:] = [child for child in paragraph if child.tag == f"{w_ns}pPr"]
+            for other in paragraphs[1:]:
+                self._remove_from_cell(tc, other)
+
+            r = ET.SubElement(paragraph, f"{w_ns}r")
+            if r_pr is not None:
+                r.append(r_pr)
+            for i, line in enumerate(str(text).split('\n')):
+                if i:
+                    ET.SubElement(r, f"{w_ns}br")
+                t = ET.SubElement(r, f"{w_ns}t")
+                if line.startswith(' ') or line.endswith(' ') or '  ' in line:
+                    t.set(f"{{{self.parser.NAMESPACES['xml']}}}space", "preserve")
+                t.text = line
+
+            # 单元格的最后一个块级元素必须是段落
+            if tc[-1].tag != f"{w_ns}p":
+                ET.SubElement(tc, f"{w_ns}p")
+            return True
+        except Exception as e:
+            self.parser._report_error(f"设置单元格文本时出错: {e}", exc=e)
+            return False
+
+    def _remove_from_cell(self, tc, element):
+        """从单元格(或其中的sdt/customXml包装)中移除元素"""
+        for parent in tc.iter():
+            if element in list(parent):
+                parent.remove(element)
+                return
+
+    def set_properties(self, row, col, **properties):
+        """设置单元格属性及单元格内文本的格式
+
+        Args:
+            row: 行索引
+            col: 列索引
+            **properties: 可包含以下键：
+                fill: 背景填充颜色(如'FFFF00')
+                v_align: 垂直对齐方式(top, center, bottom)
+                width: 单元格宽度(twip)
+                alignment: 单元格内段落的对齐方式(left, center, right, both)
+                bold: 文本是否加粗
+                italic: 文本是否斜体
+                color: 文本颜色
+                size: 文本字号(半磅值)，同时设置复杂文种字号(szCs)
+
+        Returns:
+            bool: 是否成功设置
+        """
+        tc = self._editable_cell(row, col)
+        if tc is None:
+            return False
+
+        w_ns = f"{{{self.parser.NAMESPACES['w']}}}"
+        try:
+            tc_pr = tc.find(f"{w_ns}tcPr")
+            if tc_pr is None:
+                tc_pr = ET.Element(f"{w_ns}tcPr")
+                tc.insert(0, tc_pr)
+
+            if 'width' in properties:
+                tc_w = self._get_or_create_ordered_child(tc_pr, 'tcW', self.TCPR_CHILD_ORDER)
+                tc_w.set(f"{w_ns}w", str(properties['width']))
+                tc_w.set(f"{w_ns}type", "dxa")
+            if 'fill' in properties:
+                shd = self._get_or_create_ordered_child(tc_pr, 'shd', self.TCPR_CHILD_ORDER)
+                shd.set(f"{w_ns}val", "clear")
+                shd.set(f"{w_ns}color", "auto")
+                shd.set(f"{w_ns}fill", properties['fill'])
+            if 'v_align' in properties:
+                v_align = self._get_or_create_ordered_child(tc_pr, 'vAlign', self.TCPR_CHILD_ORDER)
+                v_align.set(f"{w_ns}val", properties['v_align'])
+
+            paragraphs = list(self.parser._iter_block_children(tc, 'p'))
+            if 'alignment' in properties:
+                for paragraph in paragraphs:
+                    p_pr = self.parser._get_or_create_pPr(paragraph)
+                    jc = self._get_or_create_ordered_child(p_pr, 'jc', self.PPR_CHILD_ORDER)
+                    jc.set(f"{w_ns}val", properties['alignment'])
+
+            run_properties = {key: properties[key] for key in ['bold', 'italic', 'color', 'size'] if key in properties}
+            if run_properties:
+                for paragraph in paragraphs:
+                    for r in paragraph.iter(f"{w_ns}r"):
+                        r_pr = self.parser._get_or_create_rPr(r)
+                        for key, value in run_properties.items():
+                            tags = {'bold': ['b'], 'italic': ['i'], 'color': ['color'], 'size': ['sz', 'szCs']}[key]
+                            for tag in tags:
+                                prop = r_pr.find(f"{w_ns}{tag}")
+                                if key in ('bold', 'italic') and not value:
+                                    if prop is not None:
+                                        r_pr.remove(prop)
+                                    continue
+                                if prop is None:
+                                    prop = ET.SubElement(r_pr, f"{w_ns}{tag}")
+                                prop.set(f"{w_ns}val", "true" if key in ('bold', 'italic') else str(value))
+                        self.parser._canonicalize_rPr(r_pr)
+            return True
+        except Exception as e:
+            self.parser._report_error(f"设置单元格属性时出错: {e}", exc=e)
+            return False
+
+    def _get_or_create_ordered_child(self, parent, local_name, child_order):
+        """获取或按规范顺序创建属性元素(tcPr、pPr等)的子元素
+
+        Args:
+            parent: 属性元素
+            local_name: 子元素的本地名称
+            child_order: 子元素本地名称的规范顺序列表
+        """
+        w_ns = f"{{{self.parser.NAMESPACES['w']}}}"
+        child = parent.find(f"{w_ns}{local_name}")
+        if child is not None:
+            return child
+        child = ET.Element(f"{w_ns}{local_name}")
+        order = child_order.index(local_name)
+        position = len(parent)
+        for i, existing in enumerate(parent):
+            existing_name = existing.tag.split('}')[-1]
+            if existing_name in child_order and child_order.index(existing_name) > order:
+                position = i
+                break
+        parent.insert(position, child)
+        return child
+
+def _open_and_apply(path, func=None):
+    """打开文档并对其调用func(模块级函数，便于进程池序列化)"""
+    parser = DocxElementParser(path)
+    return func(parser) if func is not None else parser
+
+
+async def process_documents_async(paths, func=None, max_concurrency=4, executor=None,
+                                  return_exceptions=True):
+    """以有限并发在执行器中批量打开并处理文档
+
+    每个文档的打开和处理在同一个执行器任务中完成，使用ProcessPoolExecutor时只需传回func的结果，
+    此时func必须是可序列化的模块级函数。
+
+    Args:
+        paths: 文档路径序列
+        func: 对每个DocxElementParser调用的函数，None时返回文档对象本身
+        max_concurrency: 同时处理的最大文档数
+        executor: concurrent.futures执行器，None表示事件循环的默认线程池
+        return_exceptions: 为True时单个文档出错会把异常对象放在结果中，而不是中断整个批次
+
+    Returns:
+        list: 与paths一一对应的结果列表
+
+    取消时，尚未开始的文档不再处理，正在处理的文档会在后台完成。
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def process(path):
+        async with semaphore:
+            return await loop.run_in_executor(executor, _open_and_apply, path, func)
+
+    return await asyncio.gather(*(process(path) for path in paths), return_exceptions=return_exceptions)
+
 
 # 使用方法示例
 if __name__ == "__main__":
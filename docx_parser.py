@@ -1,15 +1,319 @@
 import zipfile
+import io
 from io import BytesIO
 import xml.etree.ElementTree as ET
 import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+import concurrent.futures
+import json
+import logging
+import threading
+from collections import deque
 
 
+# 库的日志记录器，默认不输出任何内容，需要诊断信息时调用configure_logging或自行添加处理器
+logger = logging.getLogger('our_docx')
+logger.addHandler(logging.NullHandler())
+
+
+def configure_logging(level=logging.INFO, handler=None):
+    """为库的日志记录器设置级别并添加输出处理器
+
+    Args:
+        level: 日志级别，如logging.DEBUG、logging.INFO、logging.WARNING
+        handler: 日志处理器，None表示输出到标准错误；重复调用时不会重复添加默认处理器
+
+    Returns:
+        logging.Logger: 库的日志记录器
+    """
+    logger.setLevel(level)
+    if handler is None:
+        if any(getattr(existing, '_our_docx_default', False) for existing in logger.handlers):
+            return logger
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        handler._our_docx_default = True
+    logger.addHandler(handler)
+    return logger
+
+
+class DocxError(Exception):
+    """严格模式(strict=True)下文档操作失败时抛出的异常"""
+
+
+class DocxIndexError(DocxError, IndexError):
+    """严格模式下元素、段落、表格或文本运行索引无效时抛出的异常"""
+
+
+# 保存XML部件时写在开头的XML声明(与Word生成的文件一致)
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+
+# 确定性保存时所有条目使用的时间戳(ZIP格式支持的最早时间)
+FIXED_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# zipfile没有写入已压缩数据、为ZipInfo指定压缩级别的公开接口，并行压缩和原样复制条目时
+# 需要修改写入句柄的_compressor、_file_size、_crc和ZipInfo._compresslevel。这些私有属性的含义
+# 只在下列Python版本中确认过，其他版本(包括属性仍存在但含义可能已变化的新版本)一律退回普通写入
+ZIPFILE_INTERNALS_VERSIONS = {(3, 8), (3, 9), (3, 10), (3, 11), (3, 12), (3, 13)}
+_zipfile_internals_supported = sys.version_info[:2] in ZIPFILE_INTERNALS_VERSIONS
+
+
+def _escape_xml_text(text):
+    """转义XML文本内容中的特殊字符(不使用xml.sax.saxutils，它会间接导入urllib等较慢的模块)"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _quote_xml_attribute(value):
+    """转义属性值并加上双引号"""
+    value = _escape_xml_text(value).replace('"', '&quot;')
+    return '"' + value.replace('\n', '&#10;').replace('\r', '&#13;').replace('\t', '&#9;') + '"'
+
+
+def _deflate_chunk(data, level=None, final=False):
+    """在工作线程中对一块数据做raw deflate压缩(zlib在压缩时会释放GIL)
+
+    非最后一块以Z_SYNC_FLUSH结束，输出按字节对齐且不带结束标记，
+    因此各块的压缩结果按顺序拼接后就是一个完整的deflate流。
+    """
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if level is None else level,
+                                  zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _PassthroughCompressor:
+    """写入已压缩数据时替代zipfile压缩器的直通对象"""
+
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+class _DeflateChunkWriter(io.BufferedIOBase):
+    """接收序列化输出，按块交给线程池压缩，并按顺序把压缩结果写入ZIP条目"""
+
+    def __init__(self, dest, executor, chunk_size, level, max_pending):
+        self._dest = dest
+        self._executor = executor
+        self._chunk_size = chunk_size
+        self._level = level
+        self._max_pending = max_pending
+        self._buffer = bytearray()
+        self._pending = deque()
+        # 原始(未压缩)数据的大小和CRC32
+        self.raw_size = 0
+        self.crc = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= self._chunk_size:
+            self._submit(final=False)
+        return len(data)
+
+    def _submit(self, final):
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        self.raw_size += len(chunk)
+        self.crc = zlib.crc32(chunk, self.crc)
+        if final and not self._pending:
+            # 整个部件只有一块时直接在当前线程压缩
+            self._dest.write(_deflate_chunk(chunk, self._level, final=True))
+            return
+        self._pending.append(self._executor.submit(_deflate_chunk, chunk, self._level, final))
+        # 限制在途的块数，控制内存占用
+        while len(self._pending) > self._max_pending or (final and self._pending):
+            self._dest.write(self._pending.popleft().result())
+
+    def finish(self):
+        """压缩剩余数据并等待所有块写入"""
+        self._submit(final=True)
+
+
+class _NullPhase:
+    """未启用统计时使用的空上下文管理器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """记录一个阶段耗时的上下文管理器，由PerformanceStats.phase创建"""
+
+    def __init__(self, stats, name, args):
+        self._stats = stats
+        self._name = name
+        self._args = args
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self._stats._record(self._name, self._start, time.perf_counter(), self._args)
+        return False
+
+
+class PerformanceStats:
+    """按阶段统计耗时和计数，可导出为Chrome trace JSON
+
+    通过DocxFile(path, stats=True)或传入同一个PerformanceStats对象(多个文档共用)启用，
+    未启用时各阶段只做一次None判断。
+
+    阶段名称：
+        open: 打开文档的总耗时
+        unzip: 从压缩包读取(解压)条目
+        parse: 解析XML部件
+        index: get_structured_body_elements建立元素索引
+        insert: 批量插入元素
+        save: 保存文档的总耗时
+        write_xml: 序列化并压缩XML部件(两者在流式写入中交替进行)
+        write_binary: 压缩写入二进制条目
+        copy_raw: 原样复制未修改条目的压缩数据
+
+    计数：
+        entries_read, bytes_inflated: 读取的条目数和解压后的字节数
+        parts_parsed: 解析的XML部件数
+        elements_indexed: 建立索引的顶层元素数
+        entries_written, bytes_written, bytes_deflated: 写入的条目数、原始字节数和压缩后字节数
+    """
+
+    def __init__(self, trace=False):
+        """
+        Args:
+            trace: 是否记录每一次阶段事件(用于导出Chrome trace)，否则只保留汇总
+        """
+        self.trace = trace
+        self.phases = {}
+        self.counters = {}
+        self.events = []
+        self._origin = time.perf_counter()
+
+    def phase(self, name, **args):
+        """返回记录一个阶段的上下文管理器
+
+        Args:
+            name: 阶段名称，同名阶段的耗时和次数累加
+            **args: 附加到trace事件中的参数(如部件名)
+        """
+        return _Phase(self, name, args)
+
+    def add(self, name, value=1):
+        """累加一个计数"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def _record(self, name, start, end, args):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0}
+        elapsed = end - start
+        phase['count'] += 1
+        phase['seconds'] += elapsed
+        if elapsed > phase['max_seconds']:
+            phase['max_seconds'] = elapsed
+        if self.trace:
+            self.events.append((name, start, elapsed, threading.get_ident(), args))
+
+    def reset(self):
+        """清空所有统计"""
+        self.phases = {}
+        self.counters = {}
+        self.events = []
+        self._origin = time.perf_counter()
+
+    def summary(self):
+        """返回统计汇总
+
+        Returns:
+            dict: {'phases': {阶段名: {'count', 'seconds', 'max_seconds'}}, 'counters': {计数名: 值}}
+        """
+        return {
+            'phases': {name: dict(phase) for name, phase in self.phases.items()},
+            'counters': dict(self.counters)
+        }
+
+    def print_summary(self):
+        """按总耗时降序打印各阶段统计和计数"""
+        print(f"{'阶段':<16}{'次数':>8}{'总耗时(ms)':>14}{'最长(ms)':>12}")
+        for name, phase in sorted(self.phases.items(), key=lambda item: item[1]['seconds'], reverse=True):
+            print(f"{name:<16}{phase['count']:>8}{phase['seconds'] * 1000:>14.2f}"
+                  f"{phase['max_seconds'] * 1000:>12.2f}")
+        for name, value in self.counters.items():
+            print(f"{name}: {value}")
+
+    def to_chrome_trace(self):
+        """生成Chrome trace格式(chrome://tracing、Perfetto可直接打开)的字典
+
+        需要以trace=True创建，否则只包含计数事件。
+        """
+        pid = os.getpid()
+        events = []
+        for name, start, elapsed, tid, args in self.events:
+            event = {
+                'name': name,
+                'cat': 'docx',
+                'ph': 'X',
+                'ts': (start - self._origin) * 1e6,
+                'dur': elapsed * 1e6,
+                'pid': pid,
+                'tid': tid
+            }
+            if args:
+                event['args'] = args
+            events.append(event)
+        if self.counters:
+            end = max((start + elapsed for _, start, elapsed, _, _ in self.events), default=self._origin)
+            events.append({
+                'name': 'counters',
+                'cat': 'docx',
+                'ph': 'C',
+                'ts': (end - self._origin) * 1e6,
+                'pid': pid,
+                'args': dict(self.counters)
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        """将Chrome trace JSON写入文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f)
+
 
 class DocxFile:
     """表示一个DOCX文件，结构化存储各部分内容"""
 
-    def __init__(self, path):
+    # 命名空间前缀 -> URI，子类按需扩充；确定性保存时按此固定前缀
+    NAMESPACES = {}
+
+    def __init__(self, path, stats=None, strict=False):
+        """
+        Args:
+            path: DOCX文件路径
+            stats: 性能统计，True表示新建PerformanceStats，也可以传入已有的对象在多个文档间共用；
+                   None表示不统计
+            strict: 严格模式，操作失败时抛出DocxError(索引无效时为DocxIndexError)，
+                    否则记录日志并按各方法的约定返回False、-1或None
+        """
         self.path = path
+        self.stats = PerformanceStats() if stats is True else stats
+        self.strict = strict
+        # 最近一次失败的信息 {'type': 异常类型名, 'message': 错误信息}，没有失败时为None
+        self.last_error = None
         # 结构化存储各部分
         self.parts = {
             'document': None,  # word/document.xml
@@ -26,7 +330,37 @@ class DocxFile:
             'embeddings': {},  # word/embeddings/下的文件
             'other': {}  # 其他未分类的文件
         }
-        self._extract_and_parse()
+        # 从压缩包读取的二进制条目 {条目路径: 内容对象}，用于判断保存时条目是否未修改
+        self._source_entries = {}
+        # 读取时源文件的(大小, 修改时间)，用于确认源文件未被其他程序改写
+        self._source_signature = None
+        with self._phase('open', path=str(path)):
+            self._extract_and_parse()
+
+    def _report_error(self, message, error_type=DocxError, exc=None):
+        """记录一次操作失败
+
+        写入last_error并以ERROR级别记录日志；严格模式下抛出error_type异常。
+        非严格模式下返回，由调用方按约定返回失败值。
+
+        Args:
+            message: 错误信息
+            error_type: 严格模式下抛出的异常类型
+            exc: 引起失败的原始异常，会附加到日志和抛出的异常上
+        """
+        if isinstance(exc, DocxError):
+            # 严格模式下try块内已经报告过的错误，直接向上传递
+            raise exc
+        self.last_error = {'type': error_type.__name__, 'message': message}
+        logger.error(message, exc_info=exc)
+        if self.strict:
+            raise error_type(message) from exc
+
+    def _phase(self, name, **args):
+        """返回记录阶段耗时的上下文管理器，未启用统计时返回空上下文"""
+        if self.stats is None:
+            return _NULL_PHASE
+        return self.stats.phase(name, **args)
 
     def _extract_and_parse(self, output_dir=None):
         """
@@ -39,10 +373,18 @@ class DocxFile:
         if output_dir:
             os.makedirs(output_dir, exist_ok=True)
         
+        self._source_entries = {}
+        stat = os.stat(self.path)
+        self._source_signature = (stat.st_size, stat.st_mtime_ns)
+
         with zipfile.ZipFile(self.path) as zip_file:
             # 解压并分类所有文件
             for item in zip_file.infolist():
-                content = zip_file.read(item.filename)
+                with self._phase('unzip'):
+                    content = zip_file.read(item.filename)
+                if self.stats is not None:
+                    self.stats.add('entries_read')
+                    self.stats.add('bytes_inflated', len(content))
                 
                 # 如果指定了输出目录，保存文件到磁盘
                 if output_dir:
@@ -62,36 +404,39 @@ class DocxFile:
                 
                 # 分类存储
                 if item.filename == 'word/document.xml':
-                    self.parts['document'] = self._parse_xml(content)
+                    self.parts['document'] = self._parse_xml(content, item.filename)
                 elif item.filename == 'word/styles.xml':
-                    self.parts['styles'] = self._parse_xml(content)
+                    self.parts['styles'] = self._parse_xml(content, item.filename)
                 elif item.filename == 'word/_rels/document.xml.rels':
-                    self.parts['relationships'] = self._parse_xml(content)
+                    self.parts['relationships'] = self._parse_xml(content, item.filename)
                 elif item.filename == 'word/numbering.xml':
-                    self.parts['numbering'] = self._parse_xml(content)
+                    self.parts['numbering'] = self._parse_xml(content, item.filename)
                 elif item.filename.startswith('word/header'):
                     header_num = item.filename.split('header')[1]
-                    self.parts['headers'][f'header{header_num}'] = self._parse_xml(content)
+                    self.parts['headers'][f'header{header_num}'] = self._parse_xml(content, item.filename)
                 elif item.filename.startswith('word/footer'):
                     footer_num = item.filename.split('footer')[1]
-                    self.parts['footers'][f'footer{footer_num}'] = self._parse_xml(content)
+                    self.parts['footers'][f'footer{footer_num}'] = self._parse_xml(content, item.filename)
                 elif item.filename.startswith('word/media/'):
                     media_name = item.filename.split('media/')[1]
                     self.parts['media'][media_name] = content  # 二进制内容，不解析
+                    self._source_entries[item.filename] = content
                 elif item.filename.startswith('word/embeddings/'):
                     embed_name = item.filename.split('embeddings/')[1]
                     self.parts['embeddings'][embed_name] = content  # 二进制内容
+                    self._source_entries[item.filename] = content
                 elif item.filename.startswith('word/') and item.filename.endswith('.xml'):
                     # 其他word目录下的xml文件
                     name = item.filename
-                    self.parts['other'][name] = self._parse_xml(content)
+                    self.parts['other'][name] = self._parse_xml(content, item.filename)
                 elif item.filename == '[Content_Types].xml':
                     name='[Content_Types].xml'
-                    self.parts['other'][name] = self._parse_xml(content)
+                    self.parts['other'][name] = self._parse_xml(content, item.filename)
                 else:
                     # 其他文件
                     name = item.filename
                     self.parts['other'][name] = content
+                    self._source_entries[item.filename] = content
 
     def _configure_parser(self):
         """配置XML解析器以更好地处理复杂XML"""
@@ -102,16 +447,26 @@ class DocxFile:
             import sys
             sys.setrecursionlimit(10000)  # 增加Python递归限制
         except Exception as e:
-            print(f"无法修改递归限制: {e}")
+            logger.warning("无法修改递归限制: %s", e)
         return parser
             
-    def _parse_xml(self, content):
-        """使用优化的解析器解析XML内容"""
+    def _parse_xml(self, content, name=None):
+        """使用优化的解析器解析XML内容
+
+        Args:
+            content: XML的二进制内容
+            name: 部件路径，只用于性能统计
+        """
         try:
             parser = self._configure_parser()
-            return ET.parse(BytesIO(content), parser=parser)
+            if self.stats is None:
+                return ET.parse(BytesIO(content), parser=parser)
+            with self.stats.phase('parse', part=name, bytes=len(content)):
+                tree = ET.parse(BytesIO(content), parser=parser)
+            self.stats.add('parts_parsed')
+            return tree
         except ET.ParseError as e:
-            print(f"XML解析错误: {e}")
+            self._report_error(f"XML解析错误: {e}", exc=e)
             return None
 
     def get_header(self, num=1):
@@ -130,94 +485,421 @@ class DocxFile:
         """添加媒体文件"""
         self.parts['media'][name] = content
 
-    def save(self, output_path):
-        """将 self.parts 中的所有内容按照原始结构保存为新的 DOCX 文件"""
-        with zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED) as zip_out:
-            # 1. 保存主文档文件
-            if self.parts['document'] is not None:
-                self._write_xml_to_zip(zip_out, 'word/document.xml', self.parts['document'])
-
-            # 2. 保存样式文件
-            if self.parts['styles'] is not None:
-                self._write_xml_to_zip(zip_out, 'word/styles.xml', self.parts['styles'])
-
-            # 3. 保存关系文件
-            if self.parts['relationships'] is not None:
-                self._write_xml_to_zip(zip_out, 'word/_rels/document.xml.rels', self.parts['relationships'])
-
-            # 4. 保存其他预定义的XML文件
-            predefined_files = {
-                'numbering': 'word/numbering.xml',
-                'footnotes': 'word/footnotes.xml',
-                'endnotes': 'word/endnotes.xml',
-                'settings': 'word/settings.xml',
-                'fonts': 'word/fontTable.xml'
-            }
+    # 本身已经压缩过的媒体格式，再用deflate压缩几乎没有收益
+    PRECOMPRESSED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.emz', '.wmz', '.wdp')
 
-            for part_name, file_path in predefined_files.items():
-                if self.parts[part_name] is not None:
-                    self._write_xml_to_zip(zip_out, file_path, self.parts[part_name])
+    def _iter_save_entries(self):
+        """按保存顺序遍历要写入DOCX的所有条目
 
-            # 5. 保存页眉
-            for header_name, header_tree in self.parts['headers'].items():
-                self._write_xml_to_zip(zip_out, f'word/{header_name}', header_tree)
+        Yields:
+            tuple: (压缩包中的路径, ElementTree或二进制内容)
+        """
+        # 1. 主文档文件
+        if self.parts['document'] is not None:
+            yield 'word/document.xml', self.parts['document']
 
-            # 6. 保存页脚
-            for footer_name, footer_tree in self.parts['footers'].items():
-                self._write_xml_to_zip(zip_out, f'word/footers/{footer_name}', footer_tree)
+        # 2. 样式文件
+        if self.parts['styles'] is not None:
+            yield 'word/styles.xml', self.parts['styles']
 
-            # 7. 保存媒体文件
-            for media_path, media_content in self.parts['media'].items():
+        # 3. 关系文件
+        if self.parts['relationships'] is not None:
+            yield 'word/_rels/document.xml.rels', self.parts['relationships']
 
-                zip_out.writestr(f'word/media/{media_path}', media_content)
+        # 4. 其他预定义的XML文件
+        predefined_files = {
+            'numbering': 'word/numbering.xml',
+            'footnotes': 'word/footnotes.xml',
+            'endnotes': 'word/endnotes.xml',
+            'settings': 'word/settings.xml',
+            'fonts': 'word/fontTable.xml'
+        }
 
-            # 8. 保存嵌入对象
-            for embed_path, embed_content in self.parts['embeddings'].items():
-                zip_out.writestr(embed_path, embed_content)
+        for part_name, file_path in predefined_files.items():
+            if self.parts[part_name] is not None:
+                yield file_path, self.parts[part_name]
 
-            # 9. 保存其他文件
-            for other_path, other_content in self.parts['other'].items():
-                if isinstance(other_content, ET.ElementTree):
-                    self._write_xml_to_zip(zip_out, other_path, other_content)
-                else:
-                    zip_out.writestr(other_path, other_content)
+        # 5. 页眉
+        for header_name, header_tree in self.parts['headers'].items():
+            yield f'word/{header_name}', header_tree
 
-    def _write_xml_to_zip(self, zip_out, file_path, xml_tree):
-        """将ElementTree对象写入ZIP文件"""
-        with BytesIO() as f:
-            # 保留XML声明和正确的命名空间
-            xml_tree.write(f, encoding='UTF-8', xml_declaration=True)
-            xml_bytes = f.getvalue()
+        # 6. 页脚
+        for footer_name, footer_tree in self.parts['footers'].items():
+            yield f'word/{footer_name}', footer_tree
 
-            # 确保有XML声明
-            if not xml_bytes.startswith(b'<?xml'):
-                xml_bytes = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n' + xml_bytes
+        # 7. 媒体文件
+        for media_path, media_content in self.parts['media'].items():
+            yield f'word/media/{media_path}', media_content
 
-            zip_out.writestr(file_path, xml_bytes)
+        # 8. 嵌入对象
+        for embed_path, embed_content in self.parts['embeddings'].items():
+            yield f'word/embeddings/{embed_path}', embed_content
 
-    def print_document_xml(self):
-        """打印document.xml的完整内容"""
-        if 'document' in self.parts and self.parts['document'] is not None:
-            print("=== document.xml 完整内容 ===")
+        # 9. 其他文件
+        for other_path, other_content in self.parts['other'].items():
+            yield other_path, other_content
 
-            # 获取根元素
-            root = self.parts['document'].getroot()
+    def _sorted_save_entries(self):
+        """按固定顺序排列要保存的条目：[Content_Types].xml、包关系、主文档，其余按路径排序"""
+        first = {'[Content_Types].xml': 0, '_rels/.rels': 1, 'word/document.xml': 2}
+        return sorted(self._iter_save_entries(), key=lambda entry: (first.get(entry[0], 3), entry[0]))
 
-            # 使用minidom格式化输出
-            import xml.dom.minidom as minidom
-            import xml.etree.ElementTree as ET
+    def _register_canonical_namespaces(self):
+        """重新注册命名空间前缀，使序列化结果不依赖于其他代码调用register_namespace的顺序"""
+        for prefix, uri in self.NAMESPACES.items():
+            if prefix != 'xml':
+                ET.register_namespace(prefix, uri)
 
-            # 将整个ElementTree转换为字符串
-            rough_string = ET.tostring(root, 'utf-8')
+    def _canonicalize_attributes(self, xml_tree):
+        """将所有元素的属性按限定名排序(属性顺序不影响XML语义)"""
+        for element in xml_tree.iter():
+            if len(element.attrib) > 1:
+                items = sorted(element.attrib.items())
+                element.attrib.clear()
+                element.attrib.update(items)
 
-            # 使用minidom解析并格式化
-            reparsed = minidom.parseString(rough_string)
-            pretty_str = reparsed.toprettyxml(indent="  ")
+    def _new_zip_info(self, zip_out, file_path, compress_type=None, deterministic=False):
+        """创建ZIP条目信息，确定性模式下使用固定的时间戳和系统标识"""
+        date_time = FIXED_ZIP_DATE_TIME if deterministic else time.localtime(time.time())[:6]
+        zinfo = zipfile.ZipInfo(file_path, date_time=date_time)
+        zinfo.compress_type = zip_out.compression if compress_type is None else compress_type
+        if _zipfile_internals_supported:
+            # 与ZipFile.writestr相同，使用压缩包的压缩级别(ZipFile.open没有指定压缩级别的参数)
+            zinfo._compresslevel = zip_out.compresslevel
+        if deterministic:
+            # 默认值随运行平台变化(Windows为0)
+            zinfo.create_system = 3
+        if file_path.endswith('/'):
+            zinfo.external_attr = (0o40775 << 16) | 0x10
+        else:
+            zinfo.external_attr = 0o600 << 16
+        return zinfo
 
-            print(pretty_str[:10000])
-            print("=== XML文档结束 ===")
+    def save(self, output_path, compression_level=None, store_media=False, fast=False,
+             max_workers=None, parallel_threshold=1024 * 1024, deterministic=False, reuse_unchanged=False):
+        """将 self.parts 中的所有内容按照原始结构保存为新的 DOCX 文件
+
+        Args:
+            output_path: 输出文件路径
+            compression_level: deflate压缩级别(0-9)，None表示zlib默认级别
+            store_media: 是否对PNG、JPEG等已压缩的媒体文件使用存储模式(不压缩)
+            fast: 快速模式，适合中间文件：压缩级别默认为1并对已压缩媒体使用存储模式
+            max_workers: 并行压缩XML部件的线程数，None表示CPU核数，1表示不并行
+            parallel_threshold: XML部件按该大小(字节)分块交给线程池压缩，小于该大小的部件直接压缩
+            deterministic: 确定性模式，相同内容总是生成字节完全相同的文件：条目按固定顺序写入，
+                           使用固定时间戳，命名空间前缀固定，属性按名称排序(会修改内存中的属性顺序)，
+                           并且不使用并行压缩
+            reuse_unchanged: 是否从源文件原样复制未修改的二进制条目(媒体、嵌入对象等)的压缩数据，
+                             不重新压缩；源文件在读取后被改写，或指定了compression_level、store_media、
+                             fast时不复制(原压缩数据不符合这些选项)
+
+        Returns:
+            bool: 保存成功时返回True
+        """
+        if fast:
+            store_media = True
+            if compression_level is None:
+                compression_level = 1
+
+        if deterministic:
+            workers = 1
+            entries = self._sorted_save_entries()
+            self._register_canonical_namespaces()
         else:
+            workers = max_workers or os.cpu_count() or 1
+            entries = self._iter_save_entries()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        source_file = None
+        source_infos = {}
+        if reuse_unchanged and compression_level is None and not store_media and self._source_is_current():
+            source_file = open(self.path, 'rb')
+            with zipfile.ZipFile(source_file) as source_zip:
+                source_infos = {info.filename: info for info in source_zip.infolist()}
+
+        try:
+            with self._phase('save', path=str(output_path)), \
+                    zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED,
+                                    compresslevel=compression_level) as zip_out:
+                for file_path, content in entries:
+                    if content is None:
+                        continue
+                    if isinstance(content, ET.ElementTree):
+                        with self._phase('write_xml', part=file_path):
+                            if deterministic:
+                                self._canonicalize_attributes(content)
+                            zinfo = self._new_zip_info(zip_out, file_path, deterministic=deterministic)
+                            self._write_xml_to_zip(zip_out, zinfo, content, executor, parallel_threshold,
+                                                    max_pending=2 * workers)
+                    else:
+                        if file_path in source_infos and content is self._source_entries.get(file_path):
+                            with self._phase('copy_raw', part=file_path):
+                                copied = self._copy_raw_entry(zip_out, source_file, source_infos[file_path],
+                                                              deterministic)
+                            if copied:
+                                continue
+                        compress_type = zipfile.ZIP_DEFLATED
+                        if store_media and file_path.lower().endswith(self.PRECOMPRESSED_EXTENSIONS):
+                            compress_type = zipfile.ZIP_STORED
+                        with self._phase('write_binary', part=file_path):
+                            zinfo = self._new_zip_info(zip_out, file_path, compress_type, deterministic)
+                            zip_out.writestr(zinfo, content, compresslevel=zip_out.compresslevel)
+
+            if self.stats is not None:
+                for info in zip_out.infolist():
+                    self.stats.add('entries_written')
+                    self.stats.add('bytes_written', info.file_size)
+                    self.stats.add('bytes_deflated', info.compress_size)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if source_file is not None:
+                source_file.close()
+        return True
+
+    def _source_is_current(self):
+        """源文件是否仍是读取时的那个文件(大小和修改时间都未变化)"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == self._source_signature
+
+    def _copy_raw_entry(self, zip_out, source_file, source_info, deterministic=False):
+        """将源压缩包中的条目按原压缩数据复制到zip_out，不解压也不重新压缩
+
+        只处理未加密的存储和deflate条目，其他情况返回False由调用方按普通方式写入。
+
+        Args:
+            zip_out: 以写模式打开的ZipFile
+            source_file: 以二进制模式打开的源文件对象
+            source_info: 源条目的ZipInfo
+
+        Returns:
+            bool: 是否已复制
+        """
+        if source_info.flag_bits & 0x1 or source_info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            return False
+
+        # 跳过本地文件头(30字节固定部分 + 文件名 + 扩展字段)读取压缩数据，
+        # 文件名长度和扩展字段长度是固定部分的最后两个字段
+        source_file.seek(source_info.header_offset)
+        header = struct.unpack('<4s2B4HL2L2H', source_file.read(30))
+        source_file.seek(header[-2] + header[-1], 1)
+        raw = source_file.read(source_info.compress_size)
+
+        zinfo = self._new_zip_info(zip_out, source_info.filename, source_info.compress_type, deterministic)
+        zinfo.file_size = source_info.file_size
+        with zip_out.open(zinfo, 'w') as dest:
+            if source_info.compress_type == zipfile.ZIP_STORED:
+                dest.write(raw)
+            elif _zipfile_internals_supported and all(
+                    hasattr(dest, name) for name in ('_compressor', '_file_size', '_crc')):
+                dest._compressor = _PassthroughCompressor()
+                dest.write(raw)
+                dest._file_size = source_info.file_size
+                dest._crc = source_info.CRC
+            else:
+                dest.write(zlib.decompress(raw, -15))
+        return True
+
+    def save_in_place(self, **save_options):
+        """原子地保存回源文件
+
+        先写入与源文件同目录的临时文件(未修改的二进制条目直接复制源文件中的压缩数据)，
+        刷新到磁盘后用os.replace替换源文件。保存过程中出错或中断时源文件保持不变。
+
+        Args:
+            **save_options: 传给save的其他选项
+
+        Returns:
+            bool: 是否成功保存，失败时源文件保持不变
+        """
+        path = os.path.abspath(self.path)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp',
+                                         dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            save_options.setdefault('reuse_unchanged', True)
+            if self.save(temp_path, **save_options) is False:
+                # 非严格模式下保存失败时临时文件不完整，不能替换源文件
+                os.remove(temp_path)
+                return False
+            shutil.copymode(path, temp_path)
+            with open(temp_path, 'rb+') as f:
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        # 新文件中的二进制条目就是当前内存中的内容，下次保存可以继续复用
+        self._source_entries = {file_path: content for file_path, content in self._iter_save_entries()
+                                if content is not None and not isinstance(content, ET.ElementTree)}
+        stat = os.stat(path)
+        self._source_signature = (stat.st_size, stat.st_mtime_ns)
+        return True
+
+    def _write_xml_to_zip(self, zip_out, file_path, xml_tree, executor=None, chunk_size=1024 * 1024,
+                          max_pending=4):
+        """将ElementTree对象直接序列化到ZIP条目中，不经过中间缓冲区
+
+        先写入XML声明，再将XML树流式写入条目。指定executor时，序列化输出按chunk_size分块
+        在线程池中压缩(最多max_pending块在途)；zipfile没有写入已压缩数据的公开接口，
+        这里把写入句柄的压缩器替换为直通对象，并在关闭前写回原始数据的大小和CRC，
+        不在ZIPFILE_INTERNALS_VERSIONS中的Python版本退回普通写入。
+
+        Args:
+            zip_out: 以写模式打开的ZipFile
+            file_path: 条目路径或ZipInfo对象
+            xml_tree: 要写入的ElementTree
+        """
+        if not _zipfile_internals_supported and zip_out.compresslevel is not None:
+            # 不能为ZipFile.open写入的条目指定压缩级别，先序列化再通过writestr写入
+            buffer = BytesIO()
+            buffer.write(XML_DECLARATION)
+            xml_tree.write(buffer, encoding='UTF-8', xml_declaration=False)
+            zip_out.writestr(file_path, buffer.getvalue(), compresslevel=zip_out.compresslevel)
+            return
+
+        with zip_out.open(file_path, 'w') as dest:
+            parallel = (executor is not None and zip_out.compression == zipfile.ZIP_DEFLATED
+                        and _zipfile_internals_supported
+                        and all(hasattr(dest, name) for name in ('_compressor', '_file_size', '_crc')))
+            if not parallel:
+                dest.write(XML_DECLARATION)
+                xml_tree.write(dest, encoding='UTF-8', xml_declaration=False)
+                return
+
+            dest._compressor = _PassthroughCompressor()
+            writer = _DeflateChunkWriter(dest, executor, chunk_size, zip_out.compresslevel,
+                                         max_pending)
+            writer.write(XML_DECLARATION)
+            xml_tree.write(writer, encoding='UTF-8', xml_declaration=False)
+            writer.finish()
+            dest._file_size = writer.raw_size
+            dest._crc = writer.crc
+
+    def get_xml_part(self, name):
+        """按名称获取已解析的XML部件
+
+        Args:
+            name: self.parts中的键(如'document'、'styles')、页眉页脚名(如'header1.xml')
+                  或部件在压缩包中的路径(如'word/document.xml'、'word/settings.xml')
+
+        Returns:
+            ElementTree: 找不到或不是XML部件时返回None
+        """
+        paths = {
+            'word/document.xml': 'document',
+            'word/styles.xml': 'styles',
+            'word/_rels/document.xml.rels': 'relationships',
+            'word/numbering.xml': 'numbering'
+        }
+        name = paths.get(name, name)
+        candidates = [self.parts.get(name)]
+        basename = name[len('word/'):] if name.startswith('word/') else name
+        candidates += [self.parts['headers'].get(basename), self.parts['footers'].get(basename),
+                       self.parts['other'].get(name)]
+        for candidate in candidates:
+            if isinstance(candidate, ET.ElementTree):
+                return candidate
+        return None
+
+    def _qualified_name(self, name, prefixes):
+        """将'{uri}local'形式的名称转换为'prefix:local'，未知命名空间按出现顺序编号为ns0、ns1..."""
+        if not name.startswith('{'):
+            return name
+        uri, local = name[1:].split('}', 1)
+        prefix = prefixes.get(uri)
+        if prefix is None:
+            prefix = prefixes[uri] = f"ns{sum(1 for value in prefixes.values() if value.startswith('ns'))}"
+        return f"{prefix}:{local}"
+
+    def iter_pretty_xml(self, element, level=0, indent='  ', prefixes=None):
+        """按行惰性生成元素的缩进格式XML文本
+
+        只在需要时遍历子元素，配合截断使用时不会格式化整篇文档。
+        输出用于查看，不包含命名空间声明；只含空白的文本和尾部文本被忽略。
+
+        Args:
+            element: 要格式化的元素
+            level: 起始缩进层级
+            indent: 每层缩进字符串
+            prefixes: 命名空间URI到前缀的映射，默认使用self.NAMESPACES
+
+        Yields:
+            str: 一行格式化后的XML(不含换行符)
+        """
+        if prefixes is None:
+            prefixes = {uri: prefix for prefix, uri in self.NAMESPACES.items()}
+            prefixes.setdefault('http://www.w3.org/XML/1998/namespace', 'xml')
+        pad = indent * level
+        tag = self._qualified_name(element.tag, prefixes)
+        attrs = ''.join(f" {self._qualified_name(key, prefixes)}={_quote_xml_attribute(value)}"
+                        for key, value in element.attrib.items())
+        text = element.text if element.text and element.text.strip() else None
+
+        if len(element) == 0:
+            if element.text:
+                # 叶子元素的文本(如w:t)原样保留空格
+                yield f"{pad}<{tag}{attrs}>{_escape_xml_text(element.text)}</{tag}>"
+            else:
+                yield f"{pad}<{tag}{attrs}/>"
+            return
+
+        yield f"{pad}<{tag}{attrs}>"
+        if text:
+            yield f"{pad}{indent}{_escape_xml_text(text.strip())}"
+        for child in element:
+            yield from self.iter_pretty_xml(child, level + 1, indent, prefixes)
+            if child.tail and child.tail.strip():
+                yield f"{pad}{indent}{_escape_xml_text(child.tail.strip())}"
+        yield f"{pad}</{tag}>"
+
+    def print_xml(self, elements, max_chars=10000, indent='  '):
+        """格式化打印一个或多个元素，达到max_chars后停止格式化
+
+        Args:
+            elements: 元素或元素序列
+            max_chars: 最多打印的字符数，None表示不限制
+            indent: 每层缩进字符串
+
+        Returns:
+            int: 实际打印的字符数
+        """
+        if isinstance(elements, ET.Element):
+            elements = [elements]
+        prefixes = {uri: prefix for prefix, uri in self.NAMESPACES.items()}
+        prefixes.setdefault('http://www.w3.org/XML/1998/namespace', 'xml')
+
+        printed = 0
+        for element in elements:
+            for line in self.iter_pretty_xml(element, indent=indent, prefixes=prefixes):
+                if max_chars is not None and printed + len(line) > max_chars:
+                    print(line[:max(max_chars - printed, 0)])
+                    print("...(输出已截断)")
+                    return max_chars
+                print(line)
+                printed += len(line) + 1
+        return printed
+
+    def print_document_xml(self, part='document', max_chars=10000):
+        """格式化打印一个XML部件的内容
+
+        Args:
+            part: 部件名称或路径，见get_xml_part，默认为document.xml
+            max_chars: 最多打印的字符数，None表示不限制
+        """
+        tree = self.get_xml_part(part)
+        if tree is None:
             print("文档XML不可用")
+            return
+
+        print(f"=== {part} 完整内容 ===")
+        self.print_xml(tree.getroot(), max_chars=max_chars)
+        print("=== XML文档结束 ===")
 
     # 可以添加更多便捷访问方法...
 # main_docx = DocxFile('智算工程学院毕业设计（论文）模板2025届(1)-王俊豪-6021203526(1).docx')
@@ -0,0 +1,115 @@
+"""保存文档时zipfile私有属性兼容路径的测试
+
+DocxFile.save的并行压缩和原样复制条目依赖zipfile的私有属性，只在ZIPFILE_INTERNALS_VERSIONS
+中的Python版本上启用。这里分别在启用和禁用的情况下保存同一个文档，检查两条路径的结果一致。
+
+运行：python -m unittest discover tests  或  python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_parser
+from docx_namespace import DocxElementParser
+
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Default Extension="png" ContentType="image/png"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'image" Target="media/image1.png"/>'
+    '</Relationships>'
+)
+
+
+def _write_sample_docx(path, paragraphs=2000):
+    """生成一个包含大量段落和一个媒体文件的最小文档"""
+    body = ''.join(f'<w:p><w:r><w:t>第{i}段 sample text {i * 7919 % 10007}</w:t></w:r></w:p>'
+                   for i in range(paragraphs))
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document xmlns:w="{W_NS}"><w:body>{body}<w:sectPr/></w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES)
+        zf.writestr('_rels/.rels', PACKAGE_RELS)
+        zf.writestr('word/document.xml', document)
+        zf.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS)
+        zf.writestr('word/media/image1.png', bytes(range(256)) * 64)
+
+
+def _read_entries(path):
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+class SaveFallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, 'sample.docx')
+        _write_sample_docx(self.source)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _save(self, name, supported, **save_options):
+        output = os.path.join(self.temp_dir.name, name)
+        with mock.patch.object(docx_parser, '_zipfile_internals_supported', supported):
+            document = DocxElementParser(self.source)
+            self.assertTrue(document.save(output, **save_options))
+        return output
+
+    def test_parallel_deflate_matches_fallback(self):
+        options = {'max_workers': 2, 'parallel_threshold': 4096}
+        patched = _read_entries(self._save('patched.docx', True, **options))
+        fallback = _read_entries(self._save('fallback.docx', False, **options))
+        self.assertEqual(patched, fallback)
+
+    def test_reuse_unchanged_matches_fallback(self):
+        patched = _read_entries(self._save('patched.docx', True, reuse_unchanged=True))
+        fallback = _read_entries(self._save('fallback.docx', False, reuse_unchanged=True))
+        self.assertEqual(patched, fallback)
+        self.assertEqual(fallback['word/media/image1.png'], bytes(range(256)) * 64)
+
+    def test_fallback_respects_compression_level(self):
+        stored = self._save('level0.docx', False, compression_level=0)
+        best = self._save('level9.docx', False, compression_level=9)
+        with zipfile.ZipFile(stored) as level0, zipfile.ZipFile(best) as level9:
+            for name in ('word/document.xml', 'word/media/image1.png'):
+                self.assertGreater(level0.getinfo(name).compress_size, level9.getinfo(name).compress_size)
+
+    def test_deterministic_output_independent_of_path(self):
+        patched = self._save('patched.docx', True, deterministic=True)
+        fallback = self._save('fallback.docx', False, deterministic=True)
+        with open(patched, 'rb') as a, open(fallback, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""export_tables_to_workbook的错误处理测试"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx_namespace import DocxElementParser, DocxError
+
+try:
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    HAS_EXCEL = True
+except ImportError:
+    HAS_EXCEL = False
+
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+    'officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships"/>'
+)
+
+
+def _write_tables_docx(path, tables=14):
+    """生成包含多个2×2表格的最小文档(表格数量超过导出队列的容量)"""
+    cell = '<w:tc><w:p><w:r><w:t>{}</w:t></w:r></w:p></w:tc>'
+    body = ''.join(
+        '<w:tbl><w:tblGrid><w:gridCol/><w:gridCol/></w:tblGrid>'
+        + ''.join('<w:tr>' + cell.format(f'{t}-{r}-0') + cell.format(f'{t}-{r}-1') + '</w:tr>' for r in range(2))
+        + '</w:tbl><w:p/>'
+        for t in range(tables))
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                f'<w:document xmlns:w="{W_NS}"><w:body>{body}<w:sectPr/></w:body></w:document>')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES)
+        zf.writestr('_rels/.rels', PACKAGE_RELS)
+        zf.writestr('word/document.xml', document)
+        zf.writestr('word/_rels/document.xml.rels', DOCUMENT_RELS)
+
+
+@unittest.skipUnless(HAS_EXCEL, '需要pandas和openpyxl')
+class ExportTablesToWorkbookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.temp_dir.name, 'tables.docx')
+        _write_tables_docx(self.source)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _run_with_timeout(self, func, timeout=20):
+        """在线程中运行func，超时视为挂起"""
+        outcome = {}
+
+        def target():
+            try:
+                outcome['result'] = func()
+            except BaseException as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        self.assertFalse(thread.is_alive(), '导出在出错后没有结束')
+        return outcome
+
+    def test_strict_unwritable_path_raises_without_hanging(self):
+        document = DocxElementParser(self.source, strict=True)
+        self.assertEqual(len(document.tables), 14)
+        output = os.path.join(self.temp_dir.name, 'missing_dir', 'tables.xlsx')
+        outcome = self._run_with_timeout(lambda: document.export_tables_to_workbook(output))
+        self.assertIsInstance(outcome.get('error'), DocxError)
+
+    def test_unwritable_path_returns_count(self):
+        document = DocxElementParser(self.source)
+        output = os.path.join(self.temp_dir.name, 'missing_dir', 'tables.xlsx')
+        outcome = self._run_with_timeout(lambda: document.export_tables_to_workbook(output))
+        self.assertEqual(outcome.get('result'), 0)
+        self.assertIsNotNone(document.last_error)
+
+    def test_out_of_range_indices_are_reported(self):
+        document = DocxElementParser(self.source)
+        output = os.path.join(self.temp_dir.name, 'tables.xlsx')
+        self.assertEqual(document.export_tables_to_workbook(output, [0, 99, 1]), 2)
+        self.assertEqual(document.last_error['type'], 'DocxIndexError')
+
+        strict = DocxElementParser(self.source, strict=True)
+        with self.assertRaises(IndexError):
+            strict.export_tables_to_workbook(output, [-1])
+
+    def test_exports_all_tables(self):
+        document = DocxElementParser(self.source)
+        output = os.path.join(self.temp_dir.name, 'tables.xlsx')
+        self.assertEqual(document.export_tables_to_workbook(output), 14)
+        self.assertEqual(len(openpyxl.load_workbook(output).sheetnames), 14)
+
+
+if __name__ == '__main__':
+    unittest.main()